@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Verificação de backends
+Informa numa única chamada quais bibliotecas de extração estão disponíveis (docling,
+pypdfium2, pandas), com versão, tempo de import e presença dos modelos do Docling.
+Usado pelo wrapper Node.js (ldi_parser.py --probe) no lugar de um
+`python -c "import docling"` antes de cada extração.
+"""
+
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+# Backend -> (distribuição pip, módulo importado pelo parser)
+BACKENDS = {
+    "docling": ("docling", "docling.document_converter"),
+    "pypdfium2": ("pypdfium2", "pypdfium2"),
+    "pandas": ("pandas", "pandas")
+}
+
+# Repositórios dos modelos de layout/TableFormer no cache do Hugging Face
+# (o nome mudou de ds4sd para docling-project nas versões recentes)
+MODEL_REPOS = ("models--docling-project--docling-models", "models--ds4sd--docling-models")
+
+
+def probe_backend(distribution: str, module: str) -> Dict[str, Any]:
+    """Importa o módulo e mede o tempo; versão pelos metadados do pacote."""
+    info: Dict[str, Any] = {"available": False, "version": None, "importMs": None, "error": None}
+    try:
+        info["version"] = metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        info["error"] = "não instalado"
+        return info
+
+    started = time.perf_counter()
+    try:
+        importlib.import_module(module)
+        info["available"] = True
+    except Exception as e:
+        info["error"] = f"{type(e).__name__}: {e}"
+    info["importMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return info
+
+
+def _model_dirs() -> List[Path]:
+    """Onde o Docling procura os modelos: DOCLING_ARTIFACTS_PATH ou o cache do Hugging Face."""
+    dirs = []
+    if os.environ.get("DOCLING_ARTIFACTS_PATH"):
+        dirs.append(Path(os.environ["DOCLING_ARTIFACTS_PATH"]))
+    hub = os.environ.get("HF_HUB_CACHE") or os.path.join(
+        os.environ.get("HF_HOME") or os.path.join(Path.home(), ".cache", "huggingface"), "hub")
+    dirs.extend(Path(hub) / repo for repo in MODEL_REPOS)
+    return dirs
+
+
+def probe_models() -> Dict[str, Any]:
+    """Verifica se os modelos já foram baixados (sem baixar nada)."""
+    for path in _model_dirs():
+        if path.is_dir() and any(path.iterdir()):
+            return {"available": True, "path": str(path)}
+    return {"available": False, "path": None}
+
+
+def probe(backends: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Relatório de capacidades: versão do Python, cada backend (available, version,
+    importMs, error) e os modelos do Docling.
+    """
+    started = time.perf_counter()
+    names = backends or list(BACKENDS)
+    report = {
+        "python": platform.python_version(),
+        "executable": sys.executable,
+        "backends": {name: probe_backend(*BACKENDS[name]) for name in names},
+        "models": probe_models()
+    }
+    report["probeMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+def main():
+    """Imprime o relatório em JSON (stdout)."""
+    print(json.dumps(probe(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Processamento em lote de PDFs (reprocessamento de LDIs arquivadas, reexportação de pastas)
+Carrega o conversor do Docling uma única vez e cria os workers por fork depois disso,
+assim os modelos são compartilhados copy-on-write em vez de carregados por arquivo.
+
+Uso:
+    python batch_runner.py ldi <pasta|arquivos...> [--output DIR] [--jobs N]
+    python batch_runner.py extract <pasta|arquivos...> [--output DIR] [--jobs N]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ldi_cache import file_sha256
+from ldi_utils import write_json_atomic
+from pipeline_profiles import PROFILES, profile_signature, resolve_profile, warm_profiles
+
+
+MODES = ("ldi", "extract")
+MANIFEST_NAME = "batch_manifest.json"
+REPORT_NAME = "batch_report.json"
+
+# Opções repassadas aos workers (definidas em main antes do fork): estratégia e
+# cache do modo ldi, perfil de conversão e limite de páginas dos dois modos
+_options: Dict[str, Any] = {}
+
+
+def collect_pdfs(inputs: List[str], recursive: bool = False) -> List[Tuple[Path, str]]:
+    """
+    Expande pastas em seus PDFs (ordem alfabética) e mantém arquivos na ordem dada.
+
+    Devolve (PDF, nome da saída): o caminho relativo à pasta dada, sem a extensão e
+    com as subpastas unidas por "__" (sub/a.pdf -> sub__a), assim PDFs de mesmo nome
+    em subpastas diferentes (--recursive) não gravam no mesmo arquivo.
+    """
+    files = []
+    seen = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            pattern = "**/*" if recursive else "*"
+            candidates = sorted(p for p in path.glob(pattern) if p.is_file() and p.suffix.lower() == ".pdf")
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            resolved = candidate.resolve()
+            if resolved not in seen:
+                seen.add(resolved)
+                relative = candidate.relative_to(path) if path.is_dir() else Path(candidate.name)
+                files.append((candidate, "__".join(relative.with_suffix("").parts)))
+    return files
+
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """Número de arquivos processados ao mesmo tempo (argumento, BATCH_JOBS ou núcleos)."""
+    if jobs is None:
+        env_jobs = os.environ.get("BATCH_JOBS")
+        jobs = int(env_jobs) if env_jobs else (os.cpu_count() or 1)
+    return max(1, jobs)
+
+
+def load_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Manifesto anterior: sha256 do PDF -> entrada do último processamento."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("entries", {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠ Manifesto ilegível, ignorando ({path}): {e}", file=sys.stderr)
+        return {}
+
+
+def _profile() -> Dict[str, Any]:
+    return resolve_profile(_options.get("pipeline"), maxPages=_options.get("max_pages"))
+
+
+def run_options(mode: str) -> Dict[str, Any]:
+    """
+    O que decide a saída de cada PDF: versão do parser (PARSER_STAMP), estratégia e
+    moradores no modo ldi, perfil de conversão nos dois. Gravado em cada entrada do
+    manifesto; uma entrada com opções diferentes não é pulada.
+    """
+    options = {"pipeline": profile_signature(_profile())}
+    if mode == "ldi":
+        import ldi_parser
+        import recipient_index
+
+        index = recipient_index.get_index(_options.get("residents"))
+        options.update(parser=ldi_parser.PARSER_STAMP, strategy=_options.get("strategy", "auto"),
+                       residents=index.signature if index is not None else None)
+    return options
+
+
+def preload(mode: str, strategy: str) -> None:
+    """Carrega o conversor (e os modelos) no processo pai, antes do fork dos workers."""
+    if mode == "ldi":
+        # Índice de moradores: carregado uma vez e herdado pelos workers
+        import recipient_index
+        recipient_index.get_index(_options.get("residents"))
+    if mode == "ldi" and strategy == "text":
+        return  # camada de texto não usa o Docling
+
+    import ldi_parser
+    started = time.perf_counter()
+    print(f"⏳ Carregando Docling, perfil {_profile()['name']} (uma vez para todo o lote)...", file=sys.stderr)
+    # Inclui a variante sem OCR do OCR seletivo, senão cada worker a construiria
+    for profile in warm_profiles(_profile()):
+        ldi_parser.warm_up_converter(ldi_parser.get_converter(profile))
+    print(f"✓ Docling carregado em {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def _init_spawn_worker(mode: str, options: Dict[str, Any]) -> None:
+    """Inicializador para plataformas sem fork: cada worker carrega o próprio conversor."""
+    _options.update(options)
+    preload(mode, options.get("strategy", "auto"))
+
+
+def _run_ldi(pdf_path: str, output_dir: str, name: str) -> Dict[str, Any]:
+    import ldi_parser
+
+    # workers=1: sem pool de páginas dentro de cada worker do lote
+    result = ldi_parser.parse_ldi_pdf(pdf_path, strategy=_options.get("strategy", "auto"),
+                                      workers=1, use_cache=_options.get("use_cache", True),
+                                      pipeline=_options.get("pipeline"),
+                                      max_pages=_options.get("max_pages"),
+                                      residents=_options.get("residents"))
+    output_path = Path(output_dir) / f"{name}.json"
+    write_json_atomic(output_path, result)
+
+    metadata = result.get("metadata", {})
+    return {
+        "status": "ok" if result.get("success") else "error",
+        "error": "; ".join(result.get("errors", [])) or None,
+        "output": str(output_path),
+        "pages": metadata.get("pagesProcessed", 0),
+        "packages": result.get("totalPackages", 0),
+        "expectedTotal": metadata.get("expectedTotal", 0),
+        "strategy": metadata.get("strategy"),
+        "warnings": len(result.get("warnings", []))
+    }
+
+
+def _run_extract(pdf_path: str, output_dir: str, name: str) -> Dict[str, Any]:
+    import ldi_parser
+    from pdf_extractor import extract_pdf
+
+    profile = _profile()
+    extraction = extract_pdf(pdf_path, output_dir, converter=ldi_parser.get_converter(profile),
+                             pipeline=profile["name"], max_pages=profile["settings"]["maxPages"], name=name)
+    return {
+        "status": "ok",
+        "error": None,
+        "output": str(Path(output_dir).absolute()),
+        "pages": extraction.pages,
+        "tables": extraction.tables
+    }
+
+
+def process_file(mode: str, pdf_path: str, output_dir: str, name: str) -> Dict[str, Any]:
+    """
+    Executado no worker: processa um PDF e devolve o resumo (nunca levanta exceção).
+    name é o nome base das saídas (ver collect_pdfs).
+    """
+    started = time.perf_counter()
+    try:
+        run = _run_ldi if mode == "ldi" else _run_extract
+        outcome = run(pdf_path, output_dir, name)
+    except Exception as e:
+        outcome = {"status": "error", "error": str(e)}
+    outcome["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    outcome["pid"] = os.getpid()
+    return outcome
+
+
+def run_batch(mode: str, files: List[Tuple[Path, str]], output_dir: Path, jobs: int,
+              manifest_path: Path, force: bool = False) -> Dict[str, Any]:
+    """
+    Processa os arquivos (PDF, nome da saída; ver collect_pdfs) com até `jobs` workers,
+    pulando os já presentes no manifesto com as mesmas opções (run_options: versão do
+    parser, estratégia, perfil). Um nome de saída repetido no lote (mesmo caminho
+    relativo em pastas de entrada diferentes) ganha o início do SHA-256 do PDF.
+
+    O manifesto é regravado a cada arquivo concluído, então um lote interrompido
+    continua de onde parou na próxima execução.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {} if force else load_manifest(manifest_path)
+
+    file_reports: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+    batch_hashes = set()
+    names = set()
+    pipeline = _profile()["name"]
+    options = run_options(mode)
+
+    for pdf, name in files:
+        report = {"file": str(pdf), "sha256": None, "status": "pending"}
+        file_reports.append(report)
+        try:
+            report["sha256"] = file_sha256(str(pdf))
+        except OSError as e:
+            report.update(status="error", error=str(e))
+            continue
+        if name in names:
+            name = f"{name}-{report['sha256'][:12]}"
+        names.add(name)
+        report["name"] = name
+
+        previous = manifest.get(report["sha256"])
+        if (previous and previous.get("status") == "ok" and previous.get("mode") == mode
+                and previous.get("options") == options):
+            report.update(status="skipped", reason="já processado", output=previous.get("output"))
+        elif report["sha256"] in batch_hashes:
+            report.update(status="skipped", reason="conteúdo duplicado no lote")
+        else:
+            pending.append(report)
+        batch_hashes.add(report["sha256"])
+
+    skipped = sum(1 for r in file_reports if r["status"] == "skipped")
+    print(f"📚 {len(files)} PDFs ({len(pending)} a processar, {skipped} pulados)", file=sys.stderr)
+
+    started = time.perf_counter()
+    if pending:
+        if "fork" in multiprocessing.get_all_start_methods():
+            preload(mode, _options.get("strategy", "auto"))
+            executor = ProcessPoolExecutor(max_workers=min(jobs, len(pending)),
+                                           mp_context=multiprocessing.get_context("fork"))
+        else:
+            executor = ProcessPoolExecutor(max_workers=min(jobs, len(pending)),
+                                           mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_spawn_worker,
+                                           initargs=(mode, dict(_options)))
+        try:
+            futures = {
+                executor.submit(process_file, mode, report["file"], str(output_dir), report["name"]): report
+                for report in pending
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                report = futures[future]
+                try:
+                    report.update(future.result())
+                except Exception as e:
+                    # Worker morto (ex.: OOM) derruba o pool inteiro
+                    report.update(status="error", error=str(e))
+
+                icon = "✓" if report["status"] == "ok" else "❌"
+                print(f"  {icon} [{done}/{len(pending)}] {Path(report['file']).name} "
+                      f"({report.get('ms', 0):.0f}ms)", file=sys.stderr)
+
+                if report["status"] == "ok":
+                    manifest[report["sha256"]] = {
+                        "file": report["file"],
+                        "mode": mode,
+                        "pipeline": pipeline,
+                        "options": options,
+                        "status": "ok",
+                        "output": report.get("output"),
+                        "processedAt": datetime.now().isoformat(timespec="seconds")
+                    }
+                    write_json_atomic(manifest_path, {"entries": manifest})
+        except KeyboardInterrupt:
+            print("⚠ Lote interrompido; o manifesto guarda o que já foi concluído", file=sys.stderr)
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+    wall_s = time.perf_counter() - started
+    processed = [r for r in file_reports if r["status"] == "ok"]
+    pages = sum(r.get("pages") or 0 for r in processed)
+    summary = {
+        "mode": mode,
+        "jobs": jobs,
+        "pipeline": _profile(),
+        "files": len(files),
+        "processed": len(processed),
+        "skipped": skipped,
+        "failed": sum(1 for r in file_reports if r["status"] == "error"),
+        "wallTimeMs": round(wall_s * 1000, 1),
+        "filesPerMinute": round(len(processed) / wall_s * 60, 2) if wall_s > 0 and processed else 0,
+        "pagesPerSecond": round(pages / wall_s, 2) if wall_s > 0 and pages else 0,
+        "pages": pages
+    }
+    if mode == "ldi":
+        summary["packages"] = sum(r.get("packages") or 0 for r in processed)
+
+    return {
+        "summary": summary,
+        "files": file_reports,
+        "manifest": str(manifest_path),
+        "finishedAt": datetime.now().isoformat(timespec="seconds")
+    }
+
+
+def main():
+    """Função principal - processa o lote e imprime o relatório JSON em stdout."""
+    parser = argparse.ArgumentParser(description="Processamento em lote de PDFs com Docling")
+    parser.add_argument("mode", choices=MODES,
+                        help="ldi: ldi_parser (um JSON por PDF); extract: pdf_extractor (markdown/json/csv)")
+    parser.add_argument("inputs", nargs="+", help="pastas e/ou arquivos PDF")
+    parser.add_argument("--output", default="batch_output", help="diretório de saída (padrão: batch_output)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="PDFs processados em paralelo (padrão: BATCH_JOBS ou núcleos)")
+    parser.add_argument("--recursive", action="store_true", help="inclui subpastas")
+    parser.add_argument("--manifest", default=None,
+                        help=f"manifesto de arquivos já processados (padrão: <saída>/{MANIFEST_NAME})")
+    parser.add_argument("--force", action="store_true", help="reprocessa mesmo o que está no manifesto")
+    parser.add_argument("--strategy", default="auto", choices=("auto", "text", "docling"),
+                        help="estratégia do ldi_parser (modo ldi)")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="ignora o cache local do ldi_parser (modo ldi)")
+    parser.add_argument("--pipeline", choices=tuple(PROFILES), default=None,
+                        help="perfil de conversão do Docling (padrão: LDI_PIPELINE ou default)")
+    parser.add_argument("--max-pages", type=int, default=None,
+                        help="converte com o Docling só as N primeiras páginas de cada PDF")
+    parser.add_argument("--residents", default=None,
+                        help="lista de moradores (JSON) para o ldi_parser (modo ldi; padrão: LDI_RESIDENTS)")
+    args = parser.parse_args()
+
+    jobs = resolve_jobs(args.jobs)
+    if jobs > 1:
+        # Vários workers por fork: uma thread de OpenMP/torch por processo
+        os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+    files = collect_pdfs(args.inputs, args.recursive)
+    if not files:
+        print(json.dumps({"success": False, "error": "Nenhum PDF encontrado"}))
+        sys.exit(1)
+
+    output_dir = Path(args.output)
+    manifest_path = Path(args.manifest) if args.manifest else output_dir / MANIFEST_NAME
+    _options.update(strategy=args.strategy, use_cache=args.use_cache,
+                    pipeline=args.pipeline, max_pages=args.max_pages, residents=args.residents)
+
+    report = run_batch(args.mode, files, output_dir, jobs, manifest_path, args.force)
+    report_path = output_dir / REPORT_NAME
+    write_json_atomic(report_path, report)
+
+    summary = report["summary"]
+    print(f"\n📊 Lote: {summary['processed']} processados, {summary['skipped']} pulados, "
+          f"{summary['failed']} com erro em {summary['wallTimeMs'] / 1000:.1f}s "
+          f"({summary['filesPerMinute']} PDFs/min)", file=sys.stderr)
+    print(f"   Relatório: {report_path}", file=sys.stderr)
+
+    print(json.dumps({"success": summary["failed"] == 0, "report": str(report_path), **summary},
+                     ensure_ascii=False))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
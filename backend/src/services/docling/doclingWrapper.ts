@@ -3,9 +3,11 @@
  * Chama o script Python via child_process e retorna os dados estruturados
  */
 
-import { spawn } from 'child_process';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import * as path from 'path';
 import * as fs from 'fs';
+import * as readline from 'readline';
+import * as net from 'net';
 
 // Tipos compatíveis com o pdfParser.ts existente
 export interface DoclingPackageData {
@@ -18,6 +20,95 @@ export interface DoclingPackageData {
   pickupDeadline?: string;
   pickupDeadlineStr?: string;
   confidence: number;
+  /** Página do PDF (1-based) e offsets do código no texto da página */
+  page?: number;
+  charStart?: number;
+  charEnd?: number;
+  /** Morador associado (opção residents); null abaixo do limiar de matchScore */
+  residentId?: number | string | null;
+  matchScore?: number;
+  /** Situação no índice de códigos (opção trackingIndex) e data da primeira LDI em que apareceu */
+  seenStatus?: 'new' | 'repeat' | 'delivered';
+  firstSeenAt?: string;
+}
+
+export interface DoclingCacheInfo {
+  hit: boolean;
+  conversionHit: boolean;
+  key: string;
+  parserStamp: string;
+  hits: number;
+  misses: number;
+  conversionHits: number;
+  conversionMisses: number;
+  entries: number;
+  bytes: number;
+}
+
+export interface DoclingTableStats {
+  table: number;
+  rows: number;
+  packages: number;
+  newPackages: number;
+  ms: number;
+}
+
+export interface DoclingMemoryStats {
+  peakRssKb: number | null;
+  childrenPeakRssKb: number | null;
+  workerPeakRssKb?: number;
+}
+
+export interface DoclingPipelineProfile {
+  name: 'default' | 'fast' | 'accurate';
+  settings: {
+    ocr: boolean;
+    selectiveOcr: boolean;
+    tableStructure: boolean;
+    tableMode: 'fast' | 'accurate';
+    cellMatching: boolean;
+    pageImages: boolean;
+    pictureImages: boolean;
+    imagesScale: number;
+    maxPages: number | null;
+    forceFullPageOcr?: boolean;
+  };
+}
+
+export interface DoclingWindowStats {
+  windows: number;
+  finalWindowPages: number;
+  memoryLimitMb: number | null;
+  maxRssKb: number | null;
+  /** Páginas [início, fim] não convertidas porque o prazo acabou */
+  skippedPages?: [number, number] | null;
+}
+
+/**
+ * Prazo da extração (opção deadlineS)
+ */
+export interface DoclingDeadlineInfo {
+  budgetMs: number;
+  skippedPages: [number, number] | null;
+}
+
+/**
+ * Contagem por situação no índice de códigos entre uploads (opção trackingIndex)
+ */
+export interface DoclingSeenStats {
+  new: number;
+  repeat: number;
+  delivered: number;
+  ms: number;
+}
+
+/**
+ * OCR seletivo: páginas sem camada de texto que passaram pelo OCR e o tempo de cada uma
+ */
+export interface DoclingOcrStats {
+  pages: number[];
+  textPages: number;
+  pageMs: Record<string, number>;
 }
 
 export interface DoclingMetadata {
@@ -29,6 +120,46 @@ export interface DoclingMetadata {
   extractedTotal: number;
   pagesProcessed: number;
   returnDate?: string;
+  workers?: number;
+  cache?: DoclingCacheInfo;
+  stages?: Record<string, number>;
+  tables?: DoclingTableStats[];
+  memory?: DoclingMemoryStats;
+  profile?: string;
+  pipeline?: DoclingPipelineProfile;
+  windows?: DoclingWindowStats;
+  ocr?: DoclingOcrStats;
+  /** Com deadlineS: true se o prazo acabou e parte do PDF veio só da camada de texto */
+  degraded?: boolean;
+  skippedStages?: string[];
+  deadline?: DoclingDeadlineInfo;
+  seen?: DoclingSeenStats;
+}
+
+/**
+ * Diff contra uma LDI anterior (opção diffAgainst): packages traz só os novos e
+ * alterados; removed traz os campos guardados dos que saíram da lista
+ */
+export interface DoclingPackageChange {
+  trackingCode: string;
+  changes: Record<string, { from: string | null; to: string | null }>;
+}
+
+export interface DoclingDiff {
+  against: string | null;
+  previousTotal: number;
+  added: string[];
+  changed: DoclingPackageChange[];
+  removed: Array<{
+    trackingCode: string;
+    recipient?: string;
+    position?: string;
+    pickupDeadline?: string | null;
+    lineNumber?: number;
+  }>;
+  unchanged: number;
+  /** Extração parcial (prazo) ou com falha: removed fica vazio */
+  partial?: boolean;
 }
 
 export interface DoclingParseResult {
@@ -38,10 +169,90 @@ export interface DoclingParseResult {
   errors: string[];
   warnings: string[];
   metadata: DoclingMetadata;
+  diff?: DoclingDiff;
+}
+
+export interface DoclingProgressEvent {
+  type: 'progress';
+  stage: 'page' | 'convert' | 'table';
+  [key: string]: unknown;
+}
+
+export interface DoclingBackendInfo {
+  available: boolean;
+  version: string | null;
+  importMs: number | null;
+  error: string | null;
+}
+
+/**
+ * Relatório do ldi_parser.py --probe
+ */
+export interface DoclingProbe {
+  python: string;
+  executable: string;
+  backends: Record<'docling' | 'pypdfium2' | 'pandas', DoclingBackendInfo>;
+  models: { available: boolean; path: string | null };
+  probeMs: number;
+}
+
+/**
+ * Callbacks do modo streaming: pacotes chegam assim que cada tabela é processada
+ */
+export interface DoclingStreamHandlers {
+  onPackage?: (pkg: DoclingPackageData) => void;
+  onProgress?: (event: DoclingProgressEvent) => void;
+}
+
+/**
+ * Opções do parser por pedido
+ */
+export interface DoclingParseOptions {
+  /** Resultado JSON ou índice de uma LDI anterior (só pacotes novos/alterados + diff) */
+  diffAgainst?: string;
+  /** Grava o índice por código de rastreio desta LDI neste caminho */
+  saveIndex?: string;
+  /** Lista de moradores (JSON [{id, name}]) para separar nomes mesclados e associar pacotes */
+  residents?: string;
+  /** Prazo em segundos: ao esgotar, devolve o resultado parcial (metadata.degraded) */
+  deadlineS?: number;
+  /** Índice SQLite de códigos entre uploads ("default" = diretório do cache): marca seenStatus */
+  trackingIndex?: string;
+}
+
+/**
+ * Opções de um job enviado ao serviço de ingestão (ldi_service.py)
+ */
+export interface LdiServiceJobOptions {
+  /** Socket Unix do serviço (padrão: LDI_SERVICE_SOCKET) */
+  socketPath?: string;
+  /** Upload de usuário esperando a resposta: passa na frente dos lotes (padrão: true) */
+  interactive?: boolean;
+  /** Prazo do job em segundos (padrão: o do serviço) */
+  deadlineS?: number;
+  /** Nome do JSON de saída no serviço ([A-Za-z0-9._-]; padrão: gerado pelo serviço, único) */
+  id?: string;
+  /** Quanto esperar pela resposta final, fila incluída (padrão: 15 minutos) */
+  timeoutMs?: number;
+}
+
+/**
+ * Resposta final do serviço para um job
+ */
+export interface LdiServiceJobOutcome {
+  id: string;
+  status: 'ok' | 'error' | 'timeout' | 'cancelled';
+  error: string | null;
+  output: string | null;
+  waitMs: number;
+  serviceMs: number;
+  packages?: number;
+  pages?: number;
 }
 
 // Caminho para o script Python
 const PYTHON_SCRIPT_PATH = path.join(__dirname, 'ldi_parser.py');
+const TRACKING_SCRIPT_PATH = path.join(__dirname, 'tracking_index.py');
 
 // Possíveis comandos Python (incluindo venv do Docker)
 const PYTHON_COMMANDS = [
@@ -53,10 +264,348 @@ const PYTHON_COMMANDS = [
   '/usr/local/bin/python3'
 ];
 
+// Timeout do --probe (inclui o import do Docling)
+const PROBE_TIMEOUT_MS = 60000;
+
+// Timeout de extração por PDF
+const EXTRACTION_TIMEOUT_MS = 120000; // 2 minutos
+// Job no serviço de ingestão: espera na fila + prazo do job (padrão do serviço: 300s)
+const SERVICE_WAIT_TIMEOUT_MS = 15 * 60 * 1000;
+
+// Tempo máximo para o worker carregar os modelos (primeira execução baixa ~2GB)
+const WORKER_STARTUP_TIMEOUT_MS = 300000; // 5 minutos
+
+// Worker persistente habilitado por padrão (DOCLING_WORKER=false volta ao spawn por PDF)
+const USE_PERSISTENT_WORKER = process.env.DOCLING_WORKER !== 'false';
+
+interface PendingRequest {
+  resolve: (message: any) => void;
+  reject: (error: Error) => void;
+  onEvent?: (message: any) => void;
+  timer: NodeJS.Timeout;
+  proc: ChildProcessWithoutNullStreams;
+}
+
+/**
+ * Pedido que passou do tempo dentro do worker (o PDF travou a conversão): não vale
+ * repetir num processo avulso, que levaria o mesmo tempo
+ */
+class WorkerTimeoutError extends Error {}
+
 /**
- * Encontra o comando Python disponível no sistema
+ * Resultado com os pacotes em colunas (ldi_parser.py --encoding columnar)
  */
-async function findPythonCommand(): Promise<string | null> {
+export interface DoclingColumnarResult extends Omit<DoclingParseResult, 'packages'> {
+  encoding: 'columnar';
+  packages: {
+    count: number;
+    /** Campos com o mesmo valor em todos os pacotes (datas do cabeçalho, prazo...) */
+    shared: Record<string, unknown>;
+    columns: Record<string, unknown[]>;
+    /** Por campo, os pacotes que não tinham a chave */
+    absent?: Record<string, number[]>;
+  };
+}
+
+/**
+ * Reconstrói a lista de pacotes de um resultado colunar (outros passam sem mudança)
+ */
+export function decodeColumnarResult(encoded: DoclingColumnarResult | DoclingParseResult): DoclingParseResult {
+  if ((encoded as DoclingColumnarResult).encoding !== 'columnar') {
+    return encoded as DoclingParseResult;
+  }
+  const { encoding, packages: block, ...rest } = encoded as DoclingColumnarResult;
+  const columnNames = Object.keys(block.columns);
+  // Um Set por coluna com ausentes: consulta O(1) por pacote em vez de varrer a lista
+  const absent = new Map<string, Set<number>>();
+  for (const [name, rows] of Object.entries(block.absent || {})) {
+    absent.set(name, new Set(rows));
+  }
+  const packages: DoclingPackageData[] = new Array(block.count);
+  for (let i = 0; i < block.count; i++) {
+    const pkg: Record<string, unknown> = { ...block.shared };
+    for (const name of columnNames) {
+      if (absent.get(name)?.has(i)) continue;
+      pkg[name] = block.columns[name][i];
+    }
+    packages[i] = pkg as unknown as DoclingPackageData;
+  }
+  return { ...rest, packages } as DoclingParseResult;
+}
+
+/**
+ * Sem callbacks por pacote não vale a pena o streaming: o resultado vem inteiro, colunar
+ */
+function wantsStream(handlers: DoclingStreamHandlers): boolean {
+  return Boolean(handlers.onPackage || handlers.onProgress);
+}
+
+/**
+ * Monta o resultado a partir das linhas NDJSON do parser (package, progress, summary)
+ * sem acumular o stdout inteiro em memória
+ */
+class StreamCollector {
+  readonly packages: DoclingPackageData[] = [];
+  summary: any = null;
+
+  constructor(private handlers: DoclingStreamHandlers = {}) {}
+
+  handle(message: any): void {
+    if (message.type === 'package') {
+      this.packages.push(message.package);
+      this.handlers.onPackage?.(message.package);
+    } else if (message.type === 'progress') {
+      this.handlers.onProgress?.(message);
+    } else if (message.type === 'summary' || message.encoding === 'columnar') {
+      this.summary = message;
+    }
+  }
+
+  build(): DoclingParseResult {
+    if (this.summary.encoding === 'columnar') {
+      return decodeColumnarResult(this.summary);
+    }
+    const { type, id, seen, ...summary } = this.summary;
+    // O summary traz a situação no índice só dos pacotes que não são novos
+    if (seen) {
+      for (const pkg of this.packages) {
+        const entry = seen[pkg.trackingCode];
+        pkg.seenStatus = entry ? entry.status : 'new';
+        if (entry) pkg.firstSeenAt = entry.firstSeenAt;
+      }
+    }
+    return { ...summary, packages: this.packages } as DoclingParseResult;
+  }
+}
+
+/**
+ * Worker Python persistente (ldi_parser.py --serve)
+ * Mantém o Docling e seus modelos carregados entre uploads, evitando o
+ * cold start (import + modelos de layout/TableFormer) a cada PDF.
+ * Protocolo: um pedido JSON por linha em stdin, uma resposta JSON por linha em stdout.
+ */
+class DoclingWorker {
+  private proc: ChildProcessWithoutNullStreams | null = null;
+  private ready: Promise<void> | null = null;
+  private pending = new Map<string, PendingRequest>();
+  private nextId = 1;
+  // O --serve atende um pedido por vez: os pedidos esperam aqui, e o timeout de cada
+  // um só começa quando ele é enviado ao worker
+  private queue: Promise<unknown> = Promise.resolve();
+
+  constructor(private pythonCmd: string) {}
+
+  private start(): Promise<void> {
+    if (this.ready) return this.ready;
+
+    this.ready = new Promise<void>((resolve, reject) => {
+      console.log(`🐍 Iniciando worker Docling: ${this.pythonCmd} ${PYTHON_SCRIPT_PATH} --serve`);
+
+      const proc = spawn(this.pythonCmd, [PYTHON_SCRIPT_PATH, '--serve'], {
+        env: { ...process.env, PYTHONUNBUFFERED: '1' }
+      });
+      this.proc = proc;
+
+      const startupTimer = setTimeout(() => {
+        reject(new Error('Timeout ao iniciar worker Docling'));
+        this.stop();
+      }, WORKER_STARTUP_TIMEOUT_MS);
+
+      readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+        let message: any;
+        try {
+          message = JSON.parse(line);
+        } catch {
+          console.warn(`⚠️ Worker Docling: resposta inválida: ${line.substring(0, 200)}`);
+          return;
+        }
+
+        if (message.type === 'ready') {
+          clearTimeout(startupTimer);
+          console.log(`🔥 Worker Docling pronto em ${message.loadTime}ms (pid ${message.pid})`);
+          resolve();
+          return;
+        }
+
+        const id = message.id != null ? String(message.id) : null;
+        const request = id ? this.pending.get(id) : undefined;
+        if (!id || !request) return;
+
+        // Eventos intermediários do modo streaming não encerram o pedido
+        if (message.type === 'package' || message.type === 'progress') {
+          request.onEvent?.(message);
+          return;
+        }
+
+        this.pending.delete(id);
+        clearTimeout(request.timer);
+        if (message.type === 'error') {
+          request.reject(new Error(message.error));
+        } else {
+          request.resolve(message);
+        }
+      });
+
+      proc.stderr.on('data', (data) => {
+        console.log(`📝 Docling: ${data.toString().trim()}`);
+      });
+
+      // EPIPE ao escrever num worker que acabou de morrer: o 'close' rejeita os pedidos
+      proc.stdin.on('error', (error) => {
+        console.warn(`⚠️ Worker Docling: erro no stdin: ${error.message}`);
+      });
+
+      proc.on('error', (error) => {
+        clearTimeout(startupTimer);
+        reject(error);
+        this.handleExit(proc, `Erro no worker Docling: ${error.message}`);
+      });
+
+      proc.on('close', (code) => {
+        clearTimeout(startupTimer);
+        reject(new Error(`Worker Docling terminou com código ${code}`));
+        this.handleExit(proc, `Worker Docling terminou com código ${code}`);
+      });
+    });
+
+    return this.ready;
+  }
+
+  private handleExit(proc: ChildProcessWithoutNullStreams, reason: string): void {
+    // Um worker antigo (encerrado por timeout) não derruba o que já o substituiu
+    if (this.proc === proc) {
+      this.proc = null;
+      this.ready = null;
+    }
+    for (const [id, request] of this.pending) {
+      if (request.proc !== proc) continue;
+      clearTimeout(request.timer);
+      request.reject(new Error(reason));
+      this.pending.delete(id);
+    }
+  }
+
+  request(
+    message: Record<string, unknown>,
+    timeoutMs: number = EXTRACTION_TIMEOUT_MS,
+    onEvent?: (message: any) => void
+  ): Promise<any> {
+    const run = () => this.send(message, timeoutMs, onEvent);
+    const result = this.queue.then(run, run);
+    this.queue = result.catch(() => undefined);
+    return result;
+  }
+
+  private async send(
+    message: Record<string, unknown>,
+    timeoutMs: number,
+    onEvent?: (message: any) => void
+  ): Promise<any> {
+    await this.start();
+    const proc = this.proc;
+    if (!proc) {
+      throw new Error('Worker Docling indisponível');
+    }
+
+    const id = String(this.nextId++);
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new WorkerTimeoutError(`Timeout de ${timeoutMs}ms no worker Docling`));
+        // PDF travado: reinicia o worker; os pedidos da fila sobem um worker novo
+        this.stop();
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve, reject, onEvent, timer, proc });
+      proc.stdin.write(JSON.stringify({ ...message, id }) + '\n');
+    });
+  }
+
+  async parse(
+    pdfPath: string,
+    handlers: DoclingStreamHandlers = {},
+    options: DoclingParseOptions = {}
+  ): Promise<DoclingParseResult> {
+    if (!wantsStream(handlers)) {
+      const message = await this.request({ type: 'parse', path: pdfPath, encoding: 'columnar', ...options });
+      return decodeColumnarResult(message.result);
+    }
+    const collector = new StreamCollector(handlers);
+    const summary = await this.request(
+      { type: 'parse', path: pdfPath, stream: true, ...options },
+      EXTRACTION_TIMEOUT_MS,
+      (message) => collector.handle(message)
+    );
+    collector.handle(summary);
+    return collector.build();
+  }
+
+  async ping(): Promise<boolean> {
+    try {
+      await this.request({ type: 'ping' }, 5000);
+      return true;
+    } catch {
+      return false;
+    }
+  }
+
+  async shutdown(): Promise<void> {
+    if (!this.proc) return;
+    try {
+      await this.request({ type: 'shutdown' }, 5000);
+    } catch {
+      this.stop();
+    }
+  }
+
+  stop(): void {
+    const proc = this.proc;
+    if (!proc) return;
+    // Desliga já o worker atual: o próximo pedido não escreve num processo morrendo
+    this.proc = null;
+    this.ready = null;
+    proc.kill();
+  }
+}
+
+let worker: DoclingWorker | null = null;
+
+function getWorker(pythonCmd: string): DoclingWorker {
+  if (!worker) {
+    worker = new DoclingWorker(pythonCmd);
+  }
+  return worker;
+}
+
+/**
+ * Encerra o worker persistente (usado no shutdown do servidor)
+ */
+export async function shutdownDoclingWorker(): Promise<void> {
+  if (worker) {
+    await worker.shutdown();
+    worker = null;
+  }
+}
+
+// Comando Python e relatório do --probe, descobertos uma vez por processo
+let pythonCommand: Promise<string | null> | null = null;
+let probeResult: Promise<DoclingProbe | null> | null = null;
+
+/**
+ * Encontra o comando Python disponível no sistema (resultado em cache; uma
+ * busca sem sucesso é refeita na próxima chamada)
+ */
+function findPythonCommand(): Promise<string | null> {
+  if (!pythonCommand) {
+    pythonCommand = searchPythonCommand().then((cmd) => {
+      if (!cmd) pythonCommand = null;
+      return cmd;
+    });
+  }
+  return pythonCommand;
+}
+
+async function searchPythonCommand(): Promise<string | null> {
   for (const cmd of PYTHON_COMMANDS) {
     try {
       const result = await new Promise<boolean>((resolve) => {
@@ -75,11 +624,22 @@ async function findPythonCommand(): Promise<string | null> {
 }
 
 /**
- * Verifica se o Docling está instalado
+ * Executa ldi_parser.py --probe uma vez e guarda o relatório de backends
+ * (uma falha no probe é refeita na próxima chamada)
  */
-async function checkDoclingInstalled(pythonCmd: string): Promise<boolean> {
+function probeBackends(pythonCmd: string): Promise<DoclingProbe | null> {
+  if (!probeResult) {
+    probeResult = runProbe(pythonCmd).then((report) => {
+      if (!report) probeResult = null;
+      return report;
+    });
+  }
+  return probeResult;
+}
+
+function runProbe(pythonCmd: string): Promise<DoclingProbe | null> {
   return new Promise((resolve) => {
-    const proc = spawn(pythonCmd, ['-c', 'import docling; print("ok")']);
+    const proc = spawn(pythonCmd, [PYTHON_SCRIPT_PATH, '--probe'], { timeout: PROBE_TIMEOUT_MS });
     let output = '';
     
     proc.stdout.on('data', (data) => {
@@ -87,20 +647,71 @@ async function checkDoclingInstalled(pythonCmd: string): Promise<boolean> {
     });
     
     proc.on('close', (code) => {
-      resolve(code === 0 && output.includes('ok'));
+      if (code !== 0) {
+        resolve(null);
+        return;
+      }
+      try {
+        const report: DoclingProbe = JSON.parse(output);
+        const docling = report.backends.docling;
+        console.log(`🔎 Backends Python: docling ${docling?.available ? `${docling.version} (import ${docling.importMs}ms)` : 'indisponível'}, ` +
+          `modelos ${report.models.available ? 'baixados' : 'ausentes'}`);
+        resolve(report);
+      } catch {
+        resolve(null);
+      }
     });
     
-    proc.on('error', () => resolve(false));
+    proc.on('error', () => resolve(null));
   });
 }
 
+/**
+ * Verifica se o Docling está instalado (via relatório do --probe em cache)
+ */
+async function checkDoclingInstalled(pythonCmd: string): Promise<boolean> {
+  const report = await probeBackends(pythonCmd);
+  return Boolean(report?.backends.docling?.available);
+}
+
+/**
+ * Relatório de backends Python (docling, pypdfium2, pandas): versões, tempo de
+ * import e modelos do Docling. Null se o Python ou o script não estiverem disponíveis.
+ */
+export async function probeDocling(): Promise<DoclingProbe | null> {
+  const pythonCmd = await findPythonCommand();
+  if (!pythonCmd) return null;
+  return probeBackends(pythonCmd);
+}
+
+/**
+ * Evita repetir onPackage quando o worker falha no meio e o PDF é reprocessado
+ */
+function dedupeHandlers(handlers: DoclingStreamHandlers): DoclingStreamHandlers {
+  const seen = new Set<string>();
+  return {
+    onProgress: handlers.onProgress,
+    onPackage: handlers.onPackage && ((pkg) => {
+      if (seen.has(pkg.trackingCode)) return;
+      seen.add(pkg.trackingCode);
+      handlers.onPackage!(pkg);
+    })
+  };
+}
+
 /**
  * Extrai dados de um PDF usando Docling
  * 
  * @param pdfPath - Caminho para o arquivo PDF
+ * @param handlers - Callbacks opcionais para receber pacotes/progresso durante a extração
+ * @param options - Diff contra uma LDI anterior / gravação do índice (ver DoclingParseOptions)
  * @returns Resultado da extração com pacotes e metadados
  */
-export async function extractWithDocling(pdfPath: string): Promise<DoclingParseResult> {
+export async function extractWithDocling(
+  pdfPath: string,
+  handlers: DoclingStreamHandlers = {},
+  options: DoclingParseOptions = {}
+): Promise<DoclingParseResult> {
   const defaultResult: DoclingParseResult = {
     success: false,
     totalPackages: 0,
@@ -145,20 +756,67 @@ export async function extractWithDocling(pdfPath: string): Promise<DoclingParseR
     return defaultResult;
   }
 
+  const streamHandlers = dedupeHandlers(handlers);
+
+  if (USE_PERSISTENT_WORKER) {
+    const startTime = Date.now();
+    try {
+      const result = await getWorker(pythonCmd).parse(pdfPath, streamHandlers, options);
+      result.metadata.processingTime = Date.now() - startTime;
+      console.log(`✅ Docling (worker) extraiu ${result.totalPackages} pacotes em ${result.metadata.processingTime}ms`);
+      return result;
+    } catch (error: any) {
+      if (error instanceof WorkerTimeoutError) {
+        defaultResult.errors.push(error.message);
+        defaultResult.metadata.processingTime = Date.now() - startTime;
+        return defaultResult;
+      }
+      console.warn(`⚠️ Worker Docling falhou (${error.message}), executando processo avulso`);
+    }
+  }
+
+  return runOneShot(pythonCmd, pdfPath, defaultResult, streamHandlers, options);
+}
+
+/**
+ * Executa ldi_parser.py em um processo novo para um único PDF (saída NDJSON, ou
+ * uma linha colunar quando não há callbacks)
+ */
+function runOneShot(
+  pythonCmd: string,
+  pdfPath: string,
+  defaultResult: DoclingParseResult,
+  handlers: DoclingStreamHandlers = {},
+  options: DoclingParseOptions = {}
+): Promise<DoclingParseResult> {
   return new Promise((resolve) => {
     const startTime = Date.now();
-    let stdout = '';
+    const collector = new StreamCollector(handlers);
+    const invalidLines: string[] = [];
     let stderr = '';
 
-    console.log(`🐍 Executando Docling: ${pythonCmd} ${PYTHON_SCRIPT_PATH} ${pdfPath}`);
+    const args = [PYTHON_SCRIPT_PATH, pdfPath];
+    args.push(...(wantsStream(handlers) ? ['--stream'] : ['--encoding', 'columnar']));
+    if (options.diffAgainst) args.push('--diff-against', options.diffAgainst);
+    if (options.saveIndex) args.push('--save-index', options.saveIndex);
+    if (options.residents) args.push('--residents', options.residents);
+    if (options.deadlineS) args.push('--deadline', String(options.deadlineS));
+    if (options.trackingIndex) args.push('--tracking-index', options.trackingIndex);
 
-    const proc = spawn(pythonCmd, [PYTHON_SCRIPT_PATH, pdfPath], {
-      timeout: 120000, // 2 minutos timeout
+    console.log(`🐍 Executando Docling: ${pythonCmd} ${args.join(' ')}`);
+
+    const proc = spawn(pythonCmd, args, {
+      timeout: EXTRACTION_TIMEOUT_MS,
       env: { ...process.env, PYTHONUNBUFFERED: '1' }
     });
 
-    proc.stdout.on('data', (data) => {
-      stdout += data.toString();
+    readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+      if (!line.trim()) return;
+      try {
+        collector.handle(JSON.parse(line));
+      } catch {
+        invalidLines.push(line.substring(0, 200));
+      }
     });
 
     proc.stderr.on('data', (data) => {
@@ -173,6 +831,9 @@ export async function extractWithDocling(pdfPath: string): Promise<DoclingParseR
 
       if (code !== 0) {
         defaultResult.errors.push(`Processo Python terminou com código ${code}`);
+        if (collector.summary?.errors) {
+          defaultResult.errors.push(...collector.summary.errors);
+        }
         if (stderr) {
           defaultResult.errors.push(stderr.trim());
         }
@@ -181,19 +842,21 @@ export async function extractWithDocling(pdfPath: string): Promise<DoclingParseR
         return;
       }
 
-      try {
-        // Parse do JSON retornado pelo Python
-        const result = JSON.parse(stdout.trim()) as DoclingParseResult;
-        result.metadata.processingTime = processingTime;
-        
-        console.log(`✅ Docling extraiu ${result.totalPackages} pacotes`);
-        resolve(result);
-      } catch (parseError) {
-        defaultResult.errors.push(`Erro ao parsear resposta do Python: ${parseError}`);
-        defaultResult.errors.push(`Stdout: ${stdout.substring(0, 500)}`);
+      if (!collector.summary) {
+        defaultResult.errors.push('Resposta do Python sem resultado');
+        if (invalidLines.length > 0) {
+          defaultResult.errors.push(`Stdout: ${invalidLines.join('\n').substring(0, 500)}`);
+        }
         defaultResult.metadata.processingTime = processingTime;
         resolve(defaultResult);
+        return;
       }
+
+      const result = collector.build();
+      result.metadata.processingTime = processingTime;
+
+      console.log(`✅ Docling extraiu ${result.totalPackages} pacotes`);
+      resolve(result);
     });
 
     proc.on('error', (error) => {
@@ -210,9 +873,16 @@ export async function extractWithDocling(pdfPath: string): Promise<DoclingParseR
  * 
  * @param buffer - Buffer do arquivo PDF
  * @param fileName - Nome original do arquivo
+ * @param handlers - Callbacks opcionais de streaming (ver extractWithDocling)
+ * @param options - Opções do parser (ver extractWithDocling)
  * @returns Resultado da extração
  */
-export async function extractBufferWithDocling(buffer: Buffer, fileName: string = 'upload.pdf'): Promise<DoclingParseResult> {
+export async function extractBufferWithDocling(
+  buffer: Buffer,
+  fileName: string = 'upload.pdf',
+  handlers: DoclingStreamHandlers = {},
+  options: DoclingParseOptions = {}
+): Promise<DoclingParseResult> {
   const tempPath = path.join('/tmp', `docling-${Date.now()}-${fileName}`);
   
   try {
@@ -220,7 +890,7 @@ export async function extractBufferWithDocling(buffer: Buffer, fileName: string
     fs.writeFileSync(tempPath, buffer);
     
     // Processar com Docling
-    const result = await extractWithDocling(tempPath);
+    const result = await extractWithDocling(tempPath, handlers, options);
     result.metadata.fileName = fileName;
     
     return result;
@@ -236,6 +906,120 @@ export async function extractBufferWithDocling(buffer: Buffer, fileName: string
   }
 }
 
+/**
+ * Envia o PDF à fila do serviço de ingestão (ldi_service.py --socket) e espera o
+ * job terminar. O caminho precisa ser legível pelo serviço (mesma máquina/volume).
+ * 
+ * @param pdfPath - Caminho para o arquivo PDF
+ * @param options - Socket, prioridade e prazo (ver LdiServiceJobOptions)
+ * @returns Resultado da extração (lido do JSON gravado pelo serviço)
+ */
+export function submitToLdiService(
+  pdfPath: string,
+  options: LdiServiceJobOptions = {}
+): Promise<DoclingParseResult> {
+  const socketPath = options.socketPath || process.env.LDI_SERVICE_SOCKET;
+  if (!socketPath) {
+    return Promise.reject(new Error('Socket do serviço não configurado (LDI_SERVICE_SOCKET)'));
+  }
+  
+  return new Promise((resolve, reject) => {
+    const socket = net.createConnection(socketPath);
+    const lines = readline.createInterface({ input: socket });
+    const timeoutMs = options.timeoutMs ?? SERVICE_WAIT_TIMEOUT_MS;
+    let settled = false;
+    const settle = () => {
+      settled = true;
+      clearTimeout(timer);
+    };
+    const fail = (error: Error) => {
+      if (settled) return;
+      settle();
+      socket.destroy();
+      reject(error);
+    };
+    const timer = setTimeout(() => {
+      fail(new Error(`Timeout de ${timeoutMs}ms esperando o serviço de ingestão`));
+    }, timeoutMs);
+    
+    socket.on('connect', () => {
+      socket.write(JSON.stringify({
+        type: 'submit',
+        id: options.id,
+        path: pdfPath,
+        interactive: options.interactive ?? true,
+        deadlineS: options.deadlineS,
+        wait: true
+      }) + '\n');
+    });
+    socket.on('error', fail);
+    // Serviço caiu ou fechou a conexão antes do "done": a promessa não fica pendente
+    socket.on('close', () => {
+      fail(new Error('Serviço de ingestão fechou a conexão antes do resultado'));
+    });
+    
+    lines.on('line', (line) => {
+      let message: any;
+      try {
+        message = JSON.parse(line);
+      } catch {
+        return;
+      }
+      if (message.type === 'error') {
+        fail(new Error(message.error));
+      } else if (message.type === 'done') {
+        if (settled) return;
+        settle();
+        socket.end();
+        const outcome = message as LdiServiceJobOutcome;
+        if (!outcome.output) {
+          reject(new Error(outcome.error || `Job ${outcome.id}: ${outcome.status}`));
+          return;
+        }
+        try {
+          resolve(JSON.parse(fs.readFileSync(outcome.output, 'utf-8')) as DoclingParseResult);
+        } catch (e) {
+          reject(e instanceof Error ? e : new Error(String(e)));
+        }
+      }
+    });
+  });
+}
+
+/**
+ * Marca códigos como entregues no índice de códigos (tracking_index.py delivered),
+ * para as próximas LDIs os trazerem com seenStatus "delivered".
+ * Retorna quantos códigos conhecidos foram atualizados.
+ */
+export async function markPackagesDelivered(codes: string[], trackingIndex?: string): Promise<number> {
+  const pythonCmd = await findPythonCommand();
+  if (!pythonCmd) throw new Error('Python não encontrado');
+  if (codes.length === 0) return 0;
+  
+  const args = [TRACKING_SCRIPT_PATH, 'delivered', ...codes];
+  if (trackingIndex) args.push('--index', trackingIndex);
+  
+  return new Promise((resolve, reject) => {
+    const proc = spawn(pythonCmd, args, { timeout: PROBE_TIMEOUT_MS });
+    let stdout = '';
+    let stderr = '';
+    proc.stdout.on('data', (data) => { stdout += data.toString(); });
+    proc.stderr.on('data', (data) => { stderr += data.toString(); });
+    proc.on('error', reject);
+    proc.on('close', (code) => {
+      if (code !== 0) {
+        reject(new Error(`tracking_index.py saiu com código ${code}: ${stderr.trim()}`));
+        return;
+      }
+      try {
+        resolve(JSON.parse(stdout).updated as number);
+      } catch (e) {
+        reject(e instanceof Error ? e : new Error(String(e)));
+      }
+    });
+  });
+}
+
 /**
  * Verifica se o Docling está disponível no sistema
  */
@@ -249,5 +1033,10 @@ export async function isDoclingAvailable(): Promise<boolean> {
 export default {
   extractWithDocling,
   extractBufferWithDocling,
-  isDoclingAvailable
+  isDoclingAvailable,
+  probeDocling,
+  submitToLdiService,
+  markPackagesDelivered,
+  decodeColumnarResult,
+  shutdownDoclingWorker
 };
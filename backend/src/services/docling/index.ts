@@ -8,7 +8,30 @@ export {
   extractWithDocling,
   extractBufferWithDocling,
   isDoclingAvailable,
+  probeDocling,
+  submitToLdiService,
+  markPackagesDelivered,
+  decodeColumnarResult,
+  shutdownDoclingWorker,
   DoclingPackageData,
   DoclingMetadata,
-  DoclingParseResult
+  DoclingCacheInfo,
+  DoclingTableStats,
+  DoclingMemoryStats,
+  DoclingPipelineProfile,
+  DoclingWindowStats,
+  DoclingOcrStats,
+  DoclingDeadlineInfo,
+  DoclingSeenStats,
+  DoclingProbe,
+  DoclingBackendInfo,
+  DoclingParseResult,
+  DoclingColumnarResult,
+  DoclingParseOptions,
+  DoclingDiff,
+  DoclingPackageChange,
+  DoclingProgressEvent,
+  DoclingStreamHandlers,
+  LdiServiceJobOptions,
+  LdiServiceJobOutcome
 } from './doclingWrapper';
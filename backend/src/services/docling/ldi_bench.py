@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Benchmark do LDI Parser
+Mede vazão, latência (p50/p95), memória de pico e recall/precisão de parse_ldi_pdf
+por estratégia e de extract_packages_from_table isolado, sobre um corpus com
+gabarito (ldi_synth.py). O resultado é gravado em JSON para comparar entre commits.
+
+Uso:
+    python ldi_bench.py corpus/ [--strategies text,auto,docling] [--repeat 3]
+    python ldi_bench.py corpus/ --generate --compare bench_results/anterior.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ldi_utils import percentile
+
+
+DEFAULT_STRATEGIES = ("text", "auto", "docling")
+DEFAULT_OUTPUT_DIR = "bench_results"
+
+# Regressão de latência (p95) acima disso faz o --compare falhar
+DEFAULT_MAX_REGRESSION = 0.2
+
+
+def load_corpus(corpus_dir: Path) -> List[Dict[str, Any]]:
+    """Pares (PDF, gabarito) do corpus, do menor para o maior."""
+    items = []
+    for truth_path in sorted(corpus_dir.glob("*.truth.json")):
+        with open(truth_path, "r", encoding="utf-8") as f:
+            truth = json.load(f)
+        pdf_path = truth_path.with_name(truth["fileName"])
+        if pdf_path.exists():
+            items.append({"pdf": str(pdf_path), "truth": truth})
+    return sorted(items, key=lambda item: item["truth"]["expectedTotal"])
+
+
+def score(packages: List[Dict[str, Any]], truth: Dict[str, Any]) -> Dict[str, Any]:
+    """Recall, precisão e acerto de nomes em relação ao gabarito."""
+    expected = {pkg["trackingCode"]: pkg for pkg in truth["packages"]}
+    found = {pkg["trackingCode"]: pkg for pkg in packages}
+    matched = [code for code in found if code in expected]
+    names_ok = sum(1 for code in matched if found[code].get("recipient") == expected[code]["recipient"])
+    return {
+        "expected": len(expected),
+        "found": len(found),
+        "matched": len(matched),
+        "recall": round(len(matched) / len(expected), 4) if expected else 1.0,
+        "precision": round(len(matched) / len(found), 4) if found else 0.0,
+        "nameAccuracy": round(names_ok / len(matched), 4) if matched else 0.0
+    }
+
+
+def latency_stats(latencies_ms: List[float], total_pages: int, total_packages: int) -> Dict[str, Any]:
+    total_s = sum(latencies_ms) / 1000
+    return {
+        "runs": len(latencies_ms),
+        "p50Ms": round(percentile(latencies_ms, 50), 1),
+        "p95Ms": round(percentile(latencies_ms, 95), 1),
+        "maxMs": round(max(latencies_ms), 1) if latencies_ms else 0.0,
+        "totalMs": round(total_s * 1000, 1),
+        "pagesPerSecond": round(total_pages / total_s, 2) if total_s else 0.0,
+        "packagesPerSecond": round(total_packages / total_s, 1) if total_s else 0.0
+    }
+
+
+def _aggregate_scores(scores: List[Dict[str, Any]]) -> Dict[str, Any]:
+    expected = sum(s["expected"] for s in scores)
+    found = sum(s["found"] for s in scores)
+    matched = sum(s["matched"] for s in scores)
+    names = sum(s["nameAccuracy"] * s["matched"] for s in scores)
+    return {
+        "recall": round(matched / expected, 4) if expected else 1.0,
+        "precision": round(matched / found, 4) if found else 0.0,
+        "nameAccuracy": round(names / matched, 4) if matched else 0.0
+    }
+
+
+def bench_strategy(strategy: str, corpus: List[Dict[str, Any]], repeat: int,
+                   warmup: bool = True, pipeline: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Executado num processo próprio (memória de pico isolada por estratégia): roda
+    parse_ldi_pdf sem cache `repeat` vezes em cada PDF do corpus.
+    """
+    import ldi_parser
+    from ldi_metrics import peak_memory
+
+    started = time.perf_counter()
+    if warmup and corpus:
+        # Carrega modelos/imports fora da medição (o worker --serve faz o mesmo)
+        ldi_parser.parse_ldi_pdf(corpus[0]["pdf"], strategy=strategy, use_cache=False,
+                                 workers=1, pipeline=pipeline)
+    warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    files = []
+    latencies = []
+    scores = []
+    pages = packages = 0
+    for item in corpus:
+        runs = []
+        result = None
+        for _ in range(repeat):
+            run_started = time.perf_counter()
+            result = ldi_parser.parse_ldi_pdf(item["pdf"], strategy=strategy, use_cache=False,
+                                              pipeline=pipeline)
+            runs.append((time.perf_counter() - run_started) * 1000)
+        file_score = score(result["packages"], item["truth"])
+        latencies.extend(runs)
+        scores.append(file_score)
+        pages += item["truth"]["pages"] * repeat
+        packages += len(result["packages"]) * repeat
+        files.append({
+            "file": Path(item["pdf"]).name,
+            "objects": item["truth"]["expectedTotal"],
+            "pages": item["truth"]["pages"],
+            "strategyUsed": result["metadata"].get("strategy"),
+            "errors": result["errors"],
+            "p50Ms": round(percentile(runs, 50), 1),
+            **file_score
+        })
+        print(f"  {strategy:8s} {Path(item['pdf']).name}: {percentile(runs, 50):.0f}ms "
+              f"recall={file_score['recall']:.3f} nomes={file_score['nameAccuracy']:.3f}", file=sys.stderr)
+
+    ldi_parser.shutdown_pool()
+    return {
+        "strategy": strategy,
+        "warmupMs": warmup_ms,
+        **latency_stats(latencies, pages, packages),
+        **_aggregate_scores(scores),
+        "memory": peak_memory(),
+        "files": files
+    }
+
+
+def bench_table_extraction(corpus: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    """extract_packages_from_table isolado, sobre a grade de tabela do gabarito."""
+    from ldi_parser import extract_packages_from_table
+
+    files = []
+    latencies = []
+    scores = []
+    rows = packages = 0
+    for item in corpus:
+        grid = item["truth"]["tableGrid"]
+        runs = []
+        extracted: List[Dict[str, Any]] = []
+        for _ in range(repeat):
+            run_started = time.perf_counter()
+            extracted = extract_packages_from_table(grid)
+            runs.append((time.perf_counter() - run_started) * 1000)
+        file_score = score(extracted, item["truth"])
+        latencies.extend(runs)
+        scores.append(file_score)
+        rows += (len(grid) - 1) * repeat
+        packages += len(extracted) * repeat
+        files.append({
+            "file": Path(item["pdf"]).name,
+            "rows": len(grid) - 1,
+            "p50Ms": round(percentile(runs, 50), 3),
+            **file_score
+        })
+
+    stats = latency_stats(latencies, 0, packages)
+    stats.pop("pagesPerSecond")
+    total_s = stats["totalMs"] / 1000
+    stats["rowsPerSecond"] = round(rows / total_s, 1) if total_s else 0.0
+    return {**stats, **_aggregate_scores(scores), "files": files}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_bench(corpus_dir: Path, strategies: List[str], repeat: int,
+              pipeline: Optional[str] = None) -> Dict[str, Any]:
+    """Roda todas as estratégias (uma por processo) e a extração de tabela isolada."""
+    corpus = load_corpus(corpus_dir)
+    if not corpus:
+        raise FileNotFoundError(f"Nenhum PDF com gabarito em {corpus_dir} (gere com ldi_synth.py)")
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "createdAt": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "corpus": {
+            "dir": str(corpus_dir),
+            "files": len(corpus),
+            "objects": sum(item["truth"]["expectedTotal"] for item in corpus),
+            "pages": sum(item["truth"]["pages"] for item in corpus)
+        },
+        "repeat": repeat,
+        "strategies": {}
+    }
+
+    # spawn: cada estratégia começa com memória limpa, então o RSS de pico é só dela
+    context = multiprocessing.get_context("spawn")
+    for strategy in strategies:
+        print(f"⏱ Estratégia {strategy}...", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                report["strategies"][strategy] = executor.submit(
+                    bench_strategy, strategy, corpus, repeat, True, pipeline
+                ).result()
+            except Exception as e:
+                print(f"  ⚠ Estratégia {strategy} falhou: {e}", file=sys.stderr)
+                report["strategies"][strategy] = {"strategy": strategy, "error": str(e)}
+
+    print("⏱ extract_packages_from_table isolado...", file=sys.stderr)
+    report["tableExtraction"] = bench_table_extraction(corpus, max(repeat, 5))
+    return report
+
+
+def compare_reports(current: Dict[str, Any], previous: Dict[str, Any],
+                    max_regression: float = DEFAULT_MAX_REGRESSION) -> List[str]:
+    """Lista as regressões de p95 e de recall em relação a um relatório anterior."""
+    regressions = []
+    sections = [(f"strategy:{name}", data, previous.get("strategies", {}).get(name))
+                for name, data in current.get("strategies", {}).items()]
+    sections.append(("tableExtraction", current.get("tableExtraction"), previous.get("tableExtraction")))
+
+    for label, now, before in sections:
+        if not now or not before or "error" in now or "error" in before:
+            continue
+        if before.get("p95Ms") and now["p95Ms"] > before["p95Ms"] * (1 + max_regression):
+            regressions.append(f"{label}: p95 {before['p95Ms']}ms -> {now['p95Ms']}ms")
+        if now.get("recall", 1) < before.get("recall", 0):
+            regressions.append(f"{label}: recall {before['recall']} -> {now['recall']}")
+    return regressions
+
+
+def main():
+    """Função principal - imprime o resumo em JSON e grava o relatório completo."""
+    parser = argparse.ArgumentParser(description="Benchmark do LDI Parser sobre corpus sintético")
+    parser.add_argument("corpus_dir", help="diretório com PDFs e <nome>.truth.json (ldi_synth.py)")
+    parser.add_argument("--generate", action="store_true",
+                        help="gera o corpus padrão com ldi_synth.py se o diretório estiver vazio")
+    parser.add_argument("--strategies", default=",".join(DEFAULT_STRATEGIES),
+                        help="estratégias, separadas por vírgula (padrão: text,auto,docling)")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por PDF (padrão: 3)")
+    parser.add_argument("--pipeline", default=None, help="perfil de conversão do Docling")
+    parser.add_argument("--output", default=None,
+                        help=f"arquivo do relatório (padrão: {DEFAULT_OUTPUT_DIR}/ldi_bench_<commit>_<data>.json)")
+    parser.add_argument("--compare", default=None, help="relatório anterior para detectar regressões")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="aumento máximo aceito no p95 (fração, padrão: 0.2)")
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus_dir)
+    if args.generate and not any(corpus_dir.glob("*.truth.json")):
+        from ldi_synth import generate_corpus
+        generate_corpus(corpus_dir)
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    try:
+        report = run_bench(corpus_dir, strategies, max(1, args.repeat), args.pipeline)
+    except FileNotFoundError as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = compare_reports(report, previous, args.max_regression)
+        report["comparedWith"] = {"file": args.compare, "commit": previous.get("commit"),
+                                  "regressions": regressions}
+
+    output = Path(args.output) if args.output else Path(DEFAULT_OUTPUT_DIR) / (
+        f"ldi_bench_{report['commit'] or 'local'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    summary = {
+        name: {key: data.get(key) for key in ("p50Ms", "p95Ms", "pagesPerSecond", "recall",
+                                              "precision", "nameAccuracy", "error") if key in data}
+        for name, data in report["strategies"].items()
+    }
+    summary["tableExtraction"] = {key: report["tableExtraction"][key]
+                                  for key in ("p50Ms", "p95Ms", "rowsPerSecond", "recall", "precision")}
+    for regression in regressions:
+        print(f"❌ Regressão: {regression}", file=sys.stderr)
+    print(f"📊 Relatório: {output}", file=sys.stderr)
+    print(json.dumps({"success": not regressions, "report": str(output), "summary": summary},
+                     ensure_ascii=False))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
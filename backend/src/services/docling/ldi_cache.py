@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Cache local do LDI Parser
+Guarda resultados e conversões do Docling em SQLite, endereçados pelo conteúdo do PDF.
+Independente do cache do Node (utils/pdfCache.ts): vale também para execuções via CLI
+e reprocessamentos em lote.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+# Diretório e tamanho máximo padrão (sobrescritos por LDI_CACHE_DIR / LDI_CACHE_MAX_MB)
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "ldi_parser"
+DEFAULT_MAX_MB = 256
+
+# Tipos de entrada: resultado final do parser e conversão intermediária do Docling
+KIND_RESULT = "result"
+KIND_CONVERSION = "conversion"
+
+
+def file_sha256(path: str) -> str:
+    """Calcula o SHA-256 do arquivo em blocos."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache SQLite com despejo LRU limitado por tamanho.
+
+    Cada entrada é identificada por (kind, key). Os valores são JSON comprimido com
+    zlib. Quando o total passa de max_bytes, as entradas acessadas há mais tempo
+    são removidas.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        if path is None:
+            cache_dir = Path(os.environ.get("LDI_CACHE_DIR") or DEFAULT_CACHE_DIR)
+            path = str(cache_dir / "ldi_cache.sqlite3")
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("LDI_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Reabrir após fork: conexões SQLite não podem ser compartilhadas entre processos
+        if self._conn is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _count(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """Retorna o valor guardado ou None (contabiliza hit/miss)."""
+        try:
+            return self._get(kind, key)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            # Cache é opcional: falhas de disco/banco nunca interrompem o parse
+            print(f"⚠ Cache LDI indisponível: {e}", file=sys.stderr)
+            return None
+
+    def _get(self, kind: str, key: str) -> Optional[Any]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT payload FROM entries WHERE kind = ? AND key = ?", (kind, key)
+        ).fetchone()
+
+        if row is None:
+            self._count(conn, f"{kind}_misses")
+            conn.commit()
+            return None
+
+        try:
+            value = json.loads(zlib.decompress(row[0]))
+        except (zlib.error, ValueError) as e:
+            # Entrada corrompida (gravação interrompida, disco): apagar e tratar como miss,
+            # para a próxima extração gravar de novo em vez de falhar sempre na mesma linha
+            print(f"⚠ Entrada corrompida no cache LDI ({kind}), removendo: {e}", file=sys.stderr)
+            conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+            self._count(conn, f"{kind}_misses")
+            conn.commit()
+            return None
+
+        conn.execute(
+            "UPDATE entries SET accessed = ? WHERE kind = ? AND key = ?", (time.time(), kind, key)
+        )
+        self._count(conn, f"{kind}_hits")
+        conn.commit()
+        return value
+
+    def put(self, kind: str, key: str, value: Any) -> None:
+        """Guarda o valor e despeja entradas antigas se o limite de tamanho foi excedido."""
+        try:
+            self._put(kind, key, value)
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            print(f"⚠ Não foi possível gravar no cache LDI: {e}", file=sys.stderr)
+
+    def _put(self, kind: str, key: str, value: Any) -> None:
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if len(payload) > self.max_bytes:
+            return
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (kind, key, size, created, accessed, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, key, len(payload), now, now, payload)
+        )
+        self._evict(conn)
+        conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for kind, key, size in conn.execute(
+            "SELECT kind, key, size FROM entries ORDER BY accessed ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+            total -= size
+            evicted += 1
+        print(f"🧹 Cache LDI: {evicted} entradas antigas removidas", file=sys.stderr)
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores acumulados e ocupação atual do cache."""
+        try:
+            return self._stats()
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠ Cache LDI indisponível: {e}", file=sys.stderr)
+            return {}
+
+    def _stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {
+            "hits": counters.get(f"{KIND_RESULT}_hits", 0),
+            "misses": counters.get(f"{KIND_RESULT}_misses", 0),
+            "conversionHits": counters.get(f"{KIND_CONVERSION}_hits", 0),
+            "conversionMisses": counters.get(f"{KIND_CONVERSION}_misses", 0),
+            "entries": entries,
+            "bytes": size
+        }
+
+    def clear(self) -> None:
+        """Remove todas as entradas (mantém os contadores)."""
+        conn = self._connect()
+        conn.execute("DELETE FROM entries")
+        conn.commit()
+
+
+_default_cache: Optional[ResultCache] = None
+
+
+def get_default_cache() -> Optional[ResultCache]:
+    """Cache compartilhado do processo (None quando LDI_CACHE=off)."""
+    global _default_cache
+    if os.environ.get("LDI_CACHE", "").lower() in ("0", "off", "false", "no"):
+        return None
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Diff incremental de LDIs
+Compara o resultado do parser com uma LDI anterior (resultado JSON ou índice salvo)
+pelo código de rastreio, para que o Node grave e notifique só o que mudou numa LDI
+corrigida ou reemitida.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import ldi_encoding
+
+
+# Campos cuja mudança torna um pacote "alterado"
+CHANGE_FIELDS = ("recipient", "position", "pickupDeadline")
+
+# Campos guardados por código no índice
+INDEX_FIELDS = ("lineNumber",) + CHANGE_FIELDS
+
+INDEX_VERSION = 1
+
+
+def build_index(packages: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Código de rastreio -> campos comparados."""
+    return {
+        pkg["trackingCode"]: {field: pkg.get(field) for field in INDEX_FIELDS}
+        for pkg in packages
+    }
+
+
+def load_index(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Lê um índice salvo (save_index) ou um resultado anterior do parser
+    (JSON com "packages", em lista ou colunar).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = ldi_encoding.from_columnar(json.load(f))
+    if isinstance(data.get("packages"), list):
+        return build_index(data["packages"])
+    if data.get("version") != INDEX_VERSION or not isinstance(data.get("packages"), dict):
+        raise ValueError(f"Arquivo não é um resultado nem um índice de LDI: {path}")
+    return data["packages"]
+
+
+def save_index(path: str, result: Dict[str, Any]) -> None:
+    """Grava o índice do resultado completo (via arquivo temporário + rename)."""
+    metadata = result.get("metadata", {})
+    index = {
+        "version": INDEX_VERSION,
+        "fileName": metadata.get("fileName"),
+        "arrivalDate": metadata.get("arrivalDate"),
+        "expectedTotal": metadata.get("expectedTotal", 0),
+        "createdAt": datetime.now().isoformat(timespec="seconds"),
+        "packages": build_index(result.get("packages", []))
+    }
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, target)
+
+
+class DiffTracker:
+    """
+    Classifica cada pacote à medida que é extraído (novo, alterado ou igual) e, ao
+    final, lista os códigos da LDI anterior que sumiram.
+    """
+
+    def __init__(self, previous: Dict[str, Dict[str, Any]]):
+        self.previous = previous
+        self.seen: set = set()
+        self.added: List[str] = []
+        self.changed: List[Dict[str, Any]] = []
+        self.unchanged = 0
+
+    def observe(self, pkg: Dict[str, Any]) -> Optional[str]:
+        """Retorna "added", "changed" ou None (pacote igual ao anterior)."""
+        code = pkg["trackingCode"]
+        if code in self.seen:
+            return None
+        self.seen.add(code)
+
+        before = self.previous.get(code)
+        if before is None:
+            self.added.append(code)
+            return "added"
+
+        changes = {
+            field: {"from": before.get(field), "to": pkg.get(field)}
+            for field in CHANGE_FIELDS
+            if before.get(field) != pkg.get(field)
+        }
+        if not changes:
+            self.unchanged += 1
+            return None
+        self.changed.append({"trackingCode": code, "changes": changes})
+        return "changed"
+
+    def finish(self, source: Optional[str] = None, partial: bool = False) -> Dict[str, Any]:
+        """
+        Resumo do diff. partial: a extração não cobriu a LDI inteira (falha ou prazo),
+        então os códigos não vistos não contam como removidos.
+        """
+        removed = [] if partial else [
+            {"trackingCode": code, **fields}
+            for code, fields in self.previous.items()
+            if code not in self.seen
+        ]
+        diff = {
+            "against": source,
+            "previousTotal": len(self.previous),
+            "added": self.added,
+            "changed": self.changed,
+            "removed": removed,
+            "unchanged": self.unchanged
+        }
+        if partial:
+            diff["partial"] = True
+        return diff
+
+
+def apply_diff(result: Dict[str, Any], previous: Dict[str, Dict[str, Any]],
+               source: Optional[str] = None, partial: bool = False) -> Dict[str, Any]:
+    """
+    Reduz result["packages"] aos pacotes novos e alterados (os que precisam de
+    upsert) e adiciona result["diff"] com os códigos novos, as mudanças campo a
+    campo e os pacotes removidos (nenhum com partial; ver DiffTracker.finish).
+    metadata.extractedTotal continua com o total da LDI.
+    """
+    tracker = DiffTracker(previous)
+    upserts = [pkg for pkg in result.get("packages", []) if tracker.observe(pkg)]
+    result["packages"] = upserts
+    result["totalPackages"] = len(upserts)
+    result["diff"] = tracker.finish(source, partial)
+    return result
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Codificação compacta do resultado para o Node.js
+No formato colunar, "packages" vira um objeto com uma lista por campo, e os campos
+com o mesmo valor em todos os pacotes (data de chegada, prazo de retirada, ...) saem
+uma única vez em "shared". Opcionalmente o resultado colunar é serializado com
+MessagePack e/ou enviado com prefixo de tamanho (4 bytes, big-endian).
+
+    {"encoding": "columnar", "packages": {"count": 3, "shared": {"dateISO": "2026-01-07", ...},
+                                          "columns": {"trackingCode": [...], ...},
+                                          "absent": {"page": [2]}}, ...}
+
+"absent" lista, por campo, os pacotes que não tinham a chave (decode devolve os
+dicionários originais).
+"""
+
+import json
+import struct
+from typing import Any, BinaryIO, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # opcional: só para --encoding msgpack
+    msgpack = None
+
+
+ENCODINGS = ("json", "columnar", "msgpack")
+
+# Prefixo dos quadros: tamanho do payload em 4 bytes big-endian
+_FRAME_HEADER = struct.Struct(">I")
+
+_MISSING = object()
+
+
+def to_columnar(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Resultado com "packages" em colunas (o dicionário original não é alterado)."""
+    packages: List[Dict[str, Any]] = result.get("packages") or []
+    fields: Dict[str, None] = {}
+    for pkg in packages:
+        fields.update(dict.fromkeys(pkg))
+
+    shared: Dict[str, Any] = {}
+    columns: Dict[str, List[Any]] = {}
+    absent: Dict[str, List[int]] = {}
+    for name in fields:
+        values = [pkg.get(name, _MISSING) for pkg in packages]
+        missing = [i for i, value in enumerate(values) if value is _MISSING]
+        first = values[0]
+        if len(packages) > 1 and not missing and all(value == first for value in values):
+            shared[name] = first
+            continue
+        if missing:
+            absent[name] = missing
+            values = [None if value is _MISSING else value for value in values]
+        columns[name] = values
+
+    encoded = {key: value for key, value in result.items() if key != "packages"}
+    encoded["encoding"] = "columnar"
+    encoded["packages"] = {"count": len(packages), "shared": shared, "columns": columns}
+    if absent:
+        encoded["packages"]["absent"] = absent
+    return encoded
+
+
+def from_columnar(encoded: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverso de to_columnar; resultados já em lista passam sem mudança."""
+    if encoded.get("encoding") != "columnar":
+        return encoded
+    block = encoded["packages"]
+    shared, columns = block["shared"], block["columns"]
+    absent = {name: set(indexes) for name, indexes in block.get("absent", {}).items()}
+    names = list(shared) + list(columns)
+
+    packages = []
+    for i in range(block["count"]):
+        pkg = {}
+        for name in names:
+            if i in absent.get(name, ()):
+                continue
+            pkg[name] = shared[name] if name in shared else columns[name][i]
+        packages.append(pkg)
+
+    result = {key: value for key, value in encoded.items() if key != "encoding"}
+    result["packages"] = packages
+    return result
+
+
+def encode(result: Dict[str, Any], encoding: str = "json") -> bytes:
+    """Serializa o resultado: "json" (lista de pacotes), "columnar" (JSON) ou "msgpack" (colunar)."""
+    if encoding == "json":
+        return json.dumps(result, ensure_ascii=False).encode("utf-8")
+    if encoding == "columnar":
+        return json.dumps(to_columnar(result), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if encoding == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("MessagePack indisponível: pip install msgpack")
+        return msgpack.packb(to_columnar(result), use_bin_type=True)
+    raise ValueError(f"Codificação desconhecida: {encoding} (disponíveis: {', '.join(ENCODINGS)})")
+
+
+def decode(payload: bytes, encoding: str = "json") -> Dict[str, Any]:
+    """Inverso de encode (sempre devolve pacotes em lista)."""
+    if encoding == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("MessagePack indisponível: pip install msgpack")
+        return from_columnar(msgpack.unpackb(payload, raw=False))
+    return from_columnar(json.loads(payload))
+
+
+def write_frame(stream: BinaryIO, payload: bytes) -> None:
+    """Grava um quadro: tamanho (4 bytes big-endian) + payload."""
+    stream.write(_FRAME_HEADER.pack(len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+
+def read_frame(stream: BinaryIO) -> Optional[bytes]:
+    """Lê um quadro de write_frame; None no fim do stream."""
+    header = stream.read(_FRAME_HEADER.size)
+    if len(header) < _FRAME_HEADER.size:
+        return None
+    (size,) = _FRAME_HEADER.unpack(header)
+    payload = stream.read(size)
+    if len(payload) < size:
+        raise EOFError(f"Quadro incompleto: {len(payload)} de {size} bytes")
+    return payload
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Instrumentação do LDI Parser
+Tempo por etapa, memória de pico e profiling opcional, para o metadata do resultado.
+"""
+
+import cProfile
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage
+    resource = None
+
+
+class StageTimer:
+    """Acumula a duração (ms) de cada etapa nomeada, na ordem em que aparecem."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        self.stages[name] = round(self.stages.get(name, 0) + elapsed_ms, 1)
+
+    def merge(self, stages: Dict[str, float], prefix: str = "") -> None:
+        """Soma etapas medidas em outro lugar (ex.: processos do pool de conversão)."""
+        for name, elapsed_ms in stages.items():
+            self.add(prefix + name, elapsed_ms)
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.stages)
+
+
+def elapsed_ms(start: float) -> float:
+    """Milissegundos desde start (time.perf_counter())."""
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+class Deadline:
+    """
+    Orçamento de tempo de uma chamada, contado a partir da criação. reserve() separa
+    uma parte do orçamento para uma etapa posterior (ex.: fallback na camada de
+    texto): ela deixa de contar como tempo restante.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = time.perf_counter()
+        self.reserved_ms = 0.0
+
+    def reserve(self, ms: float) -> None:
+        self.reserved_ms += ms
+
+    def remaining_ms(self) -> float:
+        return self.seconds * 1000 - self.reserved_ms - (time.perf_counter() - self.started) * 1000
+
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+
+def _rss_kb(who: int) -> int:
+    usage = resource.getrusage(who).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def peak_memory() -> Dict[str, Optional[int]]:
+    """RSS de pico do processo e dos processos filhos já encerrados (KB)."""
+    if resource is None:
+        return {"peakRssKb": None, "childrenPeakRssKb": None}
+    return {
+        "peakRssKb": _rss_kb(resource.RUSAGE_SELF),
+        "childrenPeakRssKb": _rss_kb(resource.RUSAGE_CHILDREN)
+    }
+
+
+def current_rss_kb() -> Optional[int]:
+    """RSS atual do processo (KB), lido de /proc; None fora do Linux."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+@contextmanager
+def maybe_profile(enabled: bool, input_path: str, info: Dict[str, Any]) -> Iterator[None]:
+    """
+    Com enabled=True, roda o bloco sob cProfile e grava <entrada>.pstats ao lado do PDF.
+    O caminho gravado vai em info["profile"].
+    """
+    if not enabled:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        dump_path = Path(input_path).with_name(Path(input_path).name + ".pstats")
+        try:
+            profiler.dump_stats(str(dump_path))
+            info["profile"] = str(dump_path)
+            print(f"🔬 Perfil gravado em: {dump_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"⚠ Não foi possível gravar o perfil: {e}", file=sys.stderr)
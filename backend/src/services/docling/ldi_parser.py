@@ -4,15 +4,48 @@ LDI Parser - Parser específico para Lista de Distribuição Interna dos Correio
 Usa Docling para extrair tabelas e retorna JSON estruturado para o Node.js
 """
 
+from __future__ import annotations
+
+import argparse
+import hashlib
 import json
+import math
+import multiprocessing
+import os
 import re
+import signal
+import sqlite3
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional, Callable
+
+# Docling só é importado quando um conversor é criado (pipeline_profiles.build_converter):
+# --probe, erros de uso e a estratégia de camada de texto não pagam o import
+if TYPE_CHECKING:
+    from docling.document_converter import DocumentConverter
+
+import ldi_diff
+import ldi_encoding
+from ldi_cache import KIND_CONVERSION, KIND_RESULT, ResultCache, file_sha256, get_default_cache
+from ldi_metrics import Deadline, StageTimer, elapsed_ms, maybe_profile, peak_memory
+from page_windows import PageWindows, get_page_count, resolve_window
+import pipeline_profiles
+from pipeline_profiles import (PROFILES, page_range_for, profile_signature, resolve_profile,
+                               text_only_profile)
+import recipient_index
+from recipient_index import RecipientIndex
+from tracking_index import TrackingIndex, get_tracking_index
+
 
-from docling.document_converter import DocumentConverter
+# Versão da lógica de extração: incrementar ao mudar heurísticas que alteram o resultado.
+# Junto com os padrões regex abaixo, forma PARSER_STAMP (parte da chave do cache)
+PARSER_VERSION = "3"
 
+# Versão do formato da conversão intermediária guardada em cache
+CONVERSION_VERSION = "3"
 
 # Regex para código de rastreio brasileiro (XX000000000BR)
 TRACKING_CODE_REGEX = re.compile(r'^[A-Z]{2}\d{9}[A-Z]{2}$')
@@ -20,6 +53,114 @@ TRACKING_CODE_REGEX = re.compile(r'^[A-Z]{2}\d{9}[A-Z]{2}$')
 # Regex para data DD/MM/YYYY
 DATE_REGEX = re.compile(r'^\d{2}/\d{2}/\d{4}$')
 
+# Regex para encontrar TODOS os códigos de rastreio numa string
+TRACKING_FINDER = re.compile(r'[A-Z]{2}\d{9}[A-Z]{2}')
+
+# Regex para encontrar datas DD/MM/YYYY dentro de uma célula
+DATE_FINDER = re.compile(r'\d{2}/\d{2}/\d{4}')
+
+# Posições (PCM - XXX) e números de grupo dentro de uma célula
+POSITION_FINDER = re.compile(r'PCM\s*-\s*\d+')
+NUMBER_FINDER = re.compile(r'\d+')
+
+# Limpeza do nome do destinatário (clean_recipient_name)
+NAME_TRAILING_SYMBOLS = re.compile(r'[\:\|\[\]\&\}\{]+$')
+NAME_INNER_SYMBOLS = re.compile(r'[\:\|\[\]\&\}\{]+')
+NAME_UNDERSCORES = re.compile(r'_+')
+NAME_SPACES = re.compile(r'\s+')
+NAME_TRAILING_SYMBOLS_DASH = re.compile(r'[\:\|\[\]\&\}\{\-]+$')
+
+# Separador de células ao varrer uma coluna inteira com um único finditer
+# (não casa com nenhum dos padrões acima, nem com \s). Um NUL dentro de uma célula
+# vira CELL_SEPARATOR_ESCAPE, que também não casa com nada, para não contar como
+# troca de linha
+CELL_SEPARATOR = "\x00"
+CELL_SEPARATOR_ESCAPE = "\x01"
+
+# Metadados do cabeçalho/rodapé da LDI
+TOTAL_OBJECTS_REGEX = re.compile(r'Total de objetos:\s*(\d+)')
+ARRIVAL_DATE_REGEX = re.compile(r'Impresso em:\s*(\d{2}/\d{2}/\d{4})')
+RETURN_DATE_REGEX = re.compile(r'Data de Devolução:\s*(\d{2}/\d{2}/\d{4})')
+
+# Linha da LDI na camada de texto: "92 07/01/2026 PCM - 94 AB864169553BR MELRY COSTA"
+LDI_ROW_REGEX = re.compile(
+    r'(?<!\S)(\d{1,4})\s+(\d{2}/\d{2}/\d{4})\s+(PCM\s*-\s*\d+)\s+([A-Z]{2}\d{9}[A-Z]{2})\b\s*(.*)$'
+)
+
+# Nome do destinatário: texto após o código até separadores (: & _ |) ou dígitos
+ROW_NAME_REGEX = re.compile(r'\s*([^:&_|\[\]{}\d]*)')
+
+# Continuação de nome quebrado na linha seguinte (mesma heurística do pdfParser.ts)
+NAME_CONTINUATION_REGEX = re.compile(r'^[A-ZÀ-Ú][A-Za-zÀ-ú\s]{2,}$')
+# Quebra de linha na camada de texto (limites da linha de um código indexado)
+LINE_BREAK_REGEX = re.compile(r'[\r\n]')
+NEXT_LINE_REGEX = re.compile(r'[\r\n]+([^\r\n]*)')
+
+# Nome após o código quando a linha não casa com LDI_ROW_REGEX (fallback)
+FALLBACK_NAME_REGEX = re.compile(r'([A-ZÀ-Ú][A-ZÀ-Úa-zà-ú\s]+?)(?=\s*[:\&_\r\n]|$)')
+
+NON_NAME_WORDS_REGEX = re.compile(
+    r'\b(RUA|AV|AVENIDA|TRAVESSA|TV|ESTRADA|ROD|RODOVIA|BR|KM|BAIRRO|SETOR|QUADRA|LOTE|CASA|APT|'
+    r'APARTAMENTO|BLOCO|CEP|LISTA|DISTRIBUI\w*|INTERNA|TOTAL|P[ÁA]GINA|IMPRESSO|DEVOLU\w*|'
+    r'CORREIOS|DESTINAT\w*|OBJETO|GRUPO|ASSINATURA)\b',
+    re.IGNORECASE
+)
+
+def _parser_stamp() -> str:
+    patterns = [
+        TRACKING_CODE_REGEX, DATE_REGEX, TRACKING_FINDER, DATE_FINDER, POSITION_FINDER,
+        NUMBER_FINDER, NAME_TRAILING_SYMBOLS, NAME_INNER_SYMBOLS, NAME_TRAILING_SYMBOLS_DASH,
+        TOTAL_OBJECTS_REGEX,
+        ARRIVAL_DATE_REGEX, RETURN_DATE_REGEX, LDI_ROW_REGEX, ROW_NAME_REGEX,
+        NAME_CONTINUATION_REGEX, NON_NAME_WORDS_REGEX, FALLBACK_NAME_REGEX, LINE_BREAK_REGEX,
+        NEXT_LINE_REGEX
+    ]
+    source = PARSER_VERSION + "\0" + "\0".join(pattern.pattern for pattern in patterns)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:12]
+
+
+PARSER_STAMP = _parser_stamp()
+
+# Estratégias aceitas por parse_ldi_pdf
+STRATEGIES = ("auto", "text", "docling")
+
+# Conversão paralela: só compensa a partir de algumas páginas por processo
+PARALLEL_MIN_PAGES = 6
+MIN_PAGES_PER_RANGE = 2
+
+# Páginas com menos caracteres (sem espaços) na camada de texto vão para o OCR
+OCR_MIN_TEXT_CHARS = int(os.environ.get("LDI_OCR_MIN_CHARS", 40))
+
+# Com prazo, PDFs maiores que isso são convertidos em janelas (o prazo é conferido
+# entre janelas: a conversão de uma janela em andamento não é interrompida)
+DEADLINE_WINDOW_PAGES = 4
+
+# Pool de processos para conversão por faixas de páginas (mantido entre chamadas)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key: Optional[tuple] = None
+
+# Callback de eventos do modo streaming (pacotes e progresso, um dict por evento)
+EventCallback = Callable[[Dict[str, Any]], None]
+
+
+def get_converter(profile: Optional[Dict[str, Any]] = None) -> DocumentConverter:
+    """
+    Retorna o DocumentConverter do processo para o perfil (padrão: LDI_PIPELINE ou
+    "default"), criando-o na primeira chamada. Ver pipeline_profiles.py.
+    """
+    return pipeline_profiles.get_converter(profile)
+
+
+def warm_up_converter(converter: DocumentConverter) -> None:
+    """Inicializa o pipeline de PDF (modelos de layout e TableFormer) antes da primeira conversão."""
+    try:
+        from docling.datamodel.base_models import InputFormat
+        converter.initialize_pipeline(InputFormat.PDF)
+    except Exception as e:
+        # Versões antigas do Docling não expõem initialize_pipeline; os modelos
+        # serão carregados na primeira conversão
+        print(f"⚠ Pré-carregamento do pipeline indisponível: {e}", file=sys.stderr)
+
 
 def is_valid_tracking_code(code: str) -> bool:
     """Valida formato do código de rastreio brasileiro."""
@@ -36,17 +177,17 @@ def clean_recipient_name(name: str) -> str:
     cleaned = name.strip()
     
     # Remove caracteres especiais comuns no final (:|], :&, |], [], etc)
-    cleaned = re.sub(r'[\:\|\[\]\&\}\{]+$', '', cleaned).strip()
-    cleaned = re.sub(r'[\:\|\[\]\&\}\{]+', ' ', cleaned)  # No meio também
+    cleaned = NAME_TRAILING_SYMBOLS.sub('', cleaned).strip()
+    cleaned = NAME_INNER_SYMBOLS.sub(' ', cleaned)  # No meio também
     
     # Remove underscores
-    cleaned = re.sub(r'_+', ' ', cleaned)
+    cleaned = NAME_UNDERSCORES.sub(' ', cleaned)
     
     # Remove múltiplos espaços
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    cleaned = NAME_SPACES.sub(' ', cleaned).strip()
     
     # Remove caracteres especiais no final novamente (após limpeza)
-    cleaned = re.sub(r'[\:\|\[\]\&\}\{\-]+$', '', cleaned).strip()
+    cleaned = NAME_TRAILING_SYMBOLS_DASH.sub('', cleaned).strip()
     
     # Validação mínima
     if len(cleaned) < 3:
@@ -74,25 +215,10 @@ def parse_date(date_str: str) -> Optional[Dict[str, str]]:
         return None
 
 
-def extract_packages_from_table(table_data: List[List[str]]) -> List[Dict[str, Any]]:
-    """Extrai pacotes de uma tabela do Docling.
-    
-    IMPORTANTE: Lida com células mescladas pelo Docling (quebras de página)
-    onde múltiplos códigos de rastreio aparecem numa única célula.
-    Exemplo: "AB864450494BR AB864452186BR" -> 2 pacotes separados
-    """
-    packages = []
+def map_header_columns(header_row: List[Any]) -> Dict[str, int]:
+    """Mapeia as colunas da LDI pelos nomes do cabeçalho (vazio se não for cabeçalho)."""
+    header = [str(cell).lower().strip() for cell in header_row]
     
-    # Regex para encontrar TODOS os códigos de rastreio numa string
-    TRACKING_FINDER = re.compile(r'[A-Z]{2}\d{9}[A-Z]{2}')
-    
-    # Identificar colunas pelo header
-    if not table_data or len(table_data) < 2:
-        return packages
-    
-    header = [str(cell).lower().strip() for cell in table_data[0]]
-    
-    # Mapear índices das colunas
     col_map = {}
     for i, col in enumerate(header):
         if 'grupo' in col:
@@ -105,9 +231,15 @@ def extract_packages_from_table(table_data: List[List[str]]) -> List[Dict[str, A
             col_map['objeto'] = i
         elif 'destinat' in col:
             col_map['destinatario'] = i
+    return col_map
+
+
+def map_table_columns(header_row: List[Any]) -> Dict[str, int]:
+    """Mapeia as colunas da LDI, usando a ordem padrão quando o cabeçalho não é reconhecido."""
+    col_map = map_header_columns(header_row)
     
     # Se não encontrou colunas essenciais, tentar por posição padrão
-    if 'objeto' not in col_map and len(header) >= 5:
+    if 'objeto' not in col_map and len(header_row) >= 5:
         col_map = {
             'grupo': 0,
             'data': 1,
@@ -115,80 +247,176 @@ def extract_packages_from_table(table_data: List[List[str]]) -> List[Dict[str, A
             'objeto': 3,
             'destinatario': 4
         }
+    return col_map
+
+
+class TableStitcher:
+    """
+    Junta fragmentos de tabela que continuam na página seguinte.
+    
+    O Docling devolve uma tabela por página. Fragmentos consecutivos com o mesmo
+    número de colunas são tratados como a mesma tabela: o cabeçalho repetido é
+    descartado e uma linha partida na quebra de página (ex.: nome do destinatário
+    que continua no topo da página seguinte) é reunida numa única linha antes da
+    extração, em vez de virar uma célula mesclada.
     
-    # Processar linhas de dados
-    for row_idx, row in enumerate(table_data[1:], start=1):
+    Uso: feed() devolve as tabelas já fechadas; flush() devolve a pendente.
+    """
+    
+    def __init__(self):
+        self._rows: Optional[List[List[Any]]] = None
+        self._last_page = 0
+        self._col_map: Dict[str, int] = {}
+    
+    def feed(self, page: int, rows: List[List[Any]]) -> List[List[List[Any]]]:
+        if not rows:
+            return []
+        
+        if self._rows is not None and self._continues(page, rows):
+            data_rows = rows[1:] if map_header_columns(rows[0]).get('objeto') is not None else rows
+            self._append(data_rows)
+            self._last_page = page
+            return []
+        
+        completed = self.flush()
+        self._rows = [list(row) for row in rows]
+        self._last_page = page
+        self._col_map = map_table_columns(rows[0])
+        return completed
+    
+    def flush(self) -> List[List[List[Any]]]:
+        if self._rows is None:
+            return []
+        rows, self._rows = self._rows, None
+        return [rows]
+    
+    def _continues(self, page: int, rows: List[List[Any]]) -> bool:
+        return page == self._last_page + 1 and len(rows[0]) == len(self._rows[0])
+    
+    def _cell(self, row: List[Any], key: str) -> str:
+        col = self._col_map.get(key)
+        return str(row[col]).strip() if col is not None and col < len(row) else ""
+    
+    def _has_code(self, row: List[Any]) -> bool:
+        return bool(TRACKING_FINDER.search(self._cell(row, 'objeto').upper()))
+    
+    def _is_split(self, last_row: List[Any], first_row: List[Any]) -> bool:
+        """Verifica se a última linha da página e a primeira da seguinte são a mesma linha."""
+        if self._cell(first_row, 'grupo'):
+            # A linha seguinte tem seu próprio número de grupo: é uma linha nova
+            return False
+        if self._has_code(last_row):
+            # Nome (ou posição) continuou no topo da página seguinte
+            return not self._has_code(first_row) and any(str(cell).strip() for cell in first_row)
+        # Linha cortada antes do código: grupo/data na página anterior, código na seguinte
+        return self._has_code(first_row) and bool(DATE_FINDER.search(self._cell(last_row, 'data')))
+    
+    def _append(self, data_rows: List[List[Any]]) -> None:
+        if not data_rows:
+            return
+        
+        last_row = self._rows[-1] if len(self._rows) > 1 else None
+        if last_row is not None and self._is_split(last_row, data_rows[0]):
+            self._rows[-1] = [
+                " ".join(part for part in (str(a).strip(), str(b).strip()) if part)
+                for a, b in zip(last_row, data_rows[0])
+            ]
+            data_rows = data_rows[1:]
+        
+        self._rows.extend(list(row) for row in data_rows)
+
+
+def stitch_table_fragments(fragments: List[Dict[str, Any]]) -> List[List[List[Any]]]:
+    """Une fragmentos {"page", "rows"} (em ordem de página) em tabelas completas."""
+    stitcher = TableStitcher()
+    tables = []
+    for fragment in fragments:
+        tables.extend(stitcher.feed(fragment["page"], fragment["rows"]))
+    tables.extend(stitcher.flush())
+    return tables
+
+
+def _column(rows: List[List[Any]], col: Optional[int], transform=None) -> List[str]:
+    """Extrai uma coluna como lista de strings ("" quando a linha não tem a célula)."""
+    if col is None:
+        return [""] * len(rows)
+    cells = [str(row[col]) if col < len(row) else "" for row in rows]
+    if transform is not None:
+        cells = [transform(cell) for cell in cells]
+    return cells
+
+
+def findall_by_row(pattern: re.Pattern, cells: List[str]) -> List[List[str]]:
+    """
+    Equivalente a [pattern.findall(cell) for cell in cells], mas com uma única
+    varredura sobre a coluna inteira (células unidas por CELL_SEPARATOR).
+    """
+    matches: List[List[str]] = [[] for _ in cells]
+    joined = CELL_SEPARATOR.join(cell.replace(CELL_SEPARATOR, CELL_SEPARATOR_ESCAPE) for cell in cells)
+    row = 0
+    position = 0
+    for match in pattern.finditer(joined):
+        row += joined.count(CELL_SEPARATOR, position, match.start())
+        position = match.start()
+        matches[row].append(match.group())
+    return matches
+
+
+def extract_packages_from_table(table_data: List[List[str]],
+                                residents: Optional[RecipientIndex] = None) -> List[Dict[str, Any]]:
+    """Extrai pacotes de uma tabela do Docling.
+    
+    Processa a tabela por colunas: uma varredura regex por coluna (códigos,
+    posições, grupos, datas) e a limpeza dos nomes numa única passada, em vez de
+    várias chamadas de regex por célula.
+    
+    IMPORTANTE: Lida com células mescladas pelo Docling (quebras de página)
+    onde múltiplos códigos de rastreio aparecem numa única célula.
+    Exemplo: "AB864450494BR AB864452186BR" -> 2 pacotes separados
+    
+    Com residents (índice de moradores), os nomes dessas células são separados
+    pelos nomes conhecidos em vez de em partes iguais.
+    """
+    packages = []
+    
+    # Identificar colunas pelo header
+    if not table_data or len(table_data) < 2:
+        return packages
+    
+    col_map = map_table_columns(table_data[0])
+    rows = table_data[1:]
+    
+    # CORREÇÃO: Encontrar TODOS os códigos em cada célula (lida com células mescladas)
+    codes_by_row = findall_by_row(TRACKING_FINDER, _column(rows, col_map.get('objeto'), str.upper))
+    if not any(codes_by_row):
+        return packages
+    
+    # Demais colunas: uma varredura cada
+    positions_by_row = findall_by_row(POSITION_FINDER, _column(rows, col_map.get('posicao'), str.upper))
+    groups_by_row = findall_by_row(NUMBER_FINDER, _column(rows, col_map.get('grupo')))
+    dates_by_row = findall_by_row(DATE_FINDER, _column(rows, col_map.get('data')))
+    raw_recipients = _column(rows, col_map.get('destinatario'))
+    
+    today_iso = datetime.now().strftime("%Y-%m-%d")
+    
+    # Montar pacotes apenas das linhas com códigos
+    for row_idx, tracking_codes in enumerate(codes_by_row, start=1):
+        if not tracking_codes:
+            continue
+        
         try:
-            # Extrair célula de códigos de rastreio
-            objeto_cell = ""
-            if 'objeto' in col_map and col_map['objeto'] < len(row):
-                objeto_cell = str(row[col_map['objeto']]).strip().upper()
-            
-            # CORREÇÃO: Encontrar TODOS os códigos na célula (lida com células mescladas)
-            tracking_codes = TRACKING_FINDER.findall(objeto_cell)
-            
-            if not tracking_codes:
-                continue
-            
-            # Extrair dados comuns da linha
-            raw_recipient = ""
-            if 'destinatario' in col_map and col_map['destinatario'] < len(row):
-                raw_recipient = str(row[col_map['destinatario']])
-            
             # Extrair datas
             date_str = ""
-            date_iso = datetime.now().strftime("%Y-%m-%d")
-            if 'data' in col_map and col_map['data'] < len(row):
-                raw_date = str(row[col_map['data']]).strip()
-                date_matches = re.findall(r'\d{2}/\d{2}/\d{4}', raw_date)
-                if date_matches:
-                    date_str = date_matches[0]
-                    parsed = parse_date(date_str)
-                    if parsed:
-                        date_iso = parsed['dateISO']
+            date_iso = today_iso
+            if dates_by_row[row_idx - 1]:
+                date_str = dates_by_row[row_idx - 1][0]
+                parsed = parse_date(date_str)
+                if parsed:
+                    date_iso = parsed['dateISO']
             
-            # Extrair posições
-            positions = []
-            if 'posicao' in col_map and col_map['posicao'] < len(row):
-                pos_cell = str(row[col_map['posicao']]).strip().upper()
-                # Encontrar todas as posições no formato PCM - XXX
-                positions = re.findall(r'PCM\s*-\s*\d+', pos_cell)
-            
-            # Extrair grupos/linhas
-            line_numbers = []
-            if 'grupo' in col_map and col_map['grupo'] < len(row):
-                grupo_cell = str(row[col_map['grupo']]).strip()
-                # Encontrar todos os números de grupo
-                line_numbers = [int(n) for n in re.findall(r'\d+', grupo_cell)]
-            
-            # Extrair nomes dos destinatários (podem estar concatenados)
-            # Estratégia: dividir por padrões comuns (múltiplos espaços, underscores)
-            recipients = []
-            if raw_recipient:
-                # Tentar dividir por padrões de separação
-                # Ex: "MARCIELY DUTRA FLAZINETE LIMA" -> difícil separar sem mais contexto
-                # Usamos heurísticas baseadas no número de códigos
-                cleaned_full = clean_recipient_name(raw_recipient)
-                
-                if len(tracking_codes) > 1:
-                    # Quando há múltiplos códigos, tentar dividir nomes
-                    # Procurar por padrões de separação comuns
-                    words = raw_recipient.split()
-                    
-                    # Heurística: se temos N códigos, tentar dividir em N partes
-                    # Assumir que cada nome tem pelo menos 2 palavras
-                    if len(words) >= len(tracking_codes) * 2:
-                        words_per_name = len(words) // len(tracking_codes)
-                        for i in range(len(tracking_codes)):
-                            start = i * words_per_name
-                            end = start + words_per_name if i < len(tracking_codes) - 1 else len(words)
-                            name = clean_recipient_name(' '.join(words[start:end]))
-                            recipients.append(name)
-                    else:
-                        # Não conseguimos dividir, usar o nome completo para todos
-                        recipients = [cleaned_full] * len(tracking_codes)
-                else:
-                    recipients = [cleaned_full]
+            positions = list(positions_by_row[row_idx - 1])
+            line_numbers = [int(n) for n in groups_by_row[row_idx - 1]]
+            recipients = split_recipient_names(raw_recipients[row_idx - 1], len(tracking_codes), residents)
             
             # Garantir que temos listas do mesmo tamanho
             while len(recipients) < len(tracking_codes):
@@ -198,19 +426,18 @@ def extract_packages_from_table(table_data: List[List[str]]) -> List[Dict[str, A
             while len(line_numbers) < len(tracking_codes):
                 line_numbers.append(row_idx + len(line_numbers))
             
+            confidence = 90 if len(tracking_codes) == 1 else 80  # Menor confiança para células mescladas
+            
             # Criar um pacote para CADA código encontrado
             for idx, code in enumerate(tracking_codes):
-                if not is_valid_tracking_code(code):
-                    continue
-                
                 packages.append({
-                    "lineNumber": line_numbers[idx] if idx < len(line_numbers) else row_idx,
+                    "lineNumber": line_numbers[idx],
                     "trackingCode": code,
-                    "recipient": recipients[idx] if idx < len(recipients) else "NOME NÃO IDENTIFICADO",
-                    "position": positions[idx] if idx < len(positions) else "",
+                    "recipient": recipients[idx],
+                    "position": positions[idx],
                     "date": date_str,
                     "dateISO": date_iso,
-                    "confidence": 90 if len(tracking_codes) == 1 else 80  # Menor confiança para células mescladas
+                    "confidence": confidence
                 })
             
             if len(tracking_codes) > 1:
@@ -223,17 +450,342 @@ def extract_packages_from_table(table_data: List[List[str]]) -> List[Dict[str, A
     return packages
 
 
-def parse_ldi_pdf(pdf_path: str) -> Dict[str, Any]:
+def split_recipient_names(raw_recipient: str, code_count: int,
+                          residents: Optional[RecipientIndex] = None) -> List[str]:
     """
-    Processa PDF de LDI dos Correios e retorna dados estruturados.
+    Separa os nomes de uma célula de destinatário entre os códigos da linha.
     
-    Args:
-        pdf_path: Caminho para o arquivo PDF
+    Nomes concatenados (ex.: "MARCIELY DUTRA FLAZINETE LIMA") são difíceis de
+    separar sem mais contexto: com o índice de moradores, a separação que reconhece
+    mais nomes conhecidos (RecipientIndex.segment); sem ele, ou se nenhum nome for
+    conhecido, divide as palavras em N partes, assumindo que cada nome tem pelo
+    menos 2 palavras.
+    """
+    if not raw_recipient:
+        return []
+    
+    if code_count <= 1:
+        return [clean_recipient_name(raw_recipient)]
+    
+    words = raw_recipient.split()
+    if residents is not None:
+        segmented = residents.segment(words, code_count)
+        if segmented:
+            return [clean_recipient_name(name) for name in segmented]
+    
+    if len(words) < code_count * 2:
+        # Não conseguimos dividir, usar o nome completo para todos
+        return [clean_recipient_name(raw_recipient)] * code_count
+    
+    words_per_name = len(words) // code_count
+    names = []
+    for i in range(code_count):
+        start = i * words_per_name
+        end = start + words_per_name if i < code_count - 1 else len(words)
+        names.append(clean_recipient_name(' '.join(words[start:end])))
+    return names
+
+
+def extract_header_metadata(text: str) -> Dict[str, Any]:
+    """Extrai total esperado, data de entrada e data de devolução do texto da LDI."""
+    header: Dict[str, Any] = {
+        "expectedTotal": 0,
+        "arrivalDate": None,
+        "arrivalDateISO": None,
+        "returnDate": None,
+        "returnDateISO": None
+    }
+    
+    total_match = TOTAL_OBJECTS_REGEX.search(text)
+    if total_match:
+        header["expectedTotal"] = int(total_match.group(1))
+    
+    # Data de ENTRADA do cabeçalho (Impresso em: DD/MM/YYYY)
+    # Esta é a data de chegada da lista, igual para TODOS os pacotes
+    arrival_match = ARRIVAL_DATE_REGEX.search(text)
+    if arrival_match:
+        header["arrivalDate"] = arrival_match.group(1)
+        parsed_arrival = parse_date(header["arrivalDate"])
+        if parsed_arrival:
+            header["arrivalDateISO"] = parsed_arrival['dateISO']
+    
+    # Data de devolução (prazo de retirada)
+    return_match = RETURN_DATE_REGEX.search(text)
+    if return_match:
+        header["returnDate"] = return_match.group(1)
+        parsed_return = parse_date(header["returnDate"])
+        if parsed_return:
+            header["returnDateISO"] = parsed_return['dateISO']
+    
+    return header
+
+
+def extract_edge_header(page_texts: List[str]) -> Dict[str, Any]:
+    """
+    Lê cabeçalho e rodapé da LDI só da primeira e da última página.
+    
+    "Impresso em" fica na primeira página, "Total de objetos" e "Data de Devolução"
+    na última; as páginas do meio só são varridas se o total não aparecer nelas.
+    """
+    edges = page_texts[:1] + page_texts[-1:] if len(page_texts) > 1 else page_texts
+    header = extract_header_metadata("\n".join(edges))
+    if not header["expectedTotal"] and len(page_texts) > 2:
+        header = extract_header_metadata("\n".join(page_texts))
+    return header
+
+
+def merge_header(header: Dict[str, Any], fallback: Dict[str, Any]) -> Dict[str, Any]:
+    """Completa os campos vazios do cabeçalho com os de outra fonte."""
+    return {key: header.get(key) or value for key, value in fallback.items()}
+
+
+def header_dates_complete(header: Dict[str, Any]) -> bool:
+    """Cabeçalho já tem as duas datas que apply_header_dates() copia para os pacotes."""
+    return bool(header.get("arrivalDateISO") and header.get("returnDateISO"))
+
+
+def apply_header_dates(pkg: Dict[str, Any], header: Dict[str, Any]) -> None:
+    """Aplica a data de entrada e o prazo de retirada do cabeçalho ao pacote."""
+    # IMPORTANTE: Usar data de ENTRADA do cabeçalho para TODOS os pacotes
+    if header.get("arrivalDateISO"):
+        pkg["date"] = header["arrivalDate"]
+        pkg["dateISO"] = header["arrivalDateISO"]
+    
+    # Adicionar data de devolução/prazo de retirada do cabeçalho
+    if header.get("returnDateISO"):
+        pkg["pickupDeadline"] = header["returnDateISO"]
+        pkg["pickupDeadlineStr"] = header["returnDate"]
+        return
+    
+    # Se não encontrou no PDF, calcular 7 dias após a data de chegada
+    try:
+        arrival = datetime.fromisoformat(pkg["dateISO"])
+        deadline = arrival + timedelta(days=7)
+    except (KeyError, TypeError, ValueError):
+        # Fallback: 7 dias a partir de hoje
+        deadline = datetime.now() + timedelta(days=7)
+    pkg["pickupDeadline"] = deadline.strftime("%Y-%m-%d")
+    pkg["pickupDeadlineStr"] = deadline.strftime("%d/%m/%Y")
+
+
+def _log_header(header: Dict[str, Any]) -> None:
+    if header.get("arrivalDateISO"):
+        print(f"📅 Data de Entrada (cabeçalho): {header['arrivalDate']} ({header['arrivalDateISO']})", file=sys.stderr)
+    if header.get("returnDateISO"):
+        print(f"📅 Data de Devolução (cabeçalho): {header['returnDate']} ({header['returnDateISO']})", file=sys.stderr)
+
+
+def _store_header(result: Dict[str, Any], header: Dict[str, Any]) -> None:
+    result["metadata"]["expectedTotal"] = header["expectedTotal"]
+    if header.get("arrivalDate"):
+        result["metadata"]["arrivalDate"] = header["arrivalDate"]
+    if header.get("returnDate"):
+        result["metadata"]["returnDate"] = header["returnDate"]
+
+
+def _is_name_continuation(line: str) -> bool:
+    """Linha sem código que parece continuação do nome da linha anterior."""
+    return bool(NAME_CONTINUATION_REGEX.match(line)) and not NON_NAME_WORDS_REGEX.search(line)
+
+
+def parse_text_rows(page_texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Extrai linhas da LDI diretamente do texto da camada de texto do PDF.
+    
+    Formato esperado por linha: "92 07/01/2026 PCM - 94 AB864169553BR MELRY COSTA".
+    Nomes longos quebrados na linha seguinte são reanexados ao pacote anterior.
+    Cada pacote leva a página e os offsets do código no texto da página.
+    """
+    packages = []
+    seen_codes = set()
+    
+    for page_no, page_text in enumerate(page_texts, start=1):
+        last_pkg = None
+        line_offset = 0
+        for raw_line in page_text.splitlines(keepends=True):
+            line_start = line_offset + len(raw_line) - len(raw_line.lstrip())
+            line_offset += len(raw_line)
+            line = raw_line.strip()
+            if not line:
+                continue
+            
+            row_match = LDI_ROW_REGEX.search(line)
+            if not row_match:
+                if last_pkg is not None and _is_name_continuation(line):
+                    last_pkg["_rawName"] += " " + line
+                else:
+                    last_pkg = None
+                continue
+            
+            line_number, date_str, position, code, rest = row_match.groups()
+            if code in seen_codes or not is_valid_tracking_code(code):
+                last_pkg = None
+                continue
+            seen_codes.add(code)
+            
+            name_match = ROW_NAME_REGEX.match(rest)
+            parsed = parse_date(date_str)
+            last_pkg = {
+                "lineNumber": int(line_number),
+                "trackingCode": code,
+                "_rawName": name_match.group(1) if name_match else "",
+                "position": re.sub(r'\s+', ' ', position),
+                "date": date_str,
+                "dateISO": parsed['dateISO'] if parsed else datetime.now().strftime("%Y-%m-%d"),
+                "confidence": 90,
+                "page": page_no,
+                "charStart": line_start + row_match.start(4),
+                "charEnd": line_start + row_match.end(4)
+            }
+            packages.append(last_pkg)
+    
+    for pkg in packages:
+        raw_name = pkg.pop("_rawName")
+        pkg["recipient"] = clean_recipient_name(raw_name)
+    
+    # Manter a mesma ordem de campos dos pacotes extraídos pelo Docling
+    return [
+        {
+            "lineNumber": pkg["lineNumber"],
+            "trackingCode": pkg["trackingCode"],
+            "recipient": pkg["recipient"],
+            "position": pkg["position"],
+            "date": pkg["date"],
+            "dateISO": pkg["dateISO"],
+            "confidence": pkg["confidence"],
+            "page": pkg["page"],
+            "charStart": pkg["charStart"],
+            "charEnd": pkg["charEnd"]
+        }
+        for pkg in packages
+    ]
+
+
+def index_tracking_codes(page_texts: List[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Indexa os códigos de rastreio da camada de texto numa única varredura por página.
     
     Returns:
-        Dicionário com dados extraídos no formato esperado pelo Node.js
+        código -> {"page", "charStart", "charEnd", "lineStart", "lineEnd"}, na ordem
+        do documento (primeira ocorrência); offsets relativos ao texto da página
+    """
+    index: Dict[str, Dict[str, int]] = {}
+    for page_no, text in enumerate(page_texts, start=1):
+        for match in TRACKING_FINDER.finditer(text):
+            code = match.group()
+            if code in index:
+                continue
+            start, end = match.span()
+            line_end = LINE_BREAK_REGEX.search(text, end)
+            index[code] = {
+                "page": page_no,
+                "charStart": start,
+                "charEnd": end,
+                "lineStart": max(text.rfind('\n', 0, start), text.rfind('\r', 0, start)) + 1,
+                "lineEnd": line_end.start() if line_end else len(text)
+            }
+    return index
+
+
+def attach_location(pkg: Dict[str, Any], index: Dict[str, Dict[str, int]]) -> None:
+    """Adiciona página e offsets do código na camada de texto, quando indexado."""
+    entry = index.get(pkg["trackingCode"])
+    if entry:
+        pkg["page"] = entry["page"]
+        pkg["charStart"] = entry["charStart"]
+        pkg["charEnd"] = entry["charEnd"]
+
+
+def parse_indexed_row(code: str, entry: Dict[str, int], page_text: str,
+                      default_line_number: int) -> Dict[str, Any]:
+    """
+    Lê número, posição e destinatário da linha do código (limites vindos do índice).
+    
+    Se a linha não estiver completa (layout quebrado), usa o que houver nela.
     """
-    result = {
+    line = page_text[entry["lineStart"]:entry["lineEnd"]]
+    row = {
+        "lineNumber": default_line_number,
+        "position": "",
+        "recipient": "NOME NÃO IDENTIFICADO"
+    }
+    
+    row_match = LDI_ROW_REGEX.search(line)
+    if row_match and row_match.group(4) == code:
+        name_match = ROW_NAME_REGEX.match(row_match.group(5))
+        raw_name = name_match.group(1) if name_match else ""
+        
+        # Nome quebrado na linha seguinte
+        next_match = NEXT_LINE_REGEX.match(page_text, entry["lineEnd"])
+        next_line = next_match.group(1).strip() if next_match else ""
+        if next_line and _is_name_continuation(next_line):
+            raw_name += " " + next_line
+        
+        row["lineNumber"] = int(row_match.group(1))
+        row["position"] = re.sub(r'\s+', ' ', row_match.group(3))
+        if raw_name.strip():
+            row["recipient"] = clean_recipient_name(raw_name)
+        return row
+    
+    pos_match = POSITION_FINDER.search(line)
+    if pos_match:
+        row["position"] = pos_match.group()
+    name_match = FALLBACK_NAME_REGEX.match(line[entry["charEnd"] - entry["lineStart"]:].strip())
+    if name_match:
+        row["recipient"] = clean_recipient_name(name_match.group(1))
+    return row
+
+
+def read_text_layer(pdf_path: str, on_event: Optional[EventCallback] = None) -> List[str]:
+    """Lê o texto de cada página com pypdfium2 (sem layout/OCR)."""
+    import pypdfium2 as pdfium
+    
+    pdf_doc = pdfium.PdfDocument(pdf_path)
+    try:
+        page_texts = []
+        total = len(pdf_doc)
+        for page_no, page in enumerate(pdf_doc, start=1):
+            textpage = page.get_textpage()
+            page_texts.append(textpage.get_text_bounded())
+            textpage.close()
+            page.close()
+            if on_event:
+                on_event({"type": "progress", "stage": "page", "page": page_no, "pages": total})
+        return page_texts
+    finally:
+        pdf_doc.close()
+
+
+def parse_text_layer(pdf_path: str, on_event: Optional[EventCallback] = None,
+                     timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+    """
+    Estratégia rápida: extrai pacotes só da camada de texto (pypdfium2), sem Docling.
+    
+    Returns:
+        Dicionário com packages, header, pages e verified (True quando a contagem
+        bate com o "Total de objetos" do cabeçalho)
+    """
+    timer = timer or StageTimer()
+    with timer.stage("readText"):
+        page_texts = read_text_layer(pdf_path, on_event)
+    with timer.stage("parseRows"):
+        header = extract_edge_header(page_texts)
+        packages = parse_text_rows(page_texts)
+    
+    for pkg in packages:
+        apply_header_dates(pkg, header)
+    
+    expected = header["expectedTotal"]
+    return {
+        "packages": packages,
+        "header": header,
+        "pages": len(page_texts),
+        "verified": expected > 0 and len(packages) == expected
+    }
+
+
+def _new_result(pdf_path: str) -> Dict[str, Any]:
+    return {
         "success": False,
         "totalPackages": 0,
         "packages": [],
@@ -249,7 +801,525 @@ def parse_ldi_pdf(pdf_path: str) -> Dict[str, Any]:
             "pagesProcessed": 0
         }
     }
+
+
+def _check_expected_total(result: Dict[str, Any]) -> None:
+    """Adiciona aviso quando o total extraído difere do total do cabeçalho."""
+    expected_total = result["metadata"]["expectedTotal"]
+    extracted = len(result["packages"])
+    if expected_total > 0:
+        diff = expected_total - extracted
+        if diff > 0:
+            result["warnings"].append(f"Faltam {diff} pacotes ({extracted}/{expected_total})")
+        elif diff < 0:
+            result["warnings"].append(f"{abs(diff)} pacotes extras ({extracted}/{expected_total})")
+
+
+def table_to_rows(table) -> List[List[Any]]:
+    """
+    Lê a grade de células da tabela do Docling (cabeçalho na primeira linha).
     
+    Usa table.data.grid diretamente, sem passar por export_to_dataframe/pandas.
+    """
+    data = getattr(table, 'data', None)
+    grid = getattr(data, 'grid', None)
+    if grid is None:
+        # Versões do Docling sem a grade exposta
+        df = table.export_to_dataframe()
+        return [df.columns.tolist()] + df.values.tolist()
+    return [[cell.text for cell in row] for row in grid]
+
+
+def edge_page_text(doc, pages: List[int]) -> Dict[str, str]:
+    """
+    Texto das páginas pedidas a partir dos itens de texto do Docling (sem exportar
+    o documento inteiro). Chaves em string para o JSON do cache.
+    """
+    texts: Dict[str, List[str]] = {str(page): [] for page in pages}
+    for item in getattr(doc, 'texts', None) or []:
+        prov = getattr(item, 'prov', None)
+        key = str(prov[0].page_no) if prov else None
+        if key in texts:
+            texts[key].append(getattr(item, 'text', '') or '')
+    return {page: "\n".join(lines) for page, lines in texts.items()}
+
+
+def collect_conversion(doc, first_page: int = 1, last_page: Optional[int] = None,
+                       include_markdown: bool = False) -> Dict[str, Any]:
+    """
+    Reduz um documento Docling ao que o parser usa: páginas, fragmentos de tabela
+    {"page", "rows", "ms"} na ordem do documento e o texto da primeira e da última
+    página ("edgeText", para o cabeçalho/rodapé). O markdown completo só é
+    exportado com include_markdown=True.
+    """
+    timer = StageTimer()
+    fragments = []
+    warnings = []
+    page_count = len(doc.pages) if hasattr(doc, 'pages') else 0
+    if last_page is None:
+        last_page = first_page + max(page_count, 1) - 1
+    
+    with timer.stage("exportTables"):
+        for i, table in enumerate(doc.tables):
+            prov = getattr(table, 'prov', None)
+            page = prov[0].page_no if prov else first_page
+            started = time.perf_counter()
+            try:
+                rows = table_to_rows(table)
+                fragments.append({"page": page, "rows": rows, "ms": elapsed_ms(started)})
+            except Exception as e:
+                warnings.append(f"Erro ao exportar tabela da página {page}: {str(e)}")
+                print(f"  ⚠ Tabela {i+1} (página {page}): erro - {e}", file=sys.stderr)
+    
+    with timer.stage("exportEdgeText"):
+        edge_text = edge_page_text(doc, sorted({first_page, last_page}))
+    
+    conversion = {
+        "pages": page_count,
+        "edgeText": edge_text,
+        "fragments": fragments,
+        "warnings": warnings,
+        "timings": {}
+    }
+    if include_markdown:
+        with timer.stage("exportMarkdown"):
+            conversion["markdown"] = doc.export_to_markdown()
+    conversion["timings"] = timer.as_dict()
+    return conversion
+
+
+def split_page_ranges(page_count: int, parts: int) -> List[tuple]:
+    """Divide 1..page_count em faixas contíguas (início, fim) inclusivas."""
+    size = math.ceil(page_count / parts)
+    return [(start, min(start + size - 1, page_count)) for start in range(1, page_count + 1, size)]
+
+
+def resolve_workers(workers: Optional[int], page_count: int) -> int:
+    """Decide quantos processos usar na conversão (1 = sequencial)."""
+    if workers is None:
+        workers = int(os.environ.get("LDI_WORKERS", 0)) or os.cpu_count() or 1
+        if page_count < PARALLEL_MIN_PAGES:
+            return 1
+    return max(1, min(workers, page_count // MIN_PAGES_PER_RANGE or 1))
+
+
+def _init_pool_worker(profile: Dict[str, Any]) -> None:
+    # Um processo por núcleo: evita que cada worker abra vários threads de inferência
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    get_converter(profile)
+
+
+def _convert_page_range(pdf_path: str, start: int, end: int, include_markdown: bool = False,
+                        profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    doc = get_converter(profile).convert(pdf_path, page_range=(start, end)).document
+    convert_ms = elapsed_ms(started)
+    conversion = collect_conversion(doc, first_page=start, last_page=end,
+                                    include_markdown=include_markdown)
+    conversion["timings"]["convert"] = convert_ms
+    conversion["peakRssKb"] = peak_memory()["peakRssKb"]
+    return conversion
+
+
+def _get_pool(workers: int, profile: Dict[str, Any]) -> ProcessPoolExecutor:
+    global _pool, _pool_key
+    key = (workers, profile_signature(profile))
+    if _pool is None or _pool_key != key:
+        shutdown_pool()
+        # spawn: cada worker carrega os modelos uma vez (fork após inicializar o
+        # PyTorch pode travar os threads de inferência nos filhos)
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pool_worker,
+            initargs=(profile,)
+        )
+        _pool_key = key
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Encerra o pool de conversão paralela, se existir."""
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+        _pool_key = None
+
+
+def classify_pages(page_texts: List[str], min_chars: int = OCR_MIN_TEXT_CHARS) -> List[bool]:
+    """True para as páginas sem texto utilizável na camada de texto (precisam de OCR)."""
+    return [sum(1 for ch in text if not ch.isspace()) < min_chars for text in page_texts]
+
+
+def plan_conversion(needs_ocr: List[bool], profile: Dict[str, Any]) -> List[tuple]:
+    """
+    Faixas (início, fim, perfil) para converter o documento com OCR só onde falta texto.
+    
+    Páginas com texto são agrupadas em faixas contíguas com o perfil sem OCR; cada
+    página sem texto vira uma faixa própria com o perfil original (OCR em paralelo e
+    tempo por página).
+    """
+    text_profile = text_only_profile(profile)
+    plan = []
+    for page, ocr in enumerate(needs_ocr, start=1):
+        if ocr:
+            plan.append((page, page, profile))
+        elif plan and plan[-1][2] is text_profile and plan[-1][1] == page - 1:
+            plan[-1] = (plan[-1][0], page, text_profile)
+        else:
+            plan.append((page, page, text_profile))
+    return plan
+
+
+def _merge_parts(parts: List[Dict[str, Any]], page_count: int, include_markdown: bool) -> Dict[str, Any]:
+    """Une as conversões por faixa (em ordem de página) no formato de collect_conversion()."""
+    # Tempos somados entre as faixas (tempo de CPU, não de relógio)
+    timings = StageTimer()
+    for part in parts:
+        timings.merge(part["timings"])
+    edge_text = {page: text for part in parts for page, text in part["edgeText"].items()}
+    merged = {
+        "pages": sum(part["pages"] for part in parts),
+        "edgeText": {page: edge_text[page] for page in (str(1), str(page_count)) if page in edge_text},
+        "fragments": [fragment for part in parts for fragment in part["fragments"]],
+        "warnings": [warning for part in parts for warning in part["warnings"]],
+        "timings": timings.as_dict(),
+        "workerPeakRssKb": max((part.get("peakRssKb") or 0) for part in parts)
+    }
+    if include_markdown:
+        merged["markdown"] = "\n\n".join(part["markdown"] for part in parts)
+    return merged
+
+
+def _convert_parts(pdf_path: str, plan: List[tuple], workers: int, page_count: int,
+                   include_markdown: bool, on_event: Optional[EventCallback],
+                   profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Converte as faixas (início, fim, perfil) no pool (workers > 1) ou no próprio processo."""
+    if workers <= 1:
+        parts = []
+        for start, end, part_profile in plan:
+            parts.append(_convert_page_range(pdf_path, start, end, include_markdown, part_profile))
+            if on_event:
+                on_event({"type": "progress", "stage": "convert", "pagesDone": end, "pages": page_count})
+        return parts
+    
+    pool = _get_pool(workers, profile)
+    futures = [pool.submit(_convert_page_range, pdf_path, start, end, include_markdown, part_profile)
+               for start, end, part_profile in plan]
+    pages_done = 0
+    for future in as_completed(futures):
+        part = future.result()
+        pages_done += part["pages"]
+        if on_event:
+            on_event({"type": "progress", "stage": "convert", "pagesDone": pages_done, "pages": page_count})
+    return [future.result() for future in futures]
+
+
+def convert_document(pdf_path: str, converter: Optional[DocumentConverter] = None,
+                     workers: Optional[int] = None,
+                     on_event: Optional[EventCallback] = None,
+                     include_markdown: bool = False,
+                     profile: Optional[Dict[str, Any]] = None,
+                     needs_ocr: Optional[List[bool]] = None) -> Dict[str, Any]:
+    """
+    Converte o PDF com Docling, em paralelo por faixas de páginas quando compensa.
+    
+    Args:
+        profile: perfil de conversão (pipeline_profiles.resolve_profile); o limite
+                 de páginas do perfil (maxPages) restringe a conversão às primeiras páginas
+        needs_ocr: classificação das páginas (classify_pages). Com OCR seletivo no
+                   perfil, o OCR roda só nas páginas sem texto, uma por processo; um
+                   PDF todo digital é convertido sem OCR
+    
+    Returns:
+        Dicionário de collect_conversion() com "workers" usados e, com OCR
+        seletivo, "ocr" ({"pages", "textPages", "pageMs"})
+    """
+    profile = profile or resolve_profile()
+    try:
+        page_count = get_page_count(pdf_path)
+    except Exception:
+        page_count = 0
+    
+    page_range = page_range_for(profile, page_count)
+    if page_range and page_count:
+        print(f"  ℹ Perfil {profile['name']}: convertendo só as {page_range[1]} primeiras de {page_count} páginas",
+              file=sys.stderr)
+        page_count = page_range[1]
+    
+    ocr_info = None
+    if needs_ocr is not None and profile["settings"].get("selectiveOcr") and profile["settings"]["ocr"]:
+        needs_ocr = needs_ocr[:page_count]
+        ocr_pages = [page for page, ocr in enumerate(needs_ocr, start=1) if ocr]
+        ocr_info = {"pages": ocr_pages, "textPages": len(needs_ocr) - len(ocr_pages), "pageMs": {}}
+        if not ocr_pages:
+            print("  ℹ Todas as páginas têm camada de texto: convertendo sem OCR", file=sys.stderr)
+            # Conversor sem OCR do cache do processo (aquecido antes do fork pelo
+            # serviço e pelo lote), em vez de um novo a cada PDF
+            profile = text_only_profile(profile)
+            converter = get_converter(profile)
+        elif len(ocr_pages) < len(needs_ocr):
+            plan = plan_conversion(needs_ocr, profile)
+            if workers is None:
+                # OCR é a parte lenta: uma página por processo, mesmo em PDFs curtos
+                workers = min(len(plan), int(os.environ.get("LDI_WORKERS", 0)) or os.cpu_count() or 1)
+            workers = max(1, min(workers, len(plan)))
+            print(f"🔍 OCR seletivo: páginas {', '.join(map(str, ocr_pages))} de {page_count} "
+                  f"({len(plan)} faixas, {workers} processos)", file=sys.stderr)
+            try:
+                parts = _convert_parts(pdf_path, plan, workers, page_count, include_markdown,
+                                       on_event, profile)
+            except Exception as e:
+                shutdown_pool()
+                print(f"  ⚠ OCR seletivo falhou ({e}), convertendo o documento inteiro", file=sys.stderr)
+            else:
+                ocr_info["pageMs"] = {str(start): part["timings"]["convert"]
+                                      for (start, _, part_profile), part in zip(plan, parts)
+                                      if part_profile is profile}
+                merged = _merge_parts(parts, page_count, include_markdown)
+                merged["workers"] = workers
+                merged["ocr"] = ocr_info
+                return merged
+    
+    workers = resolve_workers(workers, page_count)
+    if workers > 1:
+        ranges = split_page_ranges(page_count, workers)
+        print(f"⚡ Convertendo {page_count} páginas em {len(ranges)} faixas ({workers} processos)", file=sys.stderr)
+        try:
+            parts = _convert_parts(pdf_path, [(start, end, profile) for start, end in ranges], workers,
+                                   page_count, include_markdown, on_event, profile)
+            merged = _merge_parts(parts, page_count, include_markdown)
+            merged["workers"] = workers
+            if ocr_info is not None:
+                merged["ocr"] = ocr_info
+            return merged
+        except Exception as e:
+            # Pool quebrado ou Docling sem suporte a page_range: converter de uma vez
+            shutdown_pool()
+            print(f"  ⚠ Conversão paralela falhou ({e}), convertendo sequencialmente", file=sys.stderr)
+    
+    if converter is None:
+        converter = get_converter(profile)
+    started = time.perf_counter()
+    if page_range:
+        doc = converter.convert(pdf_path, page_range=page_range).document
+    else:
+        doc = converter.convert(pdf_path).document
+    convert_ms = elapsed_ms(started)
+    conversion = collect_conversion(doc, include_markdown=include_markdown)
+    conversion["timings"]["convert"] = convert_ms
+    conversion["workers"] = 1
+    if ocr_info is not None:
+        conversion["ocr"] = ocr_info
+    if on_event:
+        on_event({"type": "progress", "stage": "convert",
+                  "pagesDone": conversion["pages"], "pages": conversion["pages"]})
+    return conversion
+
+
+def convert_windowed(pdf_path: str, conversion: Dict[str, Any], window_pages: int,
+                     memory_limit_mb: Optional[int], converter: Optional[DocumentConverter] = None,
+                     on_event: Optional[EventCallback] = None, include_markdown: bool = False,
+                     profile: Optional[Dict[str, Any]] = None,
+                     timer: Optional[StageTimer] = None,
+                     deadline: Optional[Deadline] = None) -> Iterator[List[List[Any]]]:
+    """
+    Converte o PDF em janelas de window_pages páginas (page_windows.PageWindows) e
+    devolve as tabelas já unidas à medida que fecham, sem manter o documento do
+    Docling de mais de uma janela em memória.
+    
+    O TableStitcher atravessa as janelas: uma tabela que continua na primeira página
+    da janela seguinte (inclusive linha partida na quebra) só é devolvida quando fecha.
+    Páginas, texto das bordas, avisos, markdown e o resumo das janelas ("windows")
+    são acumulados em conversion, no formato de collect_conversion(). Com deadline,
+    as páginas que não couberam no prazo ficam em conversion["windows"]["skippedPages"].
+    """
+    profile = profile or resolve_profile()
+    timer = timer or StageTimer()
+    page_count = conversion["pages"]
+    windows = PageWindows(converter or get_converter(profile), pdf_path, page_count,
+                          window_pages, memory_limit_mb, deadline)
+    print(f"🪟 Convertendo {page_count} páginas em janelas de {windows.window_pages}", file=sys.stderr)
+    
+    stitcher = TableStitcher()
+    markdown_parts = []
+    for start, end, doc in windows:
+        part = collect_conversion(doc, first_page=start, last_page=end, include_markdown=include_markdown)
+        timer.merge(part["timings"], prefix="docling.")
+        conversion["edgeText"].update(
+            (page, text) for page, text in part["edgeText"].items() if page in ("1", str(page_count))
+        )
+        conversion["warnings"].extend(part["warnings"])
+        if include_markdown:
+            markdown_parts.append(part["markdown"])
+        if on_event:
+            on_event({"type": "progress", "stage": "convert", "pagesDone": end, "pages": page_count})
+        for fragment in part["fragments"]:
+            yield from stitcher.feed(fragment["page"], fragment["rows"])
+    yield from stitcher.flush()
+    
+    timer.merge({"convert": sum(window["convertMs"] for window in windows.windows)}, prefix="docling.")
+    conversion["windows"] = windows.summary()
+    if include_markdown:
+        conversion["markdown"] = "\n\n".join(markdown_parts)
+
+
+def _cache_key(pdf_hash: str, *parts: str) -> str:
+    return ":".join((pdf_hash,) + parts)
+
+
+def parse_ldi_pdf(pdf_path: str, converter: Optional[DocumentConverter] = None,
+                  strategy: str = "auto", workers: Optional[int] = None,
+                  use_cache: bool = True, cache: Optional[ResultCache] = None,
+                  on_event: Optional[EventCallback] = None, profile: bool = False,
+                  include_markdown: bool = False, pipeline: Optional[str] = None,
+                  max_pages: Optional[int] = None, diff_against: Optional[str] = None,
+                  save_index: Optional[str] = None, window_pages: Optional[int] = None,
+                  memory_limit_mb: Optional[int] = None,
+                  residents: Optional[str] = None, document=None,
+                  deadline_s: Optional[float] = None,
+                  tracking_index: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Processa PDF de LDI dos Correios e retorna dados estruturados.
+    
+    Args:
+        pdf_path: Caminho para o arquivo PDF
+        converter: DocumentConverter já carregado (padrão: conversor compartilhado do processo)
+        strategy: "auto" (camada de texto, Docling se a contagem não bater),
+                  "text" (apenas camada de texto) ou "docling" (apenas Docling)
+        workers: processos para converter faixas de páginas em paralelo
+                 (padrão: automático pelo número de páginas; 1 = sequencial)
+        use_cache: consultar/gravar o cache local de resultados e conversões
+        cache: cache a usar (padrão: cache compartilhado, ver ldi_cache.py)
+        on_event: recebe cada pacote ({"type": "package"}) assim que é extraído e
+                  eventos de progresso ({"type": "progress"}) por página e por tabela
+        profile: grava um dump cProfile (<pdf>.pstats) ao lado do PDF
+        include_markdown: exporta também o markdown do documento em result["markdown"]
+                          (apenas quando o Docling é usado; desligado por padrão)
+        pipeline: perfil de conversão do Docling ("default", "fast", "accurate";
+                  padrão: LDI_PIPELINE ou "default"), registrado em metadata.pipeline
+        max_pages: limite de páginas convertidas pelo Docling (sobrepõe o do perfil)
+        diff_against: resultado JSON ou índice (save_index) de uma LDI anterior; quando
+                      informado, "packages" (e os eventos "package") trazem só os pacotes
+                      novos ou alterados e result["diff"] lista as mudanças e os removidos
+        save_index: grava o índice por código de rastreio do resultado completo neste
+                    caminho, para servir de diff_against na próxima LDI
+        window_pages: converte com o Docling N páginas por vez, liberando cada janela
+                      antes da seguinte (padrão: LDI_WINDOW_PAGES; 0 = documento inteiro)
+        memory_limit_mb: teto de RSS (MB); acima dele as janelas diminuem pela metade
+                         (padrão: LDI_MEMORY_LIMIT_MB; sozinho, liga janelas de 10 páginas)
+        residents: lista de moradores exportada (JSON, ver recipient_index.py; padrão:
+                   LDI_RESIDENTS), carregada uma vez por processo: separa nomes de
+                   células mescladas e adiciona residentId/matchScore a cada pacote
+        document: documento do Docling já convertido deste PDF (pipeline.py): as
+                  estratégias que usam o Docling leem dele em vez de converter de novo
+        deadline_s: orçamento de tempo (s) da chamada. A conversão do Docling passa a
+                    ser feita em janelas e para quando o tempo acaba; as páginas não
+                    convertidas são lidas só da camada de texto. O resultado parcial
+                    traz metadata.degraded e metadata.skippedStages e não vai para o cache
+        tracking_index: índice persistente de códigos (SQLite, ver tracking_index.py;
+                        padrão: LDI_TRACKING_INDEX): cada pacote ganha seenStatus
+                        ("new", "repeat" ou "delivered") e os códigos desta LDI são
+                        registrados para as próximas
+    
+    Returns:
+        Dicionário com dados extraídos no formato esperado pelo Node.js.
+        metadata.stages traz a duração (ms) de cada etapa, metadata.tables
+        linhas/pacotes/tempo por tabela e metadata.memory o RSS de pico.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Estratégia inválida: {strategy} (use {', '.join(STRATEGIES)})")
+    
+    deadline = Deadline(deadline_s) if deadline_s else None
+    pipeline_profile = resolve_profile(pipeline, maxPages=max_pages)
+    window = resolve_window(window_pages, memory_limit_mb)
+    resident_index = recipient_index.get_index(residents)
+    tracker = get_tracking_index(tracking_index)
+    previous_index = ldi_diff.load_index(diff_against) if diff_against else None
+    if previous_index is not None and on_event:
+        on_event = _diff_events(on_event, ldi_diff.DiffTracker(previous_index))
+    if resident_index is not None:
+        # Todo pacote passa por _emit_packages: a associação acontece antes do
+        # streaming e do cache, e vale também para o resultado final
+        on_event = _resident_events(on_event, resident_index)
+    
+    profile_info: Dict[str, Any] = {}
+    with maybe_profile(profile, pdf_path, profile_info):
+        result = _parse_ldi_pdf(pdf_path, converter, strategy, workers, use_cache, cache, on_event,
+                                include_markdown, pipeline_profile, window, resident_index, document,
+                                deadline)
+    if "profile" in profile_info:
+        result["metadata"]["profile"] = profile_info["profile"]
+    if tracker is not None and result["packages"]:
+        _classify_seen(result, tracker, pdf_path)
+    
+    # Índice e "removidos" só a partir de uma extração bem-sucedida e completa: uma
+    # falha (ou páginas puladas pelo prazo) marcaria pacotes anteriores como removidos.
+    # O filtro de novos/alterados vale sempre, como no streaming (_diff_events), para
+    # os pacotes emitidos e os do resultado serem os mesmos
+    complete = result["success"] and not result["metadata"].get("degraded")
+    if save_index:
+        if complete:
+            ldi_diff.save_index(save_index, result)
+        else:
+            result["warnings"].append("Resultado parcial ou com falha: índice não gravado")
+    if previous_index is not None:
+        ldi_diff.apply_diff(result, previous_index, Path(diff_against).name, partial=not complete)
+        diff = result["diff"]
+        if complete:
+            print(f"🔀 Diff: {len(diff['added'])} novos, {len(diff['changed'])} alterados, "
+                  f"{len(diff['removed'])} removidos, {diff['unchanged']} iguais", file=sys.stderr)
+        else:
+            result["warnings"].append("Resultado parcial ou com falha: diff sem removidos (diff.partial)")
+    return result
+
+
+def _classify_seen(result: Dict[str, Any], tracker: TrackingIndex, pdf_path: str) -> None:
+    """Situação de cada pacote no índice de códigos (fora do cache: muda a cada upload)."""
+    started = time.perf_counter()
+    try:
+        counts = tracker.classify(result["packages"], source=file_sha256(pdf_path))
+    except (sqlite3.Error, OSError) as e:
+        # O índice é opcional: falhas de disco/banco nunca interrompem o parse
+        result["warnings"].append(f"Índice de códigos indisponível: {e}")
+        print(f"⚠ Índice de códigos indisponível: {e}", file=sys.stderr)
+        return
+    result["metadata"]["seen"] = {**counts, "ms": elapsed_ms(started)}
+    print(f"🗂 Índice de códigos: {counts['new']} novos, {counts['repeat']} repetidos, "
+          f"{counts['delivered']} já entregues", file=sys.stderr)
+
+
+def _resident_events(on_event: Optional[EventCallback], index: RecipientIndex) -> EventCallback:
+    """Associa cada pacote a um morador (residentId/matchScore) antes de repassar o evento."""
+    def forward(event: Dict[str, Any]) -> None:
+        if event.get("type") == "package" and "residentId" not in event["package"]:
+            index.annotate(event["package"])
+        if on_event:
+            on_event(event)
+    return forward
+
+
+def _diff_events(on_event: EventCallback, tracker: ldi_diff.DiffTracker) -> EventCallback:
+    """Repassa só os eventos "package" de pacotes novos ou alterados (com "change")."""
+    def forward(event: Dict[str, Any]) -> None:
+        if event.get("type") == "package":
+            change = tracker.observe(event["package"])
+            if change is None:
+                return
+            event = {**event, "change": change}
+        on_event(event)
+    return forward
+
+
+def _parse_ldi_pdf(pdf_path: str, converter: Optional[DocumentConverter], strategy: str,
+                   workers: Optional[int], use_cache: bool, cache: Optional[ResultCache],
+                   on_event: Optional[EventCallback], include_markdown: bool,
+                   pipeline_profile: Dict[str, Any], window: tuple = (0, None),
+                   resident_index: Optional[RecipientIndex] = None, document=None,
+                   deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    result = _new_result(pdf_path)
+    timer = StageTimer()
     start_time = datetime.now()
     
     try:
@@ -262,209 +1332,46 @@ def parse_ldi_pdf(pdf_path: str) -> Dict[str, Any]:
         
         print(f"📄 Processando LDI: {pdf_file.name}", file=sys.stderr)
         
-        # Converter PDF com Docling
-        converter = DocumentConverter()
-        doc_result = converter.convert(str(pdf_file))
-        doc = doc_result.document
-        
-        # Contar páginas
-        if hasattr(doc, 'pages'):
-            result["metadata"]["pagesProcessed"] = len(doc.pages)
-        
-        # Extrair texto para buscar metadados
-        markdown_text = doc.export_to_markdown()
-        
-        # Buscar total esperado no texto
-        total_match = re.search(r'Total de objetos:\s*(\d+)', markdown_text)
-        if total_match:
-            result["metadata"]["expectedTotal"] = int(total_match.group(1))
+        if use_cache and cache is None:
+            cache = get_default_cache()
+        if not use_cache:
+            cache = None
         
-        # NOVO: Extrair data de ENTRADA do cabeçalho (Impresso em: DD/MM/YYYY)
-        # Esta é a data de chegada da lista, igual para TODOS os pacotes
-        arrival_date_str = None
-        arrival_date_iso = None
-        arrival_match = re.search(r'Impresso em:\s*(\d{2}/\d{2}/\d{4})', markdown_text)
-        if arrival_match:
-            arrival_date_str = arrival_match.group(1)
-            result["metadata"]["arrivalDate"] = arrival_date_str
-            parsed_arrival = parse_date(arrival_date_str)
-            if parsed_arrival:
-                arrival_date_iso = parsed_arrival['dateISO']
-                print(f"📅 Data de Entrada (cabeçalho): {arrival_date_str} ({arrival_date_iso})", file=sys.stderr)
-        
-        # Buscar data de devolução (prazo de retirada)
-        return_date_str = None
-        return_date_iso = None
-        return_date_match = re.search(r'Data de Devolução:\s*(\d{2}/\d{2}/\d{4})', markdown_text)
-        if return_date_match:
-            return_date_str = return_date_match.group(1)
-            result["metadata"]["returnDate"] = return_date_str
-            # Converter para ISO
-            parsed_return = parse_date(return_date_str)
-            if parsed_return:
-                return_date_iso = parsed_return['dateISO']
-                print(f"📅 Data de Devolução (cabeçalho): {return_date_str} ({return_date_iso})", file=sys.stderr)
-        
-        # Processar tabelas
-        all_packages = []
-        seen_codes = set()
-        
-        tables = doc.tables
-        print(f"📊 Tabelas encontradas: {len(tables)}", file=sys.stderr)
-        
-        for i, table in enumerate(tables):
-            try:
-                # Exportar tabela para DataFrame e depois para lista
-                df = table.export_to_dataframe()
-                table_data = [df.columns.tolist()] + df.values.tolist()
-                
-                packages = extract_packages_from_table(table_data)
-                
-                # Filtrar duplicados e adicionar datas do CABEÇALHO
-                for pkg in packages:
-                    if pkg["trackingCode"] not in seen_codes:
-                        seen_codes.add(pkg["trackingCode"])
-                        
-                        # IMPORTANTE: Usar data de ENTRADA do cabeçalho para TODOS os pacotes
-                        if arrival_date_iso:
-                            pkg["date"] = arrival_date_str
-                            pkg["dateISO"] = arrival_date_iso
-                        
-                        # Adicionar data de devolução/prazo de retirada do cabeçalho
-                        if return_date_iso:
-                            pkg["pickupDeadline"] = return_date_iso
-                            pkg["pickupDeadlineStr"] = return_date_str
-                        else:
-                            # Se não encontrou no PDF, calcular 7 dias após a data de chegada
-                            try:
-                                arrival = datetime.fromisoformat(pkg["dateISO"])
-                                deadline = arrival + timedelta(days=7)
-                                pkg["pickupDeadline"] = deadline.strftime("%Y-%m-%d")
-                                pkg["pickupDeadlineStr"] = deadline.strftime("%d/%m/%Y")
-                            except:
-                                # Fallback: 7 dias a partir de hoje
-                                deadline = datetime.now() + timedelta(days=7)
-                                pkg["pickupDeadline"] = deadline.strftime("%Y-%m-%d")
-                                pkg["pickupDeadlineStr"] = deadline.strftime("%d/%m/%Y")
-                        
-                        all_packages.append(pkg)
-                
-                print(f"  ✓ Tabela {i+1}: {len(packages)} pacotes extraídos", file=sys.stderr)
-                
-            except Exception as e:
-                result["warnings"].append(f"Erro ao processar tabela {i+1}: {str(e)}")
-                print(f"  ⚠ Tabela {i+1}: erro - {e}", file=sys.stderr)
+        pdf_hash = None
+        result_key = None
+        if cache is not None:
+            with timer.stage("hash"):
+                pdf_hash = file_sha256(str(pdf_file))
+            result_key = _cache_key(pdf_hash, PARSER_STAMP, strategy, profile_signature(pipeline_profile),
+                                    *(("md",) if include_markdown else ()),
+                                    *((f"res-{resident_index.signature}",) if resident_index else ()))
+            
+            with timer.stage("cacheLookup"):
+                cached = cache.get(KIND_RESULT, result_key)
+            if cached is not None:
+                print(f"⚡ Resultado em cache ({pdf_hash[:12]}...)", file=sys.stderr)
+                cached["metadata"]["fileName"] = pdf_file.name
+                cached["metadata"]["cache"] = _cache_metadata(cache, pdf_hash, hit=True)
+                # Tabelas/tempos gravados são da execução original
+                cached["metadata"].pop("tables", None)
+                result = cached
+                _emit_packages(on_event, result["packages"])
+                return result
         
-        result["packages"] = all_packages
-        result["totalPackages"] = len(all_packages)
-        result["metadata"]["extractedTotal"] = len(all_packages)
-        result["success"] = len(all_packages) > 0
+        conversion_hit = False
+        if not _parse_with_text_layer(pdf_file, result, strategy, on_event, timer):
+            conversion_hit = _parse_with_docling(pdf_file, result, converter, workers,
+                                                 cache, pdf_hash, on_event, timer, include_markdown,
+                                                 pipeline_profile, *window, resident_index, document,
+                                                 deadline)
+        _check_expected_total(result)
         
-        # FALLBACK: Se faltam pacotes, tentar extrair do texto bruto usando pypdfium2
-        expected_total = result["metadata"]["expectedTotal"]
-        if expected_total > 0 and len(all_packages) < expected_total:
-            missing_count = expected_total - len(all_packages)
-            print(f"  ⚠ Faltam {missing_count} pacotes, tentando fallback com pypdfium2...", file=sys.stderr)
-            
-            try:
-                import pypdfium2 as pdfium
-                
-                # Extrair texto bruto do PDF
-                pdf_doc = pdfium.PdfDocument(pdf_path)
-                raw_text = ''
-                for page in pdf_doc:
-                    textpage = page.get_textpage()
-                    raw_text += textpage.get_text_bounded()
-                
-                # Encontrar todos os códigos de rastreio no texto bruto
-                TRACKING_FINDER = re.compile(r'[A-Z]{2}\d{9}[A-Z]{2}')
-                all_codes_in_pdf = set(TRACKING_FINDER.findall(raw_text))
-                
-                # Identificar códigos faltantes
-                missing_codes = all_codes_in_pdf - seen_codes
-                
-                if missing_codes:
-                    print(f"  ✓ Encontrados {len(missing_codes)} códigos faltantes no texto bruto", file=sys.stderr)
-                    
-                    # Para cada código faltante, tentar extrair dados da linha
-                    for code in missing_codes:
-                        # Buscar contexto do código no texto
-                        idx = raw_text.find(code)
-                        if idx == -1:
-                            continue
-                        
-                        context = raw_text[max(0, idx-100):idx+150]
-                        
-                        # Tentar extrair dados do contexto
-                        # Formato esperado: "92 07/01/2026 PCM - 94 AB864169553BR MELRY COSTA"
-                        
-                        # Extrair número da linha
-                        line_number = len(all_packages) + 1
-                        line_match = re.search(r'(\d{1,3})\s+\d{2}/\d{2}/\d{4}.*?' + re.escape(code), context)
-                        if line_match:
-                            line_number = int(line_match.group(1))
-                        
-                        # USAR DATA DO CABEÇALHO (já extraída anteriormente)
-                        date_str = arrival_date_str or ""
-                        date_iso = arrival_date_iso or datetime.now().strftime("%Y-%m-%d")
-                        
-                        # Extrair posição
-                        position = ""
-                        pos_match = re.search(r'(PCM\s*-\s*\d+)', context)
-                        if pos_match:
-                            position = pos_match.group(1)
-                        
-                        # Extrair nome (texto após o código até quebra de linha ou caracteres especiais)
-                        recipient = "NOME NÃO IDENTIFICADO"
-                        after_code = context[context.find(code) + len(code):].strip()
-                        name_match = re.match(r'[\r\n]*([A-ZÀ-Ú][A-ZÀ-Úa-zà-ú\s]+?)(?=\s*[:\&_\r\n]|$)', after_code)
-                        if name_match:
-                            recipient = clean_recipient_name(name_match.group(1))
-                        
-                        pkg = {
-                            "lineNumber": line_number,
-                            "trackingCode": code,
-                            "recipient": recipient,
-                            "position": position,
-                            "date": date_str,
-                            "dateISO": date_iso,
-                            "confidence": 60  # Menor confiança para fallback
-                        }
-                        
-                        # Adicionar data de devolução
-                        if return_date_iso:
-                            pkg["pickupDeadline"] = return_date_iso
-                            pkg["pickupDeadlineStr"] = return_date_str
-                        else:
-                            try:
-                                arrival = datetime.fromisoformat(date_iso)
-                                deadline = arrival + timedelta(days=7)
-                                pkg["pickupDeadline"] = deadline.strftime("%Y-%m-%d")
-                                pkg["pickupDeadlineStr"] = deadline.strftime("%d/%m/%Y")
-                            except:
-                                deadline = datetime.now() + timedelta(days=7)
-                                pkg["pickupDeadline"] = deadline.strftime("%Y-%m-%d")
-                                pkg["pickupDeadlineStr"] = deadline.strftime("%d/%m/%Y")
-                        
-                        all_packages.append(pkg)
-                        seen_codes.add(code)
-                        print(f"    + Fallback: {code} ({recipient})", file=sys.stderr)
-                    
-                    # Atualizar totais
-                    result["packages"] = all_packages
-                    result["totalPackages"] = len(all_packages)
-                    result["metadata"]["extractedTotal"] = len(all_packages)
-                    
-            except Exception as e:
-                result["warnings"].append(f"Fallback pypdfium2 falhou: {str(e)}")
-                print(f"  ⚠ Fallback pypdfium2 falhou: {e}", file=sys.stderr)
-        # Verificar se extraiu o total esperado
-        if result["metadata"]["expectedTotal"] > 0:
-            diff = result["metadata"]["expectedTotal"] - len(all_packages)
-            if diff > 0:
-                result["warnings"].append(f"Faltam {diff} pacotes ({len(all_packages)}/{result['metadata']['expectedTotal']})")
-            elif diff < 0:
-                result["warnings"].append(f"{abs(diff)} pacotes extras ({len(all_packages)}/{result['metadata']['expectedTotal']})")
+        if cache is not None:
+            result["metadata"]["cache"] = _cache_metadata(cache, pdf_hash, hit=False,
+                                                          conversion_hit=conversion_hit)
+            if not result["errors"] and not result["metadata"].get("degraded"):
+                with timer.stage("cacheStore"):
+                    cache.put(KIND_RESULT, result_key, result)
         
     except Exception as e:
         result["errors"].append(str(e))
@@ -473,33 +1380,620 @@ def parse_ldi_pdf(pdf_path: str) -> Dict[str, Any]:
     finally:
         end_time = datetime.now()
         result["metadata"]["processingTime"] = int((end_time - start_time).total_seconds() * 1000)
+        result["metadata"]["stages"] = timer.as_dict()
+        result["metadata"]["memory"] = {**result["metadata"].get("memory", {}), **peak_memory()}
     
     return result
 
 
+def _emit_packages(on_event: Optional[EventCallback], packages: List[Dict[str, Any]]) -> None:
+    if on_event:
+        for pkg in packages:
+            on_event({"type": "package", "package": pkg})
+
+
+def summary_event(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Linha final do modo streaming: o resultado sem a lista de pacotes."""
+    summary = {
+        "type": "summary",
+        "success": result["success"],
+        "totalPackages": result["totalPackages"],
+        "errors": result["errors"],
+        "warnings": result["warnings"],
+        "metadata": result["metadata"]
+    }
+    if "markdown" in result:
+        summary["markdown"] = result["markdown"]
+    if "diff" in result:
+        summary["diff"] = result["diff"]
+    if "seen" in result["metadata"]:
+        # Os pacotes já foram emitidos antes da consulta ao índice: só os não novos
+        summary["seen"] = {
+            pkg["trackingCode"]: {"status": pkg["seenStatus"], "firstSeenAt": pkg.get("firstSeenAt")}
+            for pkg in result["packages"] if pkg.get("seenStatus", "new") != "new"
+        }
+    return summary
+
+
+def _cache_metadata(cache: ResultCache, pdf_hash: str, hit: bool,
+                    conversion_hit: bool = False) -> Dict[str, Any]:
+    return {
+        "hit": hit,
+        "conversionHit": conversion_hit,
+        "key": pdf_hash[:16],
+        "parserStamp": PARSER_STAMP,
+        **cache.stats()
+    }
+
+
+def _parse_with_text_layer(pdf_file: Path, result: Dict[str, Any], strategy: str,
+                           on_event: Optional[EventCallback], timer: StageTimer) -> bool:
+    """Caminho rápido: LDIs digitais têm camada de texto limpa. Retorna True se resolveu."""
+    if strategy not in ("auto", "text"):
+        return False
+    
+    try:
+        text_result = parse_text_layer(str(pdf_file), on_event, timer)
+    except Exception as e:
+        if strategy == "text":
+            raise
+        print(f"  ⚠ Camada de texto indisponível: {e}", file=sys.stderr)
+        return False
+    
+    found = len(text_result["packages"])
+    expected = text_result["header"]["expectedTotal"]
+    if not text_result["verified"] and strategy != "text":
+        print(f"  ⚠ Camada de texto: {found}/{expected} pacotes, usando Docling...", file=sys.stderr)
+        return False
+    
+    _log_header(text_result["header"])
+    _store_header(result, text_result["header"])
+    result["packages"] = text_result["packages"]
+    result["totalPackages"] = found
+    result["success"] = found > 0
+    result["metadata"]["strategy"] = "text-layer"
+    result["metadata"]["extractedTotal"] = found
+    result["metadata"]["pagesProcessed"] = text_result["pages"]
+    print(f"  ✓ Camada de texto: {found}/{expected} pacotes", file=sys.stderr)
+    # Só emitidos após a conferência do total, para não duplicar se cair no Docling
+    _emit_packages(on_event, result["packages"])
+    return True
+
+
+def _parse_with_docling(pdf_file: Path, result: Dict[str, Any],
+                        converter: Optional[DocumentConverter], workers: Optional[int],
+                        cache: Optional[ResultCache], pdf_hash: Optional[str],
+                        on_event: Optional[EventCallback], timer: StageTimer,
+                        include_markdown: bool, pipeline_profile: Dict[str, Any],
+                        window_pages: int = 0, memory_limit_mb: Optional[int] = None,
+                        resident_index: Optional[RecipientIndex] = None, document=None,
+                        deadline: Optional[Deadline] = None) -> bool:
+    """
+    Estratégia completa: tabelas via Docling/TableFormer + fallback no texto bruto.
+    
+    Com window_pages, PDFs maiores que a janela são convertidos por janelas
+    (convert_windowed): a conversão não vai para o cache, já que os fragmentos não
+    ficam todos em memória.
+    
+    Com deadline, a conversão é sempre feita em janelas (DEADLINE_WINDOW_PAGES, se
+    window_pages não foi dado), mesmo em PDFs menores que uma janela, e para quando
+    o prazo acaba; se ele acabou antes da conversão, o Docling é pulado. O tempo da
+    camada de texto fica reservado no prazo para o fallback, que completa o que
+    faltar; metadata.degraded/skippedStages registram o que ficou de fora.
+    
+    Returns:
+        True se a conversão do Docling veio do cache
+    """
+    result["metadata"]["strategy"] = "docling"
+    result["metadata"]["pipeline"] = pipeline_profile
+    
+    # Índice dos códigos na camada de texto: página/offsets de cada pacote e
+    # base do fallback para códigos que as tabelas não trouxeram. Lido antes da
+    # conversão: a quantidade de texto por página decide onde rodar OCR
+    page_texts: List[str] = []
+    code_index: Dict[str, Dict[str, int]] = {}
+    text_layer_error = None
+    with timer.stage("locate"):
+        try:
+            page_texts = read_text_layer(str(pdf_file))
+            code_index = index_tracking_codes(page_texts)
+        except Exception as e:
+            text_layer_error = e
+    needs_ocr = classify_pages(page_texts) if page_texts else None
+    
+    # A conversão é a parte cara: fica em cache separado do resultado, assim
+    # mudanças nas heurísticas de extração não exigem converter de novo
+    conversion = None
+    conversion_key = None
+    if cache is not None:
+        conversion_key = _cache_key(pdf_hash, CONVERSION_VERSION, profile_signature(pipeline_profile),
+                                    *(("md",) if include_markdown else ()))
+    if cache is not None:
+        with timer.stage("cacheLookup"):
+            conversion = cache.get(KIND_CONVERSION, conversion_key)
+    conversion_hit = conversion is not None
+    provided = not conversion_hit and document is not None
+    if provided:
+        # Documento convertido por quem chamou (pipeline.py): só a redução
+        with timer.stage("collect"):
+            conversion = collect_conversion(document, include_markdown=include_markdown)
+        conversion["workers"] = 1
+    
+    skipped_stages: List[str] = []
+    skipped_pages = None
+    if conversion is None and deadline is not None:
+        window_pages = window_pages or DEADLINE_WINDOW_PAGES
+        # O fallback percorre o mesmo texto depois da conversão: o tempo da leitura
+        # fica reservado para ele, fora do tempo disponível para o Docling
+        deadline.reserve(timer.stages.get("locate", 0))
+        if deadline.expired():
+            skipped_stages.append("convert")
+            conversion = {"pages": len(page_texts), "edgeText": {}, "fragments": [],
+                          "warnings": [], "timings": {}, "workers": 0}
+            skipped_pages = [1, len(page_texts)] if page_texts else None
+    
+    page_count = 0
+    if conversion is None and window_pages:
+        try:
+            page_count = get_page_count(str(pdf_file))
+        except Exception:
+            page_count = 0
+        page_range = page_range_for(pipeline_profile, page_count)
+        if page_range and page_count:
+            page_count = page_range[1]
+    if deadline is not None and conversion is None:
+        # Com prazo nunca há conversão de uma vez só, que não teria como parar
+        page_count = page_count or len(page_texts)
+        windowed = page_count > 0
+    else:
+        windowed = page_count > window_pages > 0
+    
+    if conversion_hit:
+        print(f"⚡ Conversão Docling em cache ({pdf_hash[:12]}...)", file=sys.stderr)
+    elif skipped_stages:
+        print("⏱ Prazo esgotado antes da conversão: usando só a camada de texto", file=sys.stderr)
+    elif provided:
+        print("♻ Usando o documento Docling já convertido", file=sys.stderr)
+    elif windowed:
+        # Preenchida à medida que as janelas são convertidas (ver convert_windowed)
+        conversion = {"pages": page_count, "edgeText": {}, "fragments": None,
+                      "warnings": [], "timings": {}, "workers": 1}
+    else:
+        # Converter PDF com Docling (reaproveita o conversor já carregado)
+        with timer.stage("convertTotal"):
+            conversion = convert_document(str(pdf_file), converter, workers, on_event, include_markdown,
+                                          pipeline_profile, needs_ocr)
+        # Etapas internas da conversão (somadas entre processos no modo paralelo)
+        timer.merge(conversion["timings"], prefix="docling.")
+        if conversion.get("workerPeakRssKb"):
+            result["metadata"]["memory"] = {"workerPeakRssKb": conversion["workerPeakRssKb"]}
+        if cache is not None and not conversion["warnings"]:
+            with timer.stage("cacheStore"):
+                cache.put(KIND_CONVERSION, conversion_key, conversion)
+    
+    result["metadata"]["pagesProcessed"] = conversion["pages"]
+    result["metadata"]["workers"] = conversion["workers"]
+    if conversion.get("ocr"):
+        result["metadata"]["ocr"] = conversion["ocr"]
+    
+    # Cabeçalho/rodapé: primeira e última página da camada de texto e, para o
+    # que faltar (PDF escaneado), os itens de texto do Docling dessas páginas
+    with timer.stage("header"):
+        header = extract_edge_header(page_texts)
+        edge_text = conversion["edgeText"]
+        docling_pages = [edge_text[page] for page in sorted(edge_text, key=int)]
+        header = merge_header(header, extract_edge_header(docling_pages))
+    _log_header(header)
+    _store_header(result, header)
+    
+    # Processar tabelas (fragmentos de páginas consecutivas já unidos)
+    all_packages = []
+    seen_codes = set()
+    table_stats = []
+    result["metadata"]["tables"] = table_stats
+    
+    # Em janelas, o texto do Docling da última página só chega com a última janela:
+    # se a camada de texto não trouxe as datas do cabeçalho, os pacotes ficam retidos
+    # até o cabeçalho ser completado, para não sair pacote com data/prazo errados
+    held: Optional[List[Dict[str, Any]]] = None
+    if windowed and not header_dates_complete(header):
+        held = []
+    
+    if windowed:
+        window_profile = pipeline_profile
+        if (needs_ocr is not None and not any(needs_ocr) and pipeline_profile["settings"].get("selectiveOcr")
+                and pipeline_profile["settings"]["ocr"]):
+            # PDF todo digital: janelas sem OCR
+            window_profile = text_only_profile(pipeline_profile)
+            converter = get_converter(window_profile)
+        tables = convert_windowed(str(pdf_file), conversion, window_pages, memory_limit_mb, converter,
+                                  on_event, include_markdown, window_profile, timer, deadline)
+        table_total = None
+    else:
+        with timer.stage("stitch"):
+            tables = stitch_table_fragments(conversion["fragments"])
+        table_total = len(tables)
+        print(f"📊 Tabelas encontradas: {len(tables)} ({len(conversion['fragments'])} fragmentos)", file=sys.stderr)
+    
+    for i, table_data in enumerate(tables):
+        started = time.perf_counter()
+        try:
+            packages = extract_packages_from_table(table_data, resident_index)
+            
+            # Filtrar duplicados e adicionar datas do CABEÇALHO
+            new_packages = []
+            for pkg in packages:
+                if pkg["trackingCode"] not in seen_codes:
+                    seen_codes.add(pkg["trackingCode"])
+                    apply_header_dates(pkg, header)
+                    attach_location(pkg, code_index)
+                    new_packages.append(pkg)
+            all_packages.extend(new_packages)
+            table_ms = elapsed_ms(started)
+            timer.add("extract", table_ms)
+            table_stats.append({
+                "table": i + 1,
+                "rows": max(len(table_data) - 1, 0),
+                "packages": len(packages),
+                "newPackages": len(new_packages),
+                "ms": table_ms
+            })
+            if held is None:
+                _emit_packages(on_event, new_packages)
+            else:
+                held.extend(new_packages)
+            
+            print(f"  ✓ Tabela {i+1}: {len(packages)} pacotes extraídos", file=sys.stderr)
+            if on_event:
+                on_event({"type": "progress", "stage": "table", "table": i + 1,
+                          "tables": table_total, "packages": len(new_packages)})
+            
+        except Exception as e:
+            result["warnings"].append(f"Erro ao processar tabela {i+1}: {str(e)}")
+            print(f"  ⚠ Tabela {i+1}: erro - {e}", file=sys.stderr)
+    
+    result["warnings"].extend(conversion["warnings"])
+    if include_markdown:
+        result["markdown"] = conversion.get("markdown", "")
+    
+    if windowed:
+        result["metadata"]["windows"] = conversion["windows"]
+        if conversion["windows"]["skippedPages"]:
+            skipped_pages = conversion["windows"]["skippedPages"]
+            skipped_stages.append("convert")
+        # O texto da última página do Docling só existe depois da última janela: o
+        # que faltou no cabeçalho (PDF escaneado) é completado agora
+        edge_text = conversion["edgeText"]
+        full_header = merge_header(header, extract_edge_header(
+            [edge_text[page] for page in sorted(edge_text, key=int)]))
+        if full_header != header:
+            header = full_header
+            _log_header(header)
+            _store_header(result, header)
+            for pkg in all_packages:
+                apply_header_dates(pkg, header)
+        _emit_packages(on_event, held or [])
+    
+    result["packages"] = all_packages
+    result["totalPackages"] = len(all_packages)
+    result["metadata"]["extractedTotal"] = len(all_packages)
+    result["success"] = len(all_packages) > 0
+    
+    if deadline is not None:
+        result["metadata"]["degraded"] = bool(skipped_stages)
+        result["metadata"]["skippedStages"] = skipped_stages
+        result["metadata"]["deadline"] = {"budgetMs": deadline.seconds * 1000, "skippedPages": skipped_pages}
+        if skipped_pages:
+            result["warnings"].append(f"Prazo de {deadline.seconds:g}s esgotado: páginas "
+                                      f"{skipped_pages[0]}-{skipped_pages[1]} lidas só da camada de texto")
+    
+    # FALLBACK: Se faltam pacotes, tentar extrair do texto bruto usando pypdfium2
+    # (sempre que o prazo deixou páginas sem conversão, mesmo sem total no cabeçalho)
+    expected_total = header["expectedTotal"]
+    if skipped_stages or (expected_total > 0 and len(all_packages) < expected_total):
+        if skipped_stages:
+            print("  ⏱ Completando as páginas puladas com o fallback pypdfium2...", file=sys.stderr)
+        else:
+            missing_count = expected_total - len(all_packages)
+            print(f"  ⚠ Faltam {missing_count} pacotes, tentando fallback com pypdfium2...", file=sys.stderr)
+        
+        fallback_started = time.perf_counter()
+        try:
+            if text_layer_error is not None:
+                raise text_layer_error
+            
+            # Códigos da camada de texto que as tabelas não trouxeram (ordem do documento)
+            missing_codes = [code for code in code_index if code not in seen_codes]
+            
+            if missing_codes:
+                print(f"  ✓ Encontrados {len(missing_codes)} códigos faltantes no texto bruto", file=sys.stderr)
+                
+                # Para cada código faltante, ler os dados da própria linha
+                for code in missing_codes:
+                    entry = code_index[code]
+                    row = parse_indexed_row(code, entry, page_texts[entry["page"] - 1],
+                                            len(all_packages) + 1)
+                    
+                    # USAR DATA DO CABEÇALHO (já extraída anteriormente)
+                    pkg = {
+                        "lineNumber": row["lineNumber"],
+                        "trackingCode": code,
+                        "recipient": row["recipient"],
+                        "position": row["position"],
+                        "date": header["arrivalDate"] or "",
+                        "dateISO": header["arrivalDateISO"] or datetime.now().strftime("%Y-%m-%d"),
+                        "confidence": 60  # Menor confiança para fallback
+                    }
+                    apply_header_dates(pkg, header)
+                    attach_location(pkg, code_index)
+                    
+                    all_packages.append(pkg)
+                    seen_codes.add(code)
+                    _emit_packages(on_event, [pkg])
+                    print(f"    + Fallback: {code} ({row['recipient']}, pág. {entry['page']})", file=sys.stderr)
+                
+                # Atualizar totais
+                result["packages"] = all_packages
+                result["totalPackages"] = len(all_packages)
+                result["success"] = len(all_packages) > 0
+                result["metadata"]["extractedTotal"] = len(all_packages)
+                result["metadata"]["strategy"] = "docling+pypdfium2"
+                
+        except Exception as e:
+            result["warnings"].append(f"Fallback pypdfium2 falhou: {str(e)}")
+            print(f"  ⚠ Fallback pypdfium2 falhou: {e}", file=sys.stderr)
+        timer.add("fallback", elapsed_ms(fallback_started))
+    
+    if deadline is not None:
+        # Camada de texto (tentativa rápida, índice e fallback) também conta no prazo
+        result["metadata"]["deadline"]["textLayerMs"] = round(sum(
+            timer.stages.get(name, 0) for name in ("readText", "parseRows", "locate", "fallback")), 1)
+    return conversion_hit
+
+
+def serve(input_stream=None, output_stream=None, strategy: str = "auto",
+          workers: Optional[int] = None, use_cache: bool = True,
+          pipeline: Optional[str] = None, residents: Optional[str] = None) -> None:
+    """
+    Modo worker persistente: carrega o conversor uma vez e atende pedidos JSON-lines.
+    
+    Cada linha recebida em stdin é um objeto JSON:
+        {"id": "1", "path": "/tmp/ldi.pdf"}    -> {"type": "result", "id": "1", "result": {...}}
+        {"id": "1", "path": "...", "strategy": "docling"}  (estratégia opcional por pedido)
+        {"id": "1", "path": "...", "pipeline": "fast", "maxPages": 2}  (perfil de conversão opcional)
+        {"id": "1", "path": "...", "windowPages": 10, "memoryLimitMb": 1500}  (conversão em janelas)
+        {"id": "1", "path": "...", "residents": "moradores.json"}  (residentId/matchScore por pacote)
+        {"id": "1", "path": "...", "diffAgainst": "anterior.json", "saveIndex": "atual.json"}
+                                                (só pacotes novos/alterados + "diff")
+        {"id": "1", "path": "...", "stream": true}  -> linhas "package"/"progress" e, por fim, "summary"
+        {"id": "1", "path": "...", "encoding": "columnar"}  (pacotes em colunas, ver ldi_encoding.py)
+        {"id": "1", "path": "...", "deadlineS": 20}  (prazo: resultado parcial com metadata.degraded)
+        {"id": "1", "path": "...", "trackingIndex": "codigos.sqlite3"}  (seenStatus por pacote)
+        {"id": "2", "type": "ping"}             -> {"type": "pong", "id": "2", ...}
+        {"id": "3", "type": "shutdown"}         -> {"type": "bye", "id": "3"} e encerra
+    
+    Cada resposta ocupa exatamente uma linha em stdout. Logs continuam em stderr.
+    """
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    
+    # stdout fica reservado ao protocolo: qualquer print acidental vai para stderr
+    sys.stdout = sys.stderr
+    
+    def send(message: Dict[str, Any]) -> None:
+        output_stream.write(json.dumps(message, ensure_ascii=False) + "\n")
+        output_stream.flush()
+    
+    # SIGTERM encerra o loop de forma limpa (mesmo caminho do shutdown)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    started = time.monotonic()
+    print("🔥 Carregando modelos do Docling (modo --serve)...", file=sys.stderr)
+    # Perfil padrão pré-carregado; outros perfis pedidos são carregados na primeira vez
+    converter = get_converter(resolve_profile(pipeline))
+    warm_up_converter(converter)
+    # Índice de moradores carregado uma vez (recarregado se o arquivo mudar)
+    try:
+        recipient_index.get_index(residents)
+    except (OSError, ValueError) as e:
+        print(f"⚠ Índice de moradores indisponível: {e}", file=sys.stderr)
+    load_time = int((time.monotonic() - started) * 1000)
+    print(f"✓ Worker pronto em {load_time}ms (pid {os.getpid()})", file=sys.stderr)
+    send({"type": "ready", "pid": os.getpid(), "loadTime": load_time})
+    
+    processed = 0
+    try:
+        for line in input_stream:
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    raise ValueError("pedido deve ser um objeto JSON")
+            except ValueError as e:
+                send({"type": "error", "id": None, "error": f"Pedido inválido: {e}"})
+                continue
+            
+            request_id = message.get("id")
+            message_type = message.get("type", "parse")
+            
+            if message_type == "ping":
+                send({
+                    "type": "pong",
+                    "id": request_id,
+                    "pid": os.getpid(),
+                    "uptime": int((time.monotonic() - started) * 1000),
+                    "processed": processed
+                })
+            elif message_type == "shutdown":
+                send({"type": "bye", "id": request_id, "processed": processed})
+                break
+            elif message_type == "parse":
+                pdf_path = message.get("path")
+                if not pdf_path:
+                    send({"type": "error", "id": request_id, "error": "Campo 'path' obrigatório"})
+                    continue
+                stream = bool(message.get("stream", False))
+                on_event = (lambda event: send({**event, "id": request_id})) if stream else None
+                try:
+                    result = parse_ldi_pdf(
+                        pdf_path,
+                        strategy=message.get("strategy", strategy),
+                        workers=message.get("workers", workers),
+                        use_cache=message.get("cache", use_cache),
+                        on_event=on_event,
+                        profile=bool(message.get("profile", False)),
+                        include_markdown=bool(message.get("markdown", False)),
+                        pipeline=message.get("pipeline", pipeline),
+                        max_pages=message.get("maxPages"),
+                        diff_against=message.get("diffAgainst"),
+                        save_index=message.get("saveIndex"),
+                        window_pages=message.get("windowPages"),
+                        memory_limit_mb=message.get("memoryLimitMb"),
+                        residents=message.get("residents", residents),
+                        deadline_s=message.get("deadlineS"),
+                        tracking_index=message.get("trackingIndex")
+                    )
+                except Exception as e:
+                    send({"type": "error", "id": request_id, "error": str(e)})
+                    continue
+                processed += 1
+                if stream:
+                    send({**summary_event(result), "id": request_id})
+                elif message.get("encoding") == "columnar":
+                    send({"type": "result", "id": request_id, "result": ldi_encoding.to_columnar(result)})
+                else:
+                    send({"type": "result", "id": request_id, "result": result})
+            else:
+                send({"type": "error", "id": request_id, "error": f"Tipo de pedido desconhecido: {message_type}"})
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        shutdown_pool()
+    
+    print(f"👋 Worker encerrado ({processed} PDFs processados)", file=sys.stderr)
+
+
 def main():
     """Função principal - recebe caminho do PDF e retorna JSON."""
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description="Parser de LDI dos Correios (JSON em stdout)")
+    parser.add_argument("pdf_path", nargs="?", help="caminho do PDF da LDI")
+    parser.add_argument("--probe", action="store_true",
+                        help="informa os backends disponíveis (docling, pypdfium2, pandas) em JSON e sai")
+    parser.add_argument("--serve", action="store_true",
+                        help="worker persistente: pedidos JSON-lines em stdin, respostas em stdout")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="auto",
+                        help="auto: camada de texto e Docling se necessário (padrão); "
+                             "text: apenas camada de texto; docling: apenas Docling")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos para converter faixas de páginas em paralelo "
+                             "(padrão: automático; 1 = sequencial)")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="ignora o cache local de resultados/conversões")
+    parser.add_argument("--pipeline", choices=tuple(PROFILES), default=None,
+                        help="perfil de conversão do Docling: default, fast (sem OCR, TableFormer "
+                             "rápido) ou accurate (padrão: LDI_PIPELINE ou default)")
+    parser.add_argument("--max-pages", type=int, default=None,
+                        help="converte com o Docling só as N primeiras páginas")
+    parser.add_argument("--window-pages", type=int, default=None, metavar="N",
+                        help="converte N páginas por vez, liberando cada janela antes da seguinte "
+                             "(padrão: LDI_WINDOW_PAGES; 0 = documento inteiro)")
+    parser.add_argument("--memory-limit", dest="memory_limit_mb", type=int, default=None, metavar="MB",
+                        help="teto de RSS: acima dele a janela de páginas é reduzida pela metade "
+                             "(padrão: LDI_MEMORY_LIMIT_MB)")
+    parser.add_argument("--profile", action="store_true",
+                        help="grava um dump cProfile (<pdf>.pstats) ao lado do PDF")
+    parser.add_argument("--markdown", action="store_true",
+                        help="inclui o markdown do documento (Docling) em \"markdown\" no resultado")
+    parser.add_argument("--residents", default=None, metavar="ARQUIVO",
+                        help="lista de moradores (JSON) para separar nomes mesclados e associar "
+                             "cada pacote a um morador (padrão: LDI_RESIDENTS)")
+    parser.add_argument("--diff-against", default=None, metavar="ARQUIVO",
+                        help="resultado JSON ou índice de uma LDI anterior: retorna só os pacotes "
+                             "novos/alterados e \"diff\" com alterados e removidos")
+    parser.add_argument("--save-index", default=None, metavar="ARQUIVO",
+                        help="grava o índice por código de rastreio desta LDI (para --diff-against)")
+    parser.add_argument("--tracking-index", default=None, metavar="ARQUIVO",
+                        help="índice de códigos entre uploads (SQLite; \"default\" = diretório do cache; "
+                             "padrão: LDI_TRACKING_INDEX): seenStatus new/repeat/delivered por pacote")
+    parser.add_argument("--deadline", type=float, default=None, metavar="S",
+                        help="prazo em segundos: a conversão do Docling para quando ele acaba e as "
+                             "páginas restantes vêm só da camada de texto (metadata.degraded)")
+    parser.add_argument("--stream", action="store_true",
+                        help="NDJSON: uma linha por pacote e por evento de progresso, "
+                             "e uma linha final \"summary\" com metadata e avisos")
+    parser.add_argument("--encoding", choices=ldi_encoding.ENCODINGS, default="json",
+                        help="columnar: pacotes em colunas, valores comuns uma vez só; "
+                             "msgpack: colunar em MessagePack (requer o pacote msgpack)")
+    parser.add_argument("--framed", action="store_true",
+                        help="prefixa o resultado com o tamanho em 4 bytes (big-endian)")
+    args = parser.parse_args()
+    
+    if args.probe:
+        from backend_probe import probe
+        print(json.dumps(probe(), ensure_ascii=False))
+        return
+    
+    if args.serve:
+        serve(strategy=args.strategy, workers=args.workers, use_cache=args.use_cache,
+              pipeline=args.pipeline, residents=args.residents)
+        return
+    
+    if not args.pdf_path:
         print(json.dumps({
             "success": False,
-            "error": "Uso: python ldi_parser.py <caminho_do_pdf>"
+            "error": "Uso: python ldi_parser.py <caminho_do_pdf> [--strategy auto|text|docling] | --serve | --probe"
         }))
         sys.exit(1)
     
-    pdf_path = sys.argv[1]
+    pdf_path = args.pdf_path
+    
+    def emit(event: Dict[str, Any]) -> None:
+        print(json.dumps(event, ensure_ascii=False), flush=True)
     
     try:
-        result = parse_ldi_pdf(pdf_path)
+        result = parse_ldi_pdf(pdf_path, strategy=args.strategy, workers=args.workers,
+                               use_cache=args.use_cache, on_event=emit if args.stream else None,
+                               profile=args.profile, include_markdown=args.markdown,
+                               pipeline=args.pipeline, max_pages=args.max_pages,
+                               diff_against=args.diff_against, save_index=args.save_index,
+                               window_pages=args.window_pages, memory_limit_mb=args.memory_limit_mb,
+                               residents=args.residents, deadline_s=args.deadline,
+                               tracking_index=args.tracking_index)
         # Output JSON para stdout (será capturado pelo Node.js)
-        print(json.dumps(result, ensure_ascii=False))
+        if args.stream:
+            emit(summary_event(result))
+        elif args.encoding != "json" or args.framed:
+            payload = ldi_encoding.encode(result, args.encoding)
+            if args.framed:
+                ldi_encoding.write_frame(sys.stdout.buffer, payload)
+            else:
+                sys.stdout.buffer.write(payload + (b"\n" if args.encoding == "columnar" else b""))
+                sys.stdout.flush()
+        else:
+            print(json.dumps(result, ensure_ascii=False))
     except Exception as e:
-        print(json.dumps({
-            "success": False,
-            "error": str(e),
-            "packages": [],
-            "totalPackages": 0
-        }))
+        if args.stream:
+            emit({
+                "type": "summary",
+                "success": False,
+                "totalPackages": 0,
+                "errors": [str(e)],
+                "warnings": [],
+                "metadata": {}
+            })
+        else:
+            print(json.dumps({
+                "success": False,
+                "error": str(e),
+                "packages": [],
+                "totalPackages": 0
+            }))
         sys.exit(1)
+    finally:
+        shutdown_pool()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Scorecard de estratégias do LDI Parser
+Roda cada estratégia disponível (text, auto e docling em cada perfil de conversão)
+sobre uma pasta de PDFs e compara recall, precisão, acerto de nomes, tempo por
+página e memória de pico. Recomenda a estratégia mais barata que atinge o recall
+alvo, para escolher o padrão de produção com dados.
+
+PDFs com <nome>.truth.json (ldi_synth.py) são pontuados contra o gabarito; os demais,
+contra o "Total de objetos" impresso na LDI (só recall, estimado pela contagem).
+Os pacotes de cada estratégia também são contados por confiança (90 tabela/camada de
+texto, 80 célula mesclada, 60 fallback), para ver quanto cada caminho contribui.
+
+Uso:
+    python ldi_scorecard.py corpus/ [--strategies text,auto,docling] [--pipelines fast,default]
+    python ldi_scorecard.py uploads/ --target-recall 0.995 --compare bench_results/scorecard_anterior.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ldi_bench import DEFAULT_MAX_REGRESSION, DEFAULT_OUTPUT_DIR, git_commit, latency_stats, score
+from ldi_utils import percentile
+
+
+DEFAULT_STRATEGIES = ("text", "auto", "docling")
+DEFAULT_PIPELINES = ("fast", "default")
+DEFAULT_TARGET_RECALL = 0.99
+
+# Backends de que cada estratégia precisa (qualquer um deles basta)
+STRATEGY_BACKENDS = {
+    "text": ("pypdfium2",),
+    "auto": ("docling", "pypdfium2"),
+    "docling": ("docling",)
+}
+
+
+def load_documents(corpus_dir: Path) -> List[Dict[str, Any]]:
+    """PDFs da pasta, com o gabarito <nome>.truth.json quando existe."""
+    documents = []
+    for pdf_path in sorted(corpus_dir.glob("*.pdf")):
+        truth_path = pdf_path.with_name(f"{pdf_path.stem}.truth.json")
+        truth = None
+        if truth_path.exists():
+            with open(truth_path, "r", encoding="utf-8") as f:
+                truth = json.load(f)
+        documents.append({"pdf": str(pdf_path), "truth": truth})
+    return documents
+
+
+def build_candidates(strategies: List[str], pipelines: List[str],
+                     available: Dict[str, bool]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Combinações estratégia × perfil (a text não usa o Docling: um candidato só).
+    Retorna (candidatos, estratégias puladas por falta de backend).
+    """
+    candidates = []
+    skipped = []
+    for strategy in strategies:
+        if not any(available.get(backend) for backend in STRATEGY_BACKENDS[strategy]):
+            skipped.append(strategy)
+            continue
+        # Sem o Docling, auto cai sempre na camada de texto: o perfil não muda nada
+        if strategy == "text" or not available.get("docling"):
+            candidates.append({"name": strategy, "strategy": strategy, "pipeline": None})
+            continue
+        for pipeline in pipelines:
+            candidates.append({"name": f"{strategy}:{pipeline}", "strategy": strategy, "pipeline": pipeline})
+    return candidates, skipped
+
+
+def score_file(result: Dict[str, Any], truth: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Pontuação de um PDF: gabarito quando há; senão, contagem contra o total impresso."""
+    if truth is not None:
+        return {"groundTruth": True, **score(result["packages"], truth)}
+    expected = result["metadata"].get("expectedTotal") or 0
+    found = len(result["packages"])
+    matched = min(found, expected)
+    return {
+        "groundTruth": False,
+        "expected": expected,
+        "found": found,
+        "matched": matched,
+        "recall": round(matched / expected, 4) if expected else None,
+        "precision": None,
+        "nameAccuracy": None
+    }
+
+
+def aggregate_scores(scores: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Recall sobre todos os PDFs pontuáveis; precisão e nomes só onde há gabarito."""
+    scored = [s for s in scores if s["expected"]]
+    truth = [s for s in scored if s["groundTruth"]]
+    expected = sum(s["expected"] for s in scored)
+    matched = sum(s["matched"] for s in scored)
+    truth_found = sum(s["found"] for s in truth)
+    truth_matched = sum(s["matched"] for s in truth)
+    names = sum(s["nameAccuracy"] * s["matched"] for s in truth)
+    return {
+        "recall": round(matched / expected, 4) if expected else None,
+        "precision": round(truth_matched / truth_found, 4) if truth_found else None,
+        "nameAccuracy": round(names / truth_matched, 4) if truth_matched else None,
+        "scoredFiles": len(scored),
+        "groundTruthFiles": len(truth)
+    }
+
+
+def _pages(document: Dict[str, Any], result: Dict[str, Any]) -> int:
+    if document["truth"] is not None:
+        return document["truth"]["pages"]
+    try:
+        from page_windows import get_page_count
+        return get_page_count(document["pdf"])
+    except Exception:
+        return result["metadata"].get("pagesProcessed") or 0
+
+
+def run_candidate(candidate: Dict[str, Any], documents: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    """
+    Executado num processo próprio (memória de pico isolada): parse_ldi_pdf sem cache,
+    `repeat` vezes por PDF, com aquecimento fora da medição.
+    """
+    import ldi_parser
+    from ldi_metrics import peak_memory
+
+    strategy, pipeline = candidate["strategy"], candidate["pipeline"]
+    started = time.perf_counter()
+    if documents:
+        ldi_parser.parse_ldi_pdf(documents[0]["pdf"], strategy=strategy, use_cache=False,
+                                 workers=1, pipeline=pipeline)
+    warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    files = []
+    latencies = []
+    scores = []
+    by_confidence: Counter = Counter()
+    strategy_used: Counter = Counter()
+    pages = packages = 0
+    for document in documents:
+        runs = []
+        result = None
+        for _ in range(repeat):
+            run_started = time.perf_counter()
+            result = ldi_parser.parse_ldi_pdf(document["pdf"], strategy=strategy, use_cache=False,
+                                              pipeline=pipeline)
+            runs.append((time.perf_counter() - run_started) * 1000)
+        file_score = score_file(result, document["truth"])
+        file_pages = _pages(document, result)
+        latencies.extend(runs)
+        scores.append(file_score)
+        pages += file_pages * repeat
+        packages += len(result["packages"]) * repeat
+        by_confidence.update(str(pkg.get("confidence")) for pkg in result["packages"])
+        strategy_used[result["metadata"].get("strategy") or "?"] += 1
+        p50 = percentile(runs, 50)
+        files.append({
+            "file": Path(document["pdf"]).name,
+            "pages": file_pages,
+            "strategyUsed": result["metadata"].get("strategy"),
+            "errors": result["errors"],
+            "p50Ms": round(p50, 1),
+            "msPerPage": round(p50 / file_pages, 2) if file_pages else None,
+            **file_score
+        })
+        recall = file_score["recall"]
+        print(f"  {candidate['name']:16s} {Path(document['pdf']).name}: {p50:.0f}ms "
+              f"recall={'-' if recall is None else f'{recall:.3f}'}", file=sys.stderr)
+
+    ldi_parser.shutdown_pool()
+    stats = latency_stats(latencies, pages, packages)
+    memory = peak_memory()
+    rss = [kb for kb in (memory["peakRssKb"], memory["childrenPeakRssKb"]) if kb is not None]
+    return {
+        **candidate,
+        "warmupMs": warmup_ms,
+        "msPerPage": round(stats["totalMs"] / pages, 2) if pages else None,
+        **stats,
+        **aggregate_scores(scores),
+        "peakRssKb": max(rss) if rss else None,
+        "memory": memory,
+        "byConfidence": dict(sorted(by_confidence.items(), reverse=True)),
+        "strategyUsed": dict(strategy_used),
+        "files": files
+    }
+
+
+def recommend(results: Dict[str, Dict[str, Any]], target_recall: float,
+              min_precision: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Candidato mais barato (menor ms/página; empate: menor RSS de pico) com recall >=
+    target_recall e, se pedido, precisão >= min_precision. Sem nenhum, aponta o de
+    maior recall.
+    """
+    def cost(data: Dict[str, Any]) -> Tuple[float, float]:
+        return (data["msPerPage"] if data.get("msPerPage") is not None else float("inf"),
+                data.get("peakRssKb") or 0)
+
+    valid = [data for data in results.values() if "error" not in data and data.get("recall") is not None]
+    eligible = [
+        data for data in valid
+        if data["recall"] >= target_recall
+        and (min_precision is None or data["precision"] is None or data["precision"] >= min_precision)
+    ]
+    recommendation: Dict[str, Any] = {"targetRecall": target_recall, "minPrecision": min_precision}
+    if eligible:
+        best = min(eligible, key=cost)
+        recommendation.update(candidate=best["name"], strategy=best["strategy"], pipeline=best["pipeline"],
+                              recall=best["recall"], msPerPage=best["msPerPage"],
+                              eligible=[data["name"] for data in sorted(eligible, key=cost)])
+        costliest = max(eligible, key=cost)
+        if costliest is not best and best["msPerPage"]:
+            recommendation["speedupVsCostliest"] = round(costliest["msPerPage"] / best["msPerPage"], 2)
+    else:
+        closest = max(valid, key=lambda data: data["recall"], default=None)
+        recommendation.update(candidate=None, closest=closest["name"] if closest else None,
+                              closestRecall=closest["recall"] if closest else None)
+    return recommendation
+
+
+def run_scorecard(corpus_dir: Path, strategies: List[str], pipelines: List[str], repeat: int,
+                  target_recall: float = DEFAULT_TARGET_RECALL,
+                  min_precision: Optional[float] = None) -> Dict[str, Any]:
+    """Roda todos os candidatos disponíveis (um processo cada) e monta o scorecard."""
+    from backend_probe import probe
+
+    documents = load_documents(corpus_dir)
+    if not documents:
+        raise FileNotFoundError(f"Nenhum PDF em {corpus_dir}")
+    unknown = [strategy for strategy in strategies if strategy not in STRATEGY_BACKENDS]
+    if unknown:
+        raise ValueError(f"Estratégia desconhecida: {', '.join(unknown)} "
+                         f"(disponíveis: {', '.join(STRATEGY_BACKENDS)})")
+
+    backends = probe(["docling", "pypdfium2"])["backends"]
+    available = {name: info["available"] for name, info in backends.items()}
+    candidates, skipped = build_candidates(strategies, pipelines, available)
+    for strategy in skipped:
+        print(f"⚠ Estratégia {strategy} pulada: backend indisponível", file=sys.stderr)
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "createdAt": datetime.now().isoformat(timespec="seconds"),
+        "cpus": os.cpu_count(),
+        "corpus": {
+            "dir": str(corpus_dir),
+            "files": len(documents),
+            "groundTruthFiles": sum(1 for document in documents if document["truth"] is not None)
+        },
+        "repeat": repeat,
+        "backends": available,
+        "skipped": skipped,
+        "candidates": {}
+    }
+
+    # spawn: cada candidato começa com memória limpa, então o RSS de pico é só dele
+    context = multiprocessing.get_context("spawn")
+    for candidate in candidates:
+        print(f"⏱ Candidato {candidate['name']}...", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                report["candidates"][candidate["name"]] = executor.submit(
+                    run_candidate, candidate, documents, repeat
+                ).result()
+            except Exception as e:
+                print(f"  ⚠ Candidato {candidate['name']} falhou: {e}", file=sys.stderr)
+                report["candidates"][candidate["name"]] = {**candidate, "error": str(e)}
+
+    report["recommendation"] = recommend(report["candidates"], target_recall, min_precision)
+    return report
+
+
+def compare_scorecards(current: Dict[str, Any], previous: Dict[str, Any],
+                       max_regression: float = DEFAULT_MAX_REGRESSION) -> List[str]:
+    """Regressões por candidato: queda de recall ou ms/página acima de max_regression."""
+    regressions = []
+    for name, now in current.get("candidates", {}).items():
+        before = previous.get("candidates", {}).get(name)
+        if not before or "error" in now or "error" in before:
+            continue
+        if before.get("msPerPage") and now.get("msPerPage") is not None \
+                and now["msPerPage"] > before["msPerPage"] * (1 + max_regression):
+            regressions.append(f"{name}: ms/página {before['msPerPage']} -> {now['msPerPage']}")
+        if now.get("recall") is not None and before.get("recall") is not None \
+                and now["recall"] < before["recall"]:
+            regressions.append(f"{name}: recall {before['recall']} -> {now['recall']}")
+    return regressions
+
+
+def _format(value: Any, digits: int = 3) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def print_scorecard(report: Dict[str, Any]) -> None:
+    """Tabela legível em stderr (o JSON completo vai para o arquivo do relatório)."""
+    print(f"\n{'candidato':16s} {'recall':>7s} {'prec.':>7s} {'nomes':>7s} {'ms/pág':>8s} {'RSS MB':>7s}  confiança",
+          file=sys.stderr)
+    for name, data in report["candidates"].items():
+        if "error" in data:
+            print(f"{name:16s} erro: {data['error']}", file=sys.stderr)
+            continue
+        rss = data["peakRssKb"] / 1024 if data.get("peakRssKb") else None
+        confidence = " ".join(f"{key}:{count}" for key, count in data["byConfidence"].items())
+        print(f"{name:16s} {_format(data['recall']):>7s} {_format(data['precision']):>7s} "
+              f"{_format(data['nameAccuracy']):>7s} {_format(data['msPerPage'], 1):>8s} "
+              f"{_format(rss, 0):>7s}  {confidence}", file=sys.stderr)
+    recommendation = report["recommendation"]
+    if recommendation["candidate"]:
+        print(f"\n✅ Recomendado: {recommendation['candidate']} (recall {recommendation['recall']}, "
+              f"{recommendation['msPerPage']} ms/página)", file=sys.stderr)
+    else:
+        print(f"\n⚠ Nenhum candidato atinge recall {recommendation['targetRecall']} "
+              f"(mais próximo: {recommendation['closest']}, {recommendation['closestRecall']})", file=sys.stderr)
+
+
+def main():
+    """Função principal - imprime o resumo em JSON e grava o scorecard completo."""
+    parser = argparse.ArgumentParser(description="Compara as estratégias do LDI Parser e recomenda a mais barata")
+    parser.add_argument("corpus_dir", help="pasta de PDFs (com <nome>.truth.json opcional, ver ldi_synth.py)")
+    parser.add_argument("--strategies", default=",".join(DEFAULT_STRATEGIES),
+                        help="estratégias, separadas por vírgula (padrão: text,auto,docling)")
+    parser.add_argument("--pipelines", default=",".join(DEFAULT_PIPELINES),
+                        help="perfis de conversão para auto/docling (padrão: fast,default)")
+    parser.add_argument("--repeat", type=int, default=1, help="execuções por PDF (padrão: 1)")
+    parser.add_argument("--target-recall", type=float, default=DEFAULT_TARGET_RECALL,
+                        help=f"recall mínimo da recomendação (padrão: {DEFAULT_TARGET_RECALL})")
+    parser.add_argument("--min-precision", type=float, default=None,
+                        help="precisão mínima da recomendação (só PDFs com gabarito)")
+    parser.add_argument("--output", default=None,
+                        help=f"arquivo do scorecard (padrão: {DEFAULT_OUTPUT_DIR}/ldi_scorecard_<commit>_<data>.json)")
+    parser.add_argument("--compare", default=None, help="scorecard anterior para detectar regressões")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="aumento máximo aceito em ms/página (fração, padrão: 0.2)")
+    args = parser.parse_args()
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    try:
+        report = run_scorecard(Path(args.corpus_dir), strategies, pipelines, max(1, args.repeat),
+                               args.target_recall, args.min_precision)
+    except (FileNotFoundError, ValueError) as e:
+        print(json.dumps({"success": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = compare_scorecards(report, previous, args.max_regression)
+        report["comparedWith"] = {"file": args.compare, "commit": previous.get("commit"),
+                                  "recommendation": previous.get("recommendation", {}).get("candidate"),
+                                  "regressions": regressions}
+
+    output = Path(args.output) if args.output else Path(DEFAULT_OUTPUT_DIR) / (
+        f"ldi_scorecard_{report['commit'] or 'local'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_scorecard(report)
+    for regression in regressions:
+        print(f"❌ Regressão: {regression}", file=sys.stderr)
+    print(f"📊 Scorecard: {output}", file=sys.stderr)
+
+    summary = {
+        name: {key: data.get(key) for key in ("recall", "precision", "nameAccuracy", "msPerPage",
+                                              "peakRssKb", "byConfidence", "error") if key in data}
+        for name, data in report["candidates"].items()
+    }
+    print(json.dumps({"success": not regressions, "report": str(output),
+                      "recommendation": report["recommendation"], "summary": summary}, ensure_ascii=False))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
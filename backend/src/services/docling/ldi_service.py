@@ -0,0 +1,619 @@
+#!/usr/bin/env python3
+"""
+Serviço local de ingestão de LDIs
+Fila única com prioridade para parse_ldi_pdf: recebe PDFs por uma pasta de spool e/ou
+por um socket Unix (uploads do Node.js), atende primeiro uploads interativos e listas
+pequenas, limita quantas LDIs rodam ao mesmo tempo e mata a que passar do prazo.
+
+Cada job roda num processo criado por fork depois do carregamento do Docling (modelos
+compartilhados copy-on-write, como no batch_runner.py) e grava <saída>/<id>.json de
+forma atômica. O fork é seguro porque o processo pai tem uma thread só: o socket é
+atendido no mesmo laço que acompanha os jobs (multiprocessing.connection.wait), então
+nenhuma outra thread pode estar segurando um lock (stderr, malloc, import) na hora do
+fork; e o Docling é aquecido com OMP_NUM_THREADS=1, porque o pool de threads do
+OpenMP (torch) criado no pai não sobrevive ao fork. O paralelismo vem de --jobs.
+Um id já usado (na fila, rodando ou com <saída>/<id>.json gravado) é recusado, então
+um resultado nunca é sobrescrito. Profundidade da fila, espera e tempo de serviço
+ficam em <saída>/service_metrics.json e no pedido {"type": "metrics"} do socket.
+
+Uso:
+    python ldi_service.py --spool /var/spool/ldi --output resultados/ [--jobs 2]
+    python ldi_service.py --socket /run/ldi.sock --output resultados/ [--deadline 120]
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import secrets
+import signal
+import socket
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ldi_utils import percentile, write_json_atomic
+from page_windows import get_page_count
+from pipeline_profiles import PROFILES, resolve_profile, warm_profiles
+
+
+METRICS_NAME = "service_metrics.json"
+
+# Subpastas do spool: PDFs novos, em processamento e já processados
+SPOOL_DIRS = ("incoming", "processing", "done", "failed")
+
+DEFAULT_DEADLINE_S = 300
+DEFAULT_MAX_QUEUE = 200
+
+# Prioridade em "páginas": menor sai primeiro. Upload interativo vale como se tivesse
+# INTERACTIVE_BONUS_PAGES páginas a menos, e cada AGING_SECONDS_PER_PAGE de espera
+# desconta mais uma (LDI grande não fica parada para sempre atrás das pequenas)
+INTERACTIVE_BONUS_PAGES = 100
+AGING_SECONDS_PER_PAGE = 5
+UNKNOWN_PAGES = 500
+
+# Fração do prazo do job passada ao parse_ldi_pdf como prazo próprio: o parser
+# devolve um resultado parcial (metadata.degraded) antes de o processo ser morto
+SOFT_DEADLINE_FRACTION = 0.8
+
+# Id do job = nome do JSON de saída: só letras, dígitos, ".", "_" e "-" (sem caminhos)
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,127}")
+
+# Conexões do socket: linha máxima de um pedido e prazo para enviar uma resposta
+MAX_REQUEST_BYTES = 64 * 1024
+SEND_TIMEOUT_S = 5.0
+
+# Sem job terminando nem prazo vencendo, o spool é relido a cada POLL_SECONDS
+POLL_SECONDS = 1.0
+
+# Amostras de espera/serviço guardadas para os percentis
+METRICS_WINDOW = 1000
+
+
+@dataclass
+class Job:
+    """Um PDF na fila (ou em processamento)."""
+    id: str
+    path: str
+    seq: int
+    pages: Optional[int]
+    interactive: bool
+    deadline_s: float
+    source: str
+    submitted: float = field(default_factory=time.monotonic)
+    started: Optional[float] = None
+    outcome: Optional[Dict[str, Any]] = None
+
+    def priority(self, now: float) -> tuple:
+        pages = self.pages if self.pages is not None else UNKNOWN_PAGES
+        if self.interactive:
+            pages -= INTERACTIVE_BONUS_PAGES
+        return pages - (now - self.submitted) / AGING_SECONDS_PER_PAGE, self.seq
+
+
+def _stats(values) -> Dict[str, Any]:
+    values = list(values)
+    if not values:
+        return {"count": 0, "meanMs": None, "p50Ms": None, "p95Ms": None, "maxMs": None}
+    return {
+        "count": len(values),
+        "meanMs": round(sum(values) / len(values), 1),
+        "p50Ms": round(percentile(values, 50), 1),
+        "p95Ms": round(percentile(values, 95), 1),
+        "maxMs": round(max(values), 1)
+    }
+
+
+class ServiceMetrics:
+    """Contadores e as últimas METRICS_WINDOW esperas/tempos de serviço (ms)."""
+
+    def __init__(self):
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "timedOut": 0,
+                         "rejected": 0, "cancelled": 0, "degraded": 0}
+        self.max_queue_depth = 0
+        self.wait_ms: deque = deque(maxlen=METRICS_WINDOW)
+        self.interactive_wait_ms: deque = deque(maxlen=METRICS_WINDOW)
+        self.service_ms: deque = deque(maxlen=METRICS_WINDOW)
+        self.started = time.monotonic()
+
+    def record(self, job: Job, status: str, wait_ms: float, service_ms: float) -> None:
+        key = {"ok": "completed", "timeout": "timedOut", "cancelled": "cancelled"}.get(status, "failed")
+        self.counters[key] += 1
+        if status == "cancelled":
+            return
+        self.wait_ms.append(wait_ms)
+        if job.interactive:
+            self.interactive_wait_ms.append(wait_ms)
+        self.service_ms.append(service_ms)
+
+    def snapshot(self, queue_depth: int, running: int, jobs: int) -> Dict[str, Any]:
+        return {
+            "queueDepth": queue_depth,
+            "maxQueueDepth": self.max_queue_depth,
+            "running": running,
+            "jobs": jobs,
+            **self.counters,
+            "waitMs": _stats(self.wait_ms),
+            "interactiveWaitMs": _stats(self.interactive_wait_ms),
+            "serviceMs": _stats(self.service_ms),
+            "uptimeS": round(time.monotonic() - self.started, 1)
+        }
+
+
+def new_job_id(pdf_path: str) -> str:
+    """Id único para um PDF: nome do arquivo (só caracteres seguros) + sufixo aleatório."""
+    stem = re.sub(r"[^A-Za-z0-9._-]", "_", Path(pdf_path).stem).lstrip("._-")[:64] or "ldi"
+    return f"{stem}-{secrets.token_hex(4)}"
+
+
+def unique_path(folder: Path, name: str) -> Path:
+    """folder/name, ou folder/<nome>-2.pdf, -3, ... se já existir (o spool nunca sobrescreve)."""
+    path = folder / name
+    counter = 2
+    while path.exists():
+        path = folder / f"{Path(name).stem}-{counter}{Path(name).suffix}"
+        counter += 1
+    return path
+
+
+def _run_job(pdf_path: str, output_path: str, options: Dict[str, Any], deadline_s: float, conn) -> None:
+    """Executado no processo do job: parse_ldi_pdf, grava o JSON e devolve o resumo pelo pipe."""
+    # O pai trata SIGTERM/SIGINT para encerrar o serviço; aqui SIGTERM precisa matar
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import ldi_parser
+
+    try:
+        # workers=1: o paralelismo do serviço é entre jobs, não entre páginas
+        result = ldi_parser.parse_ldi_pdf(pdf_path, strategy=options["strategy"], workers=1,
+                                          use_cache=options["use_cache"],
+                                          pipeline=options["pipeline"],
+                                          residents=options["residents"],
+                                          deadline_s=deadline_s * SOFT_DEADLINE_FRACTION)
+        write_json_atomic(Path(output_path), result)
+        outcome = {
+            "status": "ok" if result.get("success") else "error",
+            "error": "; ".join(result.get("errors", [])) or (None if result.get("success") else "Nenhum pacote extraído"),
+            "output": output_path,
+            "packages": result.get("totalPackages", 0),
+            "pages": result.get("metadata", {}).get("pagesProcessed", 0),
+            "degraded": bool(result.get("metadata", {}).get("degraded"))
+        }
+    except Exception as e:
+        outcome = {"status": "error", "error": str(e)}
+    conn.send(outcome)
+    conn.close()
+
+
+def preload(options: Dict[str, Any]) -> None:
+    """Carrega o conversor e o índice de moradores antes do fork dos jobs."""
+    import recipient_index
+    try:
+        recipient_index.get_index(options["residents"])
+    except (OSError, ValueError) as e:
+        print(f"⚠ Índice de moradores indisponível: {e}", file=sys.stderr)
+    if options["strategy"] == "text":
+        return
+
+    import ldi_parser
+    started = time.perf_counter()
+    profile = resolve_profile(options["pipeline"])
+    print(f"⏳ Carregando Docling, perfil {profile['name']} (uma vez para o serviço)...", file=sys.stderr)
+    # Com OCR seletivo, a variante sem OCR (PDFs digitais) também é aquecida aqui:
+    # construída num job, ela seria refeita a cada fork
+    for variant in warm_profiles(profile):
+        ldi_parser.warm_up_converter(ldi_parser.get_converter(variant))
+    print(f"✓ Docling carregado em {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+class LdiService:
+    """
+    Fila com prioridade + até `jobs` processos simultâneos.
+
+    Tudo roda na thread principal: run() lê o spool, atende o socket (SocketFrontend)
+    e inicia, acompanha e encerra os processos dos jobs.
+    """
+
+    def __init__(self, output_dir: Path, spool_dir: Optional[Path] = None, jobs: int = 1,
+                 deadline_s: float = DEFAULT_DEADLINE_S, max_queue: int = DEFAULT_MAX_QUEUE,
+                 options: Optional[Dict[str, Any]] = None):
+        self.output_dir = output_dir
+        self.spool_dir = spool_dir
+        self.jobs = max(1, jobs)
+        self.deadline_s = deadline_s
+        self.max_queue = max_queue
+        self.options = options or {}
+        self.metrics = ServiceMetrics()
+        self.queue: List[Job] = []
+        self.running: Dict[int, tuple] = {}  # sentinel -> (job, processo, pipe)
+        self.stopping = False
+        self.frontend: Optional["SocketFrontend"] = None
+        self._seq = itertools.count(1)
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.spool_dir:
+            for name in SPOOL_DIRS:
+                (self.spool_dir / name).mkdir(parents=True, exist_ok=True)
+            self._recover_spool()
+
+    # --- entrada de jobs ---
+
+    def submit(self, path: str, interactive: bool = False, deadline_s: Optional[float] = None,
+               job_id: Optional[str] = None, source: str = "socket") -> Optional[Job]:
+        """
+        Enfileira o PDF; None se a fila estiver cheia (quem chama responde/tenta depois).
+        job_id (do cliente) precisa casar com JOB_ID_PATTERN e não estar em uso: na
+        fila, rodando ou com resultado já gravado em <saída>/<id>.json (ValueError);
+        sem ele, o id é gerado por new_job_id.
+        """
+        if job_id is not None:
+            job_id = str(job_id)
+            if not JOB_ID_PATTERN.fullmatch(job_id):
+                raise ValueError(f"Id de job inválido: {job_id!r} (use letras, dígitos, '.', '_' ou '-')")
+        try:
+            pages = get_page_count(path)
+        except Exception:
+            pages = None  # ilegível para o pypdfium2: o parse_ldi_pdf reporta o erro
+
+        if len(self.queue) >= self.max_queue:
+            self.metrics.counters["rejected"] += 1
+            return None
+        if job_id is not None and self._id_taken(job_id):
+            raise ValueError(f"Id {job_id} já usado (na fila, rodando ou com resultado gravado)")
+        while job_id is None or self._id_taken(job_id):
+            job_id = new_job_id(path)
+        job = Job(id=job_id, path=path, seq=next(self._seq), pages=pages,
+                  interactive=interactive, deadline_s=deadline_s or self.deadline_s, source=source)
+        self.queue.append(job)
+        self.metrics.counters["submitted"] += 1
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, len(self.queue))
+        kind = "interativo" if interactive else source
+        print(f"📥 {job.id}: {pages if pages is not None else '?'} páginas ({kind}), "
+              f"fila {len(self.queue)}", file=sys.stderr)
+        return job
+
+    def _id_taken(self, job_id: str) -> bool:
+        """Id na fila, rodando ou com resultado (ou o arquivo de métricas) já na saída."""
+        if job_id in {job.id for job in self.queue} | {job.id for job, _, _ in self.running.values()}:
+            return True
+        return (self.output_dir / f"{job_id}.json").exists() or f"{job_id}.json" == METRICS_NAME
+
+    def _recover_spool(self) -> None:
+        """PDFs que ficaram em processing/ (serviço interrompido) voltam para incoming/."""
+        for pdf in (self.spool_dir / "processing").glob("*.pdf"):
+            os.replace(pdf, unique_path(self.spool_dir / "incoming", pdf.name))
+            print(f"↩ {pdf.name} devolvido ao spool", file=sys.stderr)
+
+    def _scan_spool(self) -> None:
+        """
+        Enfileira os PDFs de incoming/ (mais antigos primeiro), movendo-os para
+        processing/. Nomes iniciados por "." são ignorados: quem grava no spool deve
+        escrever num nome oculto e renomear no fim. Com a fila cheia, ficam onde estão.
+        """
+        if not self.spool_dir:
+            return
+        incoming = self.spool_dir / "incoming"
+        candidates = [p for p in incoming.iterdir()
+                      if p.is_file() and p.suffix.lower() == ".pdf" and not p.name.startswith(".")]
+        for pdf in sorted(candidates, key=lambda p: p.stat().st_mtime):
+            if len(self.queue) >= self.max_queue:
+                break
+            claimed = unique_path(self.spool_dir / "processing", pdf.name)
+            os.replace(pdf, claimed)
+            self.submit(str(claimed), source="spool")
+
+    # --- laço principal ---
+
+    def _next_job(self) -> Optional[Job]:
+        if not self.queue:
+            return None
+        now = time.monotonic()
+        job = min(self.queue, key=lambda j: j.priority(now))
+        self.queue.remove(job)
+        return job
+
+    def _start(self, job: Job) -> None:
+        job.started = time.monotonic()
+        output_path = self.output_dir / f"{job.id}.json"
+        parent_conn, child_conn = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_run_job, daemon=True,
+                                        args=(job.path, str(output_path), self.options, job.deadline_s, child_conn))
+        process.start()
+        child_conn.close()
+        self.running[process.sentinel] = (job, process, parent_conn)
+        wait_s = job.started - job.submitted
+        print(f"▶ {job.id} (espera {wait_s:.1f}s, pid {process.pid})", file=sys.stderr)
+
+    def _dispatch(self) -> None:
+        while len(self.running) < self.jobs and not self.stopping:
+            job = self._next_job()
+            if job is None:
+                return
+            self._start(job)
+
+    def _reap(self) -> None:
+        """Recolhe jobs terminados e mata os que passaram do prazo."""
+        now = time.monotonic()
+        for sentinel, (job, process, conn) in list(self.running.items()):
+            if not process.is_alive():
+                outcome = conn.recv() if conn.poll() else {
+                    "status": "error", "error": f"processo encerrou com código {process.exitcode}"}
+            elif now - job.started > job.deadline_s:
+                process.terminate()
+                process.join(5)
+                if process.is_alive():
+                    process.kill()
+                outcome = {"status": "timeout", "error": f"Prazo de {job.deadline_s:g}s excedido"}
+            else:
+                continue
+            process.join()
+            conn.close()
+            del self.running[sentinel]
+            self._finish(job, outcome)
+
+    def _finish(self, job: Job, outcome: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        started = job.started or now
+        wait_ms = round((started - job.submitted) * 1000, 1)
+        service_ms = round((now - started) * 1000, 1) if job.started else 0.0
+        job.outcome = {"output": None, **outcome, "id": job.id, "waitMs": wait_ms, "serviceMs": service_ms}
+
+        self.metrics.record(job, outcome["status"], wait_ms, service_ms)
+        if outcome.get("degraded"):
+            self.metrics.counters["degraded"] += 1
+        if job.source == "spool" and self.spool_dir:
+            target = "incoming" if outcome["status"] == "cancelled" else (
+                "done" if outcome["status"] == "ok" else "failed")
+            os.replace(job.path, unique_path(self.spool_dir / target, Path(job.path).name))
+        if self.frontend is not None:
+            self.frontend.job_finished(job)
+
+        icon = {"ok": "✓", "timeout": "⏱", "cancelled": "↩"}.get(outcome["status"], "❌")
+        detail = f"{outcome.get('packages', 0)} pacotes" if outcome["status"] == "ok" else outcome.get("error")
+        print(f"{icon} {job.id}: {detail} (espera {wait_ms / 1000:.1f}s, serviço {service_ms / 1000:.1f}s)",
+              file=sys.stderr)
+        if outcome["status"] != "cancelled":
+            write_json_atomic(self.output_dir / METRICS_NAME, self.snapshot())
+
+    def _timeout(self) -> float:
+        """Quanto o laço pode dormir: até o próximo prazo vencer ou a próxima leitura do spool."""
+        now = time.monotonic()
+        deadlines = [job.started + job.deadline_s - now for job, _, _ in self.running.values()]
+        return max(0.0, min([POLL_SECONDS] + deadlines))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.metrics.snapshot(len(self.queue), len(self.running), self.jobs)
+
+    def stop(self) -> None:
+        """
+        Para de iniciar jobs; os que estão rodando terminam (ou vencem o prazo). Chamado
+        pelo tratador de sinal: só marca a flag, que o laço vê em até POLL_SECONDS.
+        """
+        self.stopping = True
+
+    def run(self, once: bool = False) -> None:
+        """
+        Atende até stop() (ou, com once, até esvaziar o spool, a fila e os jobs).
+        Na saída, jobs ainda na fila são cancelados e os do spool voltam a incoming/.
+        """
+        while True:
+            if not self.stopping:
+                self._scan_spool()
+                self._dispatch()
+            if self.stopping and not self.running:
+                break
+            if once and not self.running and not self.queue:
+                break
+            sockets = self.frontend.waitables() if self.frontend is not None else []
+            ready = wait(sockets + list(self.running), self._timeout())
+            if self.frontend is not None:
+                self.frontend.handle(ready)
+            self._reap()
+
+        pending, self.queue = self.queue, []
+        for job in pending:
+            self._finish(job, {"status": "cancelled", "error": "Serviço encerrado"})
+
+
+class SocketFrontend:
+    """
+    Socket Unix atendido pelo laço do LdiService (sem threads). Protocolo JSON-lines
+    (uma resposta por linha):
+        {"type": "submit", "path": "/tmp/ldi.pdf", "interactive": true}
+            -> {"type": "queued", "id": ..., "queueDepth": N}
+        ... "wait": true  -> quando o job termina, também {"type": "done", "id", "status", "output",
+                             "waitMs", "serviceMs", ...}
+        ... "id": "upload-42", "deadlineS": 60  (id = nome do JSON de saída, [A-Za-z0-9._-];
+                                                 sem id, o serviço gera um único; prazo do job)
+        {"type": "metrics"} -> {"type": "metrics", ...}
+        {"type": "ping"}    -> {"type": "pong", ...}
+    """
+
+    def __init__(self, service: LdiService, socket_path: str):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.service = service
+        self.path = socket_path
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(socket_path)
+        self.listener.listen(64)
+        self.listener.setblocking(False)
+        self.buffers: Dict[socket.socket, bytearray] = {}
+        self.waiting: Dict[str, List[socket.socket]] = {}  # id do job -> conexões com "wait"
+        service.frontend = self
+        print(f"🔌 Aceitando jobs em {socket_path}", file=sys.stderr)
+
+    def waitables(self) -> List[socket.socket]:
+        return [self.listener] + list(self.buffers)
+
+    def handle(self, ready) -> None:
+        """Aceita conexões novas e processa as linhas completas das que têm dados."""
+        if self.listener in ready:
+            while True:
+                try:
+                    conn, _ = self.listener.accept()
+                except (BlockingIOError, InterruptedError):
+                    break
+                # Só se lê depois do wait() indicar dados; o prazo vale para os envios
+                conn.settimeout(SEND_TIMEOUT_S)
+                self.buffers[conn] = bytearray()
+        for conn in ready:
+            if conn not in self.buffers:
+                continue
+            try:
+                data = conn.recv(MAX_REQUEST_BYTES)
+            except OSError:
+                data = b""
+            if not data:
+                self._drop(conn)
+                continue
+            buffer = self.buffers[conn]
+            buffer.extend(data)
+            while conn in self.buffers and b"\n" in buffer:
+                line, _, rest = bytes(buffer).partition(b"\n")
+                buffer[:] = rest
+                self._message(conn, line)
+            if conn in self.buffers and len(buffer) > MAX_REQUEST_BYTES:
+                self.send(conn, {"type": "error", "id": None, "error": "Pedido grande demais"})
+                self._drop(conn)
+
+    def send(self, conn: socket.socket, message: Dict[str, Any]) -> None:
+        try:
+            conn.sendall((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        except OSError:
+            # Cliente sumiu ou parou de ler: o job continua, só a resposta se perde
+            self._drop(conn)
+
+    def _drop(self, conn: socket.socket) -> None:
+        self.buffers.pop(conn, None)
+        for conns in self.waiting.values():
+            if conn in conns:
+                conns.remove(conn)
+        conn.close()
+
+    def job_finished(self, job: Job) -> None:
+        for conn in self.waiting.pop(job.id, []):
+            self.send(conn, {"type": "done", **job.outcome})
+
+    def _message(self, conn: socket.socket, line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict):
+                raise ValueError("pedido deve ser um objeto JSON")
+        except ValueError as e:
+            self.send(conn, {"type": "error", "id": None, "error": f"Pedido inválido: {e}"})
+            return
+
+        request_id = message.get("id")
+        message_type = message.get("type", "submit")
+        if message_type == "ping":
+            self.send(conn, {"type": "pong", "id": request_id, "pid": os.getpid()})
+        elif message_type == "metrics":
+            self.send(conn, {"type": "metrics", "id": request_id, **self.service.snapshot()})
+        elif message_type == "submit":
+            self._submit(conn, message)
+        else:
+            self.send(conn, {"type": "error", "id": request_id, "error": f"Tipo desconhecido: {message_type}"})
+
+    def _submit(self, conn: socket.socket, message: Dict[str, Any]) -> None:
+        service = self.service
+        request_id = message.get("id")
+        pdf_path = message.get("path")
+        if not pdf_path or not Path(pdf_path).is_file():
+            self.send(conn, {"type": "error", "id": request_id, "error": f"Arquivo não encontrado: {pdf_path}"})
+            return
+        if service.stopping:
+            self.send(conn, {"type": "error", "id": request_id, "error": "Serviço encerrando"})
+            return
+        try:
+            job = service.submit(pdf_path, interactive=bool(message.get("interactive", True)),
+                                 deadline_s=message.get("deadlineS"), job_id=request_id)
+        except ValueError as e:
+            self.send(conn, {"type": "error", "id": request_id, "error": str(e)})
+            return
+        if job is None:
+            self.send(conn, {"type": "error", "id": request_id,
+                             "error": f"Fila cheia ({service.max_queue} jobs), tente novamente"})
+            return
+        if message.get("wait"):
+            self.waiting.setdefault(job.id, []).append(conn)
+        self.send(conn, {"type": "queued", "id": job.id, "pages": job.pages, "queueDepth": len(service.queue)})
+
+    def close(self) -> None:
+        for conn in list(self.buffers):
+            self._drop(conn)
+        self.listener.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def main():
+    """Função principal - roda o serviço até SIGTERM/SIGINT (ou, com --once, até esvaziar o spool)."""
+    parser = argparse.ArgumentParser(description="Serviço de ingestão de LDIs (spool + socket)")
+    parser.add_argument("--spool", default=None, metavar="DIR",
+                        help="pasta de spool (PDFs em DIR/incoming; processados vão para done/ ou failed/)")
+    parser.add_argument("--socket", default=None, metavar="CAMINHO", help="socket Unix para enviar jobs")
+    parser.add_argument("--output", default="service_output", help="diretório dos resultados (padrão: service_output)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="LDIs processadas ao mesmo tempo (padrão: LDI_SERVICE_JOBS ou núcleos)")
+    parser.add_argument("--deadline", type=float, default=None, metavar="S",
+                        help=f"prazo por job em segundos (padrão: LDI_JOB_DEADLINE_S ou {DEFAULT_DEADLINE_S})")
+    parser.add_argument("--max-queue", type=int, default=None,
+                        help=f"jobs na fila antes de recusar (padrão: LDI_SERVICE_MAX_QUEUE ou {DEFAULT_MAX_QUEUE})")
+    parser.add_argument("--once", action="store_true", help="processa o spool atual e encerra")
+    parser.add_argument("--strategy", default="auto", choices=("auto", "text", "docling"),
+                        help="estratégia do ldi_parser")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="ignora o cache local do ldi_parser")
+    parser.add_argument("--pipeline", choices=tuple(PROFILES), default=None,
+                        help="perfil de conversão do Docling (padrão: LDI_PIPELINE ou default)")
+    parser.add_argument("--residents", default=None,
+                        help="lista de moradores (JSON) para o ldi_parser (padrão: LDI_RESIDENTS)")
+    args = parser.parse_args()
+
+    if not args.spool and not args.socket:
+        parser.error("informe --spool e/ou --socket")
+
+    jobs = args.jobs or int(os.environ.get("LDI_SERVICE_JOBS", 0) or 0) or (os.cpu_count() or 1)
+    # Antes de carregar o torch: o pool do OpenMP não pode existir no pai na hora do
+    # fork (ver docstring do módulo); cada job usa uma thread, o paralelismo é --jobs
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    deadline_s = args.deadline or float(os.environ.get("LDI_JOB_DEADLINE_S", 0) or 0) or DEFAULT_DEADLINE_S
+    max_queue = args.max_queue or int(os.environ.get("LDI_SERVICE_MAX_QUEUE", 0) or 0) or DEFAULT_MAX_QUEUE
+
+    options = {"strategy": args.strategy, "use_cache": args.use_cache,
+               "pipeline": args.pipeline, "residents": args.residents}
+    preload(options)
+    service = LdiService(Path(args.output), Path(args.spool) if args.spool else None, jobs,
+                         deadline_s, max_queue, options)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: service.stop())
+    frontend = SocketFrontend(service, args.socket) if args.socket else None
+    print(f"✓ Serviço pronto: {jobs} jobs simultâneos, prazo {deadline_s:.0f}s, fila até {max_queue}",
+          file=sys.stderr)
+
+    try:
+        service.run(once=args.once)
+    finally:
+        if frontend is not None:
+            frontend.close()
+
+    snapshot = service.snapshot()
+    print(json.dumps({"success": snapshot["failed"] == 0 and snapshot["timedOut"] == 0, **snapshot},
+                     ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Gerador de LDIs sintéticas
+Escreve PDFs no layout da Lista de Distribuição Interna dos Correios (sem rede nem
+dependências externas), cada um com o gabarito em <nome>.truth.json, para o
+benchmark (ldi_bench.py) e comparações de estratégia.
+
+Uso:
+    python ldi_synth.py corpus/ [--counts 10,50,200,1000,2000] [--seed 42]
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_COUNTS = (10, 50, 200, 1000, 2000)
+
+# Página A4 em pontos; uma linha da tabela por LINE_HEIGHT
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+TOP_Y = 800
+BOTTOM_Y = 60
+LINE_HEIGHT = 13
+FONT_SIZE = 8
+
+# Colunas (x) na ordem do cabeçalho da LDI
+COLUMNS = (("Grupo", 40), ("Data", 72), ("Posição", 130), ("Objeto", 190), ("Destinatário", 290))
+HEADER = [name for name, _ in COLUMNS]
+
+# Nomes acima disso quebram numa segunda linha da coluna Destinatário
+NAME_WRAP = 34
+
+FIRST_NAMES = (
+    "MARIA", "JOSÉ", "JOÃO", "ANTÔNIO", "ANA", "FRANCISCO", "LUCIANA", "CONCEIÇÃO",
+    "MARCIELY", "PEDRO", "VANUSA", "INÊS", "LETÍCIA", "RAIMUNDO", "SEBASTIÃO", "ÉRICA",
+    "MELRY", "FLAZINETE", "JOSUÉ", "ÂNGELA", "CLÁUDIO", "DÉBORA", "FÁBIO", "LÚCIA"
+)
+SURNAMES = (
+    "SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "GONÇALVES", "ARAÚJO", "RODRIGUES", "DUTRA",
+    "NOVAIS", "GUARNIERI", "WALDOMIRO", "CONCEIÇÃO", "ASSUNÇÃO", "FALCÃO", "BRANDÃO",
+    "MAGALHÃES", "LIMA", "COSTA", "ÁVILA", "MACHADO", "DA SILVA", "DE JESUS", "DOS SANTOS"
+)
+CODE_PREFIXES = ("AB", "AN", "QB", "OY", "LB", "NX", "QH", "AD")
+
+
+def random_name(rng: random.Random) -> str:
+    """Nome de 2 a 6 palavras (comprimentos variados, com acentos)."""
+    words = [rng.choice(FIRST_NAMES)]
+    if rng.random() < 0.3:
+        words.append(rng.choice(FIRST_NAMES))
+    words.extend(rng.choice(SURNAMES) for _ in range(rng.choice((1, 1, 2, 2, 3, 4))))
+    return " ".join(words)
+
+
+def wrap_name(name: str) -> List[str]:
+    """Quebra o nome em linhas de até NAME_WRAP caracteres (por palavra)."""
+    lines = [""]
+    for word in name.split():
+        candidate = f"{lines[-1]} {word}".strip()
+        if len(candidate) > NAME_WRAP and lines[-1]:
+            lines.append(word)
+        else:
+            lines[-1] = candidate
+    return lines
+
+
+def make_truth(count: int, rng: random.Random, printed: date) -> Dict[str, Any]:
+    """Gabarito da LDI: pacotes na ordem da lista e datas do cabeçalho."""
+    codes = set()
+    packages = []
+    for line_number in range(1, count + 1):
+        code = None
+        while code is None or code in codes:
+            code = f"{rng.choice(CODE_PREFIXES)}{rng.randrange(10 ** 9):09d}BR"
+        codes.add(code)
+        packages.append({
+            "lineNumber": line_number,
+            "trackingCode": code,
+            "recipient": random_name(rng),
+            "position": f"PCM - {rng.randint(1, 400)}"
+        })
+    return {
+        "expectedTotal": count,
+        "arrivalDate": printed.strftime("%d/%m/%Y"),
+        "returnDate": (printed + timedelta(days=7)).strftime("%d/%m/%Y"),
+        "packages": packages
+    }
+
+
+def layout_pages(truth: Dict[str, Any], rng: random.Random,
+                 split_ratio: float = 0.5) -> Tuple[List[List[Tuple[float, float, str]]], int]:
+    """
+    Distribui as linhas nas páginas: [(x, y, texto)] por página.
+
+    Nomes longos ocupam duas linhas; quando a segunda não cabe na página, ela vai
+    para o topo da seguinte (linha partida na quebra de página). Na última linha
+    de cada página, o nome é partido de propósito com probabilidade split_ratio.
+    Anota em cada pacote do gabarito a página onde a linha começa.
+
+    Returns:
+        (páginas, número de linhas partidas entre páginas)
+    """
+    pages: List[List[Tuple[float, float, str]]] = []
+    split_rows = 0
+    page: List[Tuple[float, float, str]] = []
+    y = 0.0
+
+    def new_page() -> None:
+        nonlocal page, y
+        page = []
+        pages.append(page)
+        y = TOP_Y
+        page.append((40, y, "LISTA DE DISTRIBUIÇÃO INTERNA - LDI"))
+        y -= LINE_HEIGHT
+        page.append((40, y, f"CDD VISTA ALEGRE    Impresso em: {truth['arrivalDate']}"))
+        y -= LINE_HEIGHT * 1.5
+        for name, x in COLUMNS:
+            page.append((x, y, name))
+        y -= LINE_HEIGHT
+
+    new_page()
+    for pkg in truth["packages"]:
+        if y < BOTTOM_Y:
+            new_page()
+        pkg["page"] = len(pages)
+        cells = (str(pkg["lineNumber"]), truth["arrivalDate"], pkg["position"], pkg["trackingCode"])
+        name_lines = wrap_name(pkg["recipient"])
+        words = pkg["recipient"].split()
+        last_slot = y - LINE_HEIGHT < BOTTOM_Y
+        if last_slot and len(name_lines) == 1 and len(words) > 2 and rng.random() < split_ratio:
+            half = len(words) // 2
+            name_lines = [" ".join(words[:half]), " ".join(words[half:])]
+        for (_, x), text in zip(COLUMNS, cells):
+            page.append((x, y, text))
+        page.append((COLUMNS[-1][1], y, name_lines[0]))
+        y -= LINE_HEIGHT
+        for extra in name_lines[1:]:
+            if y < BOTTOM_Y:
+                new_page()
+                split_rows += 1
+            page.append((COLUMNS[-1][1], y, extra))
+            y -= LINE_HEIGHT
+
+    # Rodapé da última página
+    if y - 2 * LINE_HEIGHT < BOTTOM_Y - LINE_HEIGHT:
+        new_page()
+    y -= LINE_HEIGHT
+    page.append((40, y, f"Total de objetos: {truth['expectedTotal']}"))
+    y -= LINE_HEIGHT
+    page.append((40, y, f"Data de Devolução: {truth['returnDate']}"))
+
+    for number, page_items in enumerate(pages, start=1):
+        page_items.append((PAGE_WIDTH - 110, 30, f"Página {number} de {len(pages)}"))
+    return pages, split_rows
+
+
+def _escape(text: str) -> bytes:
+    return text.encode("cp1252").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def write_pdf(path: Path, pages: List[List[Tuple[float, float, str]]]) -> None:
+    """PDF mínimo com Helvetica/WinAnsi: um objeto de texto posicionado por célula."""
+    objects: List[Optional[bytes]] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    ]
+    kids = []
+    for items in pages:
+        content = b"".join(
+            b"BT /F1 %d Tf %.1f %.1f Td (%s) Tj ET\n" % (FONT_SIZE, x, y, _escape(text))
+            for x, y, text in items
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"endstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+        kids.append(len(objects))
+    objects[1] = (b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % kid for kid in kids)
+                  + b"] /Count %d >>" % len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def table_grid(truth: Dict[str, Any], rng: random.Random, merged_ratio: float = 0.02) -> List[List[str]]:
+    """
+    Grade da tabela como o Docling a exporta (cabeçalho na primeira linha), com uma
+    fração de linhas vizinhas fundidas numa célula só, como acontece nas quebras de
+    página (ex.: "AB864450494BR AB864452186BR").
+    """
+    grid = [list(HEADER)]
+    packages = truth["packages"]
+    i = 0
+    while i < len(packages):
+        pkg = packages[i]
+        row = [str(pkg["lineNumber"]), truth["arrivalDate"], pkg["position"], pkg["trackingCode"], pkg["recipient"]]
+        if i + 1 < len(packages) and rng.random() < merged_ratio:
+            nxt = packages[i + 1]
+            row = [f"{row[0]} {nxt['lineNumber']}", row[1], f"{row[2]} {nxt['position']}",
+                   f"{row[3]} {nxt['trackingCode']}", f"{row[4]} {nxt['recipient']}"]
+            i += 1
+        grid.append(row)
+        i += 1
+    return grid
+
+
+def generate_ldi(out_dir: Path, count: int, rng: random.Random, name: Optional[str] = None) -> Dict[str, Any]:
+    """Gera <nome>.pdf e <nome>.truth.json; retorna o gabarito."""
+    printed = date(2025, 1, 2) + timedelta(days=rng.randrange(365))
+    truth = make_truth(count, rng, printed)
+    pages, split_rows = layout_pages(truth, rng)
+
+    name = name or f"ldi_{count:05d}"
+    truth.update(fileName=f"{name}.pdf", pages=len(pages), splitRows=split_rows,
+                 tableGrid=table_grid(truth, rng))
+    write_pdf(out_dir / f"{name}.pdf", pages)
+    with open(out_dir / f"{name}.truth.json", "w", encoding="utf-8") as f:
+        json.dump(truth, f, ensure_ascii=False, indent=2)
+    return truth
+
+
+def generate_corpus(out_dir: Path, counts=DEFAULT_COUNTS, seed: int = 42) -> List[Dict[str, Any]]:
+    """Gera uma LDI por contagem de objetos, de forma reprodutível (mesma semente, mesmos PDFs)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    truths = []
+    for count in counts:
+        truth = generate_ldi(out_dir, count, rng)
+        print(f"✓ {truth['fileName']}: {count} objetos, {truth['pages']} páginas, "
+              f"{truth['splitRows']} linhas partidas", file=sys.stderr)
+        truths.append(truth)
+    return truths
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description="Gera LDIs sintéticas com gabarito para benchmark")
+    parser.add_argument("out_dir", help="diretório de saída")
+    parser.add_argument("--counts", default=",".join(str(c) for c in DEFAULT_COUNTS),
+                        help="quantidades de objetos, separadas por vírgula (padrão: 10,50,200,1000,2000)")
+    parser.add_argument("--seed", type=int, default=42, help="semente (mesma semente, mesmo corpus)")
+    args = parser.parse_args()
+
+    counts = [int(c) for c in args.counts.split(",") if c.strip()]
+    truths = generate_corpus(Path(args.out_dir), counts, args.seed)
+    print(json.dumps({"success": True, "files": [t["fileName"] for t in truths]}))
+
+
+if __name__ == "__main__":
+    main()
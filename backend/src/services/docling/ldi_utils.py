@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Utilitários compartilhados pelos scripts do Docling
+Funções pequenas usadas tanto em produção (ldi_service.py, batch_runner.py) quanto
+no benchmark (ldi_bench.py, ldi_scorecard.py), sem dependências externas.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por posição mais próxima (sem numpy)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Grava JSON via arquivo temporário + rename (nunca deixa arquivo pela metade)."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Conversão em janelas de páginas
+Converte PDFs grandes N páginas por vez, liberando o documento do Docling de cada
+janela antes da seguinte, para limitar a memória de pico (ldi_parser.py e
+pdf_extractor.py). Com um teto de memória, a janela diminui sozinha.
+"""
+
+import gc
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ldi_metrics import Deadline, current_rss_kb, elapsed_ms
+
+
+# Janela padrão quando só o teto de memória é informado
+DEFAULT_WINDOW_PAGES = 10
+
+
+def get_page_count(pdf_path: str) -> int:
+    """Conta as páginas do PDF sem convertê-lo."""
+    import pypdfium2 as pdfium
+
+    pdf_doc = pdfium.PdfDocument(pdf_path)
+    try:
+        return len(pdf_doc)
+    finally:
+        pdf_doc.close()
+
+
+def resolve_window(window_pages: Optional[int] = None,
+                   memory_limit_mb: Optional[int] = None) -> Tuple[int, Optional[int]]:
+    """
+    Tamanho da janela e teto de memória (MB), dos argumentos ou de LDI_WINDOW_PAGES /
+    LDI_MEMORY_LIMIT_MB. Janela 0 = documento inteiro de uma vez (sem janelas).
+    """
+    if window_pages is None:
+        window_pages = int(os.environ.get("LDI_WINDOW_PAGES", 0) or 0)
+    if memory_limit_mb is None:
+        memory_limit_mb = int(os.environ.get("LDI_MEMORY_LIMIT_MB", 0) or 0) or None
+    if memory_limit_mb and not window_pages:
+        window_pages = DEFAULT_WINDOW_PAGES
+    return max(window_pages, 0), memory_limit_mb
+
+
+class PageWindows:
+    """
+    Itera (início, fim, documento) sobre faixas consecutivas de páginas.
+
+    O documento de cada janela só vive até a próxima iteração: quem consome não deve
+    guardar referências a ele. Depois de cada janela, se o RSS passa do teto, as
+    janelas seguintes têm metade do tamanho (mínimo 1 página). Tempo, páginas e RSS
+    de cada janela ficam em self.windows.
+
+    Com um prazo (Deadline), a primeira janela tem uma página só, para medir o custo
+    por página, e as seguintes são encurtadas para as páginas que ainda cabem no
+    tempo restante, pela média de ms/página das janelas anteriores; quando não cabe
+    nenhuma, a iteração para e self.skipped guarda as páginas não convertidas.
+    """
+
+    def __init__(self, converter, pdf_path: str, page_count: int, window_pages: int,
+                 memory_limit_mb: Optional[int] = None, deadline: Optional[Deadline] = None):
+        self.converter = converter
+        self.pdf_path = pdf_path
+        self.page_count = page_count
+        self.window_pages = max(window_pages, 1)
+        self.memory_limit_kb = memory_limit_mb * 1024 if memory_limit_mb else None
+        self.deadline = deadline
+        self.skipped: Optional[Tuple[int, int]] = None
+        self.windows: List[Dict[str, Any]] = []
+
+    def __iter__(self) -> Iterator[Tuple[int, int, Any]]:
+        start = 1
+        while start <= self.page_count:
+            end = min(start + self.window_pages - 1, self.page_count)
+            if self.deadline is not None:
+                end = self._fit_deadline(start, end)
+                if end < start:
+                    self.skipped = (start, self.page_count)
+                    print(f"  ⏱ Prazo esgotado: páginas {start}-{self.page_count} não convertidas",
+                          file=sys.stderr)
+                    return
+            started = time.perf_counter()
+            doc = self.converter.convert(self.pdf_path, page_range=(start, end)).document
+            convert_ms = elapsed_ms(started)
+            yield start, end, doc
+
+            del doc
+            gc.collect()
+            rss_kb = current_rss_kb()
+            self.windows.append({"start": start, "end": end, "convertMs": convert_ms, "rssKb": rss_kb})
+            print(f"  🪟 Páginas {start}-{end}/{self.page_count} ({convert_ms:.0f}ms, RSS {rss_kb} KB)",
+                  file=sys.stderr)
+            if self.memory_limit_kb and rss_kb and rss_kb > self.memory_limit_kb and self.window_pages > 1:
+                self.window_pages = max(self.window_pages // 2, 1)
+                print(f"  ⚠ RSS acima do teto ({self.memory_limit_kb // 1024} MB): "
+                      f"janela reduzida para {self.window_pages} páginas", file=sys.stderr)
+            start = end + 1
+
+    def _fit_deadline(self, start: int, end: int) -> int:
+        """Última página da janela que ainda cabe no prazo (start - 1 se nenhuma)."""
+        remaining_ms = self.deadline.remaining_ms()
+        if remaining_ms <= 0:
+            return start - 1
+        pages_done = sum(w["end"] - w["start"] + 1 for w in self.windows)
+        if not pages_done:
+            # Sem medida ainda: uma página, para o estouro não passar de uma página
+            return start
+        ms_per_page = sum(w["convertMs"] for w in self.windows) / pages_done
+        return min(end, start + int(remaining_ms // max(ms_per_page, 1)) - 1)
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumo para o metadata: janelas, tamanho final e RSS máximo observado."""
+        return {
+            "windows": len(self.windows),
+            "finalWindowPages": self.window_pages,
+            "memoryLimitMb": self.memory_limit_kb // 1024 if self.memory_limit_kb else None,
+            "maxRssKb": max((w["rssKb"] or 0 for w in self.windows), default=None),
+            "skippedPages": list(self.skipped) if self.skipped else None
+        }
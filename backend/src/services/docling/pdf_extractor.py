@@ -5,96 +5,219 @@ Extrai texto e tabelas de documentos PDF.
 Baseado no projeto ds-pdf-extractor-with-docling
 """
 
+from __future__ import annotations
+
+import argparse
 import json
 import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+# Só para anotações: o conversor (e o import do Docling) vem de pipeline_profiles
+if TYPE_CHECKING:
+    from docling.document_converter import DocumentConverter
 
-from docling.document_converter import DocumentConverter
+from ldi_metrics import elapsed_ms
+from page_windows import PageWindows, get_page_count, resolve_window
+from pipeline import (DEFAULT_EXTRACTORS, EXTRACTORS, ConvertedDocument, ExportOptions, TableWriter,
+                      add_export_arguments, check_extractors, export_options_from_args, run_extractors)
+from pipeline_profiles import PROFILES, get_converter, page_range_for, resolve_profile
 
 
-def extract_pdf(pdf_path: str, output_dir: str = "output"):
+@dataclass
+class ExtractionResult:
+    """
+    O que extract_pdf devolve nos dois modos. document é o documento do Docling só na
+    conversão inteira; em janelas ele nunca fica inteiro em memória (None) e windows
+    traz o resumo das janelas (PageWindows.summary()).
+    """
+    pages: int
+    tables: int
+    document: Any = None
+    windows: Optional[Dict[str, Any]] = None
+
+
+def extract_windowed(pdf_file: Path, output_path: Path, converter, page_count: int,
+                     window_pages: int, memory_limit_mb: int = None,
+                     extract=DEFAULT_EXTRACTORS, export: ExportOptions = None, name: str = None):
+    """
+    Extração em janelas de páginas (page_windows.PageWindows): markdown, JSON e tabelas
+    são gravados janela a janela, sem manter o documento inteiro em memória.
+    
+    O markdown é o das janelas concatenado; o JSON vira
+    {"windows": [{"pages": [início, fim], "document": {...}}, ...]}.
+    
+    Returns:
+        ExtractionResult sem o documento, com o resumo das janelas
+    """
+    export = export or ExportOptions()
+    base_name = name or pdf_file.stem
+    markdown_path = output_path / "markdown" / f"{base_name}.md"
+    json_path = output_path / "json" / f"{base_name}.json"
+    windows = PageWindows(converter, str(pdf_file), page_count, window_pages, memory_limit_mb)
+    print(f"🪟 Convertendo {page_count} páginas em janelas de {windows.window_pages}", file=sys.stderr)
+    
+    md_file = open(markdown_path, "w", encoding="utf-8") if "markdown" in extract else None
+    json_file = open(json_path, "w", encoding="utf-8") if "json" in extract else None
+    tables = TableWriter(output_path / "tables", base_name, export.tables, export.jobs) \
+        if "tables" in extract else None
+    # Cada janela já vai para o arquivo ao ser exportada: "pretty" aqui só mantém os espaços
+    separators = None if export.json_mode == "pretty" else (",", ":")
+    table_count = 0
+    try:
+        if json_file:
+            json_file.write('{"windows": [')
+        for start, end, doc in windows:
+            if md_file:
+                if start > 1:
+                    md_file.write("\n\n")
+                md_file.write(doc.export_to_markdown())
+            if json_file:
+                if start > 1:
+                    json_file.write(",")
+                json.dump({"pages": [start, end], "document": doc.export_to_dict()}, json_file,
+                          ensure_ascii=False, separators=separators)
+            if tables:
+                table_count += tables.add(doc.tables)
+        if json_file:
+            json_file.write("]}")
+    finally:
+        for f in (md_file, json_file):
+            if f:
+                f.close()
+        if tables:
+            tables.close()
+    if md_file:
+        print(f"✓ Texto extraído para: {markdown_path}", file=sys.stderr)
+    if json_file:
+        print(f"✓ JSON exportado para: {json_path}", file=sys.stderr)
+    
+    return ExtractionResult(pages=page_count, tables=table_count, windows=windows.summary())
+
+
+def extract_pdf(pdf_path: str, output_dir: str = "output", converter: DocumentConverter = None,
+                pipeline: str = None, max_pages: int = None, window_pages: int = None,
+                memory_limit_mb: int = None, extract=DEFAULT_EXTRACTORS, export: ExportOptions = None,
+                name: str = None):
     """
     Extrai texto e tabelas de um PDF usando Docling.
     
     Args:
         pdf_path: Caminho para o arquivo PDF
         output_dir: Diretório para salvar os resultados
+        converter: DocumentConverter já carregado (reaproveitado em lote); se None, usa o do perfil
+        pipeline: Perfil de conversão ("default", "fast", "accurate"; ver pipeline_profiles.py)
+        max_pages: Converte só as N primeiras páginas (sobrepõe o limite do perfil)
+        window_pages: Converte N páginas por vez (padrão: LDI_WINDOW_PAGES; ver extract_windowed)
+        memory_limit_mb: Teto de RSS que reduz a janela (padrão: LDI_MEMORY_LIMIT_MB)
+        extract: Saídas a gravar (extratores do pipeline.py: markdown, json, tables, ldi)
+        export: Formato do JSON e das tabelas (pipeline.ExportOptions; padrão: variáveis
+                LDI_EXPORT_JSON / LDI_EXPORT_TABLES)
+        name: Nome base dos arquivos gravados (padrão: o nome do PDF)
     
     Returns:
-        O documento Docling processado
+        ExtractionResult: páginas, tabelas e o documento Docling (None em janelas)
     """
     pdf_file = Path(pdf_path)
     if not pdf_file.exists():
         raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
+    extract = list(dict.fromkeys(extract))
+    check_extractors(extract)
+    export = export or ExportOptions()
+    export.check_available(extract)
     
-    # Criar diretórios de saída
+    # Criar diretórios de saída (só os das saídas pedidas)
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
-    (output_path / "markdown").mkdir(exist_ok=True)
-    (output_path / "json").mkdir(exist_ok=True)
-    (output_path / "tables").mkdir(exist_ok=True)
+    for kind in extract:
+        if kind in DEFAULT_EXTRACTORS:
+            (output_path / kind).mkdir(exist_ok=True)
     
     print(f"📄 Processando: {pdf_file.name}", file=sys.stderr)
     print("⏳ Convertendo PDF (pode demorar na primeira execução)...", file=sys.stderr)
     
     # Converter PDF
-    converter = DocumentConverter()
-    result = converter.convert(str(pdf_file))
-    doc = result.document
+    profile = resolve_profile(pipeline, maxPages=max_pages)
+    print(f"⚙ Perfil de conversão: {profile['name']} {profile['settings']}", file=sys.stderr)
+    if converter is None:
+        converter = get_converter(profile)
     
-    # Nome base do arquivo
-    base_name = pdf_file.stem
+    window_pages, memory_limit_mb = resolve_window(window_pages, memory_limit_mb)
+    # O extrator "ldi" precisa do documento inteiro: sem janelas
+    if window_pages and all(name in DEFAULT_EXTRACTORS for name in extract):
+        page_count = get_page_count(str(pdf_file))
+        page_range = page_range_for(profile, page_count)
+        if page_range:
+            page_count = page_range[1]
+        if page_count > window_pages:
+            extraction = extract_windowed(pdf_file, output_path, converter, page_count,
+                                          window_pages, memory_limit_mb, extract, export, name)
+            print(f"\n📊 Resumo:", file=sys.stderr)
+            print(f"   - Páginas processadas: {extraction.pages} ({extraction.windows['windows']} janelas)",
+                  file=sys.stderr)
+            print(f"   - Tabelas encontradas: {extraction.tables}", file=sys.stderr)
+            print(f"   - Arquivos salvos em: {output_path.absolute()}", file=sys.stderr)
+            return extraction
     
-    # 1. Exportar como Markdown
-    markdown_content = doc.export_to_markdown()
-    markdown_path = output_path / "markdown" / f"{base_name}.md"
-    with open(markdown_path, "w", encoding="utf-8") as f:
-        f.write(markdown_content)
-    print(f"✓ Texto extraído para: {markdown_path}", file=sys.stderr)
-    
-    # 2. Exportar como JSON
-    json_content = doc.export_to_dict()
-    json_path = output_path / "json" / f"{base_name}.json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(json_content, f, indent=2, ensure_ascii=False)
-    print(f"✓ JSON exportado para: {json_path}", file=sys.stderr)
+    started = time.perf_counter()
+    page_range = page_range_for(profile, 0)
+    if page_range:
+        result = converter.convert(str(pdf_file), page_range=page_range)
+    else:
+        result = converter.convert(str(pdf_file))
+    doc = result.document
     
-    # 3. Extrair tabelas
-    tables = doc.tables
-    if tables:
-        for i, table in enumerate(tables):
-            try:
-                df = table.export_to_dataframe()
-                csv_path = output_path / "tables" / f"{base_name}_table_{i+1}.csv"
-                df.to_csv(csv_path, index=False)
-                print(f"✓ Tabela {i+1} exportada para: {csv_path}", file=sys.stderr)
-            except Exception as e:
-                print(f"⚠ Erro ao exportar tabela {i+1}: {e}", file=sys.stderr)
+    # Saídas pedidas: extratores do pipeline.py, gravando em paralelo (uma thread por
+    # extrator, como no pipeline.py; export.jobs é só das threads dos CSVs de tabela)
+    converted = ConvertedDocument(pdf_file, doc, profile, elapsed_ms(started), export, name)
+    run_extractors(converted, extract, output_path)
+    extraction = ExtractionResult(pages=len(doc.pages) if hasattr(doc, 'pages') else 0,
+                                  tables=len(doc.tables), document=doc)
     
     print(f"\n📊 Resumo:", file=sys.stderr)
-    print(f"   - Páginas processadas: {len(doc.pages) if hasattr(doc, 'pages') else 'N/A'}", file=sys.stderr)
-    print(f"   - Tabelas encontradas: {len(tables)}", file=sys.stderr)
+    print(f"   - Páginas processadas: {extraction.pages}", file=sys.stderr)
+    print(f"   - Tabelas encontradas: {extraction.tables}", file=sys.stderr)
     print(f"   - Arquivos salvos em: {output_path.absolute()}", file=sys.stderr)
     
-    return doc
+    return extraction
 
 
 def main():
     """Função principal."""
-    if len(sys.argv) < 2:
-        print("Uso: python pdf_extractor.py <caminho_do_pdf> [diretório_saída]", file=sys.stderr)
-        print("\nExemplo:", file=sys.stderr)
-        print("  python pdf_extractor.py documento.pdf", file=sys.stderr)
-        print("  python pdf_extractor.py documento.pdf ./resultados", file=sys.stderr)
-        sys.exit(1)
-    
-    pdf_file = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else "output"
+    parser = argparse.ArgumentParser(
+        description="Extrai texto e tabelas de um PDF usando Docling",
+        epilog="Exemplos:\n"
+               "  python pdf_extractor.py documento.pdf\n"
+               "  python pdf_extractor.py documento.pdf ./resultados --pipeline fast\n"
+               "  python pdf_extractor.py documento.pdf --extract markdown,tables --json compact "
+               "--tables combined-csv",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("pdf_path", help="caminho do PDF")
+    parser.add_argument("output_dir", nargs="?", default="output", help="diretório de saída (padrão: output)")
+    parser.add_argument("--pipeline", choices=tuple(PROFILES), default=None,
+                        help="perfil de conversão do Docling (padrão: LDI_PIPELINE ou default)")
+    parser.add_argument("--max-pages", type=int, default=None, help="converte só as N primeiras páginas")
+    parser.add_argument("--window-pages", type=int, default=None, metavar="N",
+                        help="converte N páginas por vez, gravando cada janela antes da seguinte "
+                             "(padrão: LDI_WINDOW_PAGES)")
+    parser.add_argument("--memory-limit", dest="memory_limit_mb", type=int, default=None, metavar="MB",
+                        help="teto de RSS que reduz a janela pela metade (padrão: LDI_MEMORY_LIMIT_MB)")
+    parser.add_argument("--extract", default=",".join(DEFAULT_EXTRACTORS),
+                        help=f"saídas separadas por vírgula ({', '.join(EXTRACTORS)}; "
+                             f"padrão: {','.join(DEFAULT_EXTRACTORS)})")
+    add_export_arguments(parser)
+    args = parser.parse_args()
     
+    extract = [name.strip() for name in args.extract.split(",") if name.strip()]
     try:
-        extract_pdf(pdf_file, output_dir)
+        extract_pdf(args.pdf_path, args.output_dir, pipeline=args.pipeline, max_pages=args.max_pages,
+                    window_pages=args.window_pages, memory_limit_mb=args.memory_limit_mb,
+                    extract=extract, export=export_options_from_args(args))
         print("\n✅ Extração concluída com sucesso!", file=sys.stderr)
-    except FileNotFoundError as e:
+    except (FileNotFoundError, ValueError) as e:
         print(f"❌ Erro: {e}", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
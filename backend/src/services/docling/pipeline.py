@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Pipeline de extração: converte uma vez, extrai várias
+Uma única conversão do Docling alimenta os extratores pedidos (pacotes da LDI,
+markdown, JSON, tabelas CSV), que gravam suas saídas em paralelo. Novos tipos de
+documento entram registrando um extrator com @register_extractor.
+
+Uso:
+    python pipeline.py ldi.pdf saida/ [--extract ldi,markdown,json,tables] [--pipeline fast]
+    python pipeline.py ldi.pdf saida/ --json compact --tables combined-csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # opcional: só para --tables parquet
+    pyarrow = None
+
+from ldi_metrics import elapsed_ms
+from ldi_parser import table_to_rows
+from pipeline_profiles import PROFILES, get_converter, page_range_for, resolve_profile
+
+
+# Gravação do JSON: pretty (indentado, o formato histórico), compact (sem espaços,
+# uma escrita só) ou stream (sem espaços, gravado em pedaços sem montar a string
+# inteira; o dicionário do documento continua todo em memória, só a string é evitada)
+JSON_MODES = ("pretty", "compact", "stream")
+
+# Tabelas: csv (um arquivo por tabela), combined-csv ou parquet (um arquivo por PDF)
+TABLE_FORMATS = ("csv", "combined-csv", "parquet")
+
+
+@dataclass
+class ExportOptions:
+    """Formato das saídas gravadas pelos extratores (padrão: LDI_EXPORT_JSON / LDI_EXPORT_TABLES)."""
+    json_mode: str = field(default_factory=lambda: os.environ.get("LDI_EXPORT_JSON", "pretty"))
+    tables: str = field(default_factory=lambda: os.environ.get("LDI_EXPORT_TABLES", "csv"))
+    # Threads para gravar os CSVs de tabela (None: o padrão do ThreadPoolExecutor)
+    jobs: Optional[int] = None
+
+    def __post_init__(self):
+        if self.json_mode not in JSON_MODES:
+            raise ValueError(f"Modo de JSON desconhecido: {self.json_mode} (disponíveis: {', '.join(JSON_MODES)})")
+        if self.tables not in TABLE_FORMATS:
+            raise ValueError(f"Formato de tabelas desconhecido: {self.tables} "
+                             f"(disponíveis: {', '.join(TABLE_FORMATS)})")
+
+    def check_available(self, extractors) -> None:
+        """
+        Levanta ValueError se uma saída pedida depende de pacote ausente (Parquet sem
+        pyarrow). Só vale com o extrator de tabelas: LDI_EXPORT_TABLES=parquet não
+        impede uma extração só de markdown/JSON.
+        """
+        if "tables" in extractors and self.tables == "parquet" and pyarrow is None:
+            raise ValueError("Parquet indisponível: pip install pyarrow")
+
+
+@dataclass
+class ConvertedDocument:
+    """Documento já convertido, compartilhado (somente leitura) pelos extratores."""
+    pdf_path: Path
+    document: Any
+    profile: Dict[str, Any]
+    convert_ms: float
+    export: ExportOptions = field(default_factory=ExportOptions)
+    # Nome base dos arquivos gravados (padrão: o do PDF)
+    name: Optional[str] = None
+
+    @property
+    def base_name(self) -> str:
+        return self.name or self.pdf_path.stem
+
+
+# Extrator: (documento convertido, diretório de saída) -> resumo JSON do que gravou
+Extractor = Callable[[ConvertedDocument, Path], Dict[str, Any]]
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+# Padrão: saídas do pdf_extractor.py
+DEFAULT_EXTRACTORS = ("markdown", "json", "tables")
+
+
+def register_extractor(name: str) -> Callable[[Extractor], Extractor]:
+    """Registra um extrator selecionável por nome (--extract)."""
+    def decorator(func: Extractor) -> Extractor:
+        EXTRACTORS[name] = func
+        return func
+    return decorator
+
+
+def _output_file(output_dir: Path, kind: str, name: str) -> Path:
+    folder = output_dir / kind
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / name
+
+
+@register_extractor("markdown")
+def extract_markdown(converted: ConvertedDocument, output_dir: Path) -> Dict[str, Any]:
+    markdown_path = _output_file(output_dir, "markdown", f"{converted.base_name}.md")
+    with open(markdown_path, "w", encoding="utf-8") as f:
+        f.write(converted.document.export_to_markdown())
+    print(f"✓ Texto extraído para: {markdown_path}", file=sys.stderr)
+    return {"output": str(markdown_path)}
+
+
+def write_json(data: Any, f, mode: str = "pretty") -> None:
+    """Grava data no arquivo aberto f conforme o modo (JSON_MODES)."""
+    if mode == "pretty":
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    elif mode == "compact":
+        # dumps usa o encoder em C; json.dump codifica em Python, pedaço a pedaço
+        f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    else:
+        # Pedaços do iterencode direto no arquivo: poupa a string do JSON, não o dicionário
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+@register_extractor("json")
+def extract_json(converted: ConvertedDocument, output_dir: Path) -> Dict[str, Any]:
+    json_path = _output_file(output_dir, "json", f"{converted.base_name}.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        write_json(converted.document.export_to_dict(), f, converted.export.json_mode)
+    print(f"✓ JSON exportado para: {json_path}", file=sys.stderr)
+    return {"output": str(json_path), "json": converted.export.json_mode}
+
+
+def _table_page(table) -> Optional[int]:
+    prov = getattr(table, "prov", None)
+    return prov[0].page_no if prov else None
+
+
+class TableWriter:
+    """
+    Grava as tabelas do Docling a partir da grade de células (ldi_parser.table_to_rows),
+    sem o DataFrame do pandas:
+
+    - csv: um arquivo por tabela (<nome>_table_<n>.csv), gravados em paralelo;
+    - combined-csv / parquet: um arquivo só (<nome>_tables.csv / .parquet) em formato
+      longo, com as colunas table, page, row, column, text (row 0 = cabeçalho).
+
+    add() pode ser chamado várias vezes (extração em janelas); close() fecha o arquivo
+    combinado e devolve o resumo.
+    """
+
+    COLUMNS = ("table", "page", "row", "column", "text")
+
+    def __init__(self, tables_dir: Path, base_name: str, fmt: str = "csv", jobs: Optional[int] = None):
+        tables_dir.mkdir(parents=True, exist_ok=True)
+        self.tables_dir = tables_dir
+        self.base_name = base_name
+        self.fmt = fmt
+        self.jobs = jobs
+        self.tables = 0
+        self.cells = 0
+        self.output = tables_dir
+        self._file = None
+        self._writer = None
+        self._columns: Dict[str, List[Any]] = {name: [] for name in self.COLUMNS}
+        if fmt == "combined-csv":
+            self.output = tables_dir / f"{base_name}_tables.csv"
+            self._file = open(self.output, "w", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.COLUMNS)
+        elif fmt == "parquet":
+            self.output = tables_dir / f"{base_name}_tables.parquet"
+
+    def _write_csv(self, item) -> bool:
+        i, table = item
+        try:
+            csv_path = self.tables_dir / f"{self.base_name}_table_{i}.csv"
+            with open(csv_path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f).writerows(table_to_rows(table))
+            print(f"✓ Tabela {i} exportada para: {csv_path}", file=sys.stderr)
+            return True
+        except Exception as e:
+            print(f"⚠ Erro ao exportar tabela {i}: {e}", file=sys.stderr)
+            return False
+
+    def _long_rows(self, i: int, table):
+        page = _table_page(table)
+        for r, row in enumerate(table_to_rows(table)):
+            for c, text in enumerate(row):
+                yield i, page, r, c, text
+
+    def add(self, tables) -> int:
+        """Grava as tabelas (numeradas em sequência entre chamadas); retorna quantas."""
+        items = list(enumerate(tables, start=self.tables + 1))
+        if self.fmt == "csv":
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                written = sum(executor.map(self._write_csv, items))
+            self.tables += len(items)
+            return written
+
+        written = 0
+        for i, table in items:
+            try:
+                rows = list(self._long_rows(i, table))
+            except Exception as e:
+                print(f"⚠ Erro ao exportar tabela {i}: {e}", file=sys.stderr)
+                continue
+            if self._writer is not None:
+                self._writer.writerows(rows)
+            else:
+                for name, values in zip(self.COLUMNS, zip(*rows)):
+                    self._columns[name].extend(values)
+            self.cells += len(rows)
+            written += 1
+        self.tables += len(items)
+        return written
+
+    def close(self) -> Dict[str, Any]:
+        if self._file is not None:
+            self._file.close()
+        elif self.fmt == "parquet":
+            columns = dict(self._columns)
+            columns["text"] = [None if text is None else str(text) for text in columns["text"]]
+            pyarrow.parquet.write_table(pyarrow.table(columns), self.output)
+        if self.fmt != "csv":
+            print(f"✓ {self.tables} tabelas ({self.cells} células) exportadas para: {self.output}",
+                  file=sys.stderr)
+        return {"output": str(self.output), "format": self.fmt}
+
+
+@register_extractor("tables")
+def extract_tables(converted: ConvertedDocument, output_dir: Path) -> Dict[str, Any]:
+    export = converted.export
+    writer = TableWriter(output_dir / "tables", converted.base_name, export.tables, export.jobs)
+    try:
+        exported = writer.add(converted.document.tables)
+    finally:
+        report = writer.close()
+    return {**report, "tables": exported}
+
+
+@register_extractor("ldi")
+def extract_ldi(converted: ConvertedDocument, output_dir: Path) -> Dict[str, Any]:
+    """Pacotes da LDI (mesmo JSON do ldi_parser.py), lidos do documento já convertido."""
+    import ldi_parser
+
+    result = ldi_parser.parse_ldi_pdf(str(converted.pdf_path), strategy="docling", workers=1,
+                                      pipeline=converted.profile["name"],
+                                      max_pages=converted.profile["settings"]["maxPages"],
+                                      document=converted.document)
+    ldi_path = _output_file(output_dir, "ldi", f"{converted.base_name}.json")
+    with open(ldi_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+    print(f"✓ Pacotes da LDI ({result['totalPackages']}) exportados para: {ldi_path}", file=sys.stderr)
+    return {
+        "output": str(ldi_path),
+        "success": result["success"],
+        "packages": result["totalPackages"],
+        "errors": result["errors"]
+    }
+
+
+def convert(pdf_path: str, pipeline: Optional[str] = None, max_pages: Optional[int] = None,
+            converter=None, export: Optional[ExportOptions] = None) -> ConvertedDocument:
+    """Converte o PDF uma vez com o perfil pedido."""
+    profile = resolve_profile(pipeline, maxPages=max_pages)
+    converter = converter or get_converter(profile)
+    started = time.perf_counter()
+    page_range = page_range_for(profile, 0)
+    if page_range:
+        document = converter.convert(pdf_path, page_range=page_range).document
+    else:
+        document = converter.convert(pdf_path).document
+    return ConvertedDocument(Path(pdf_path), document, profile, elapsed_ms(started),
+                             export or ExportOptions())
+
+
+def check_extractors(names) -> None:
+    """Levanta ValueError para extratores não registrados."""
+    unknown = [name for name in names if name not in EXTRACTORS]
+    if unknown:
+        raise ValueError(f"Extrator desconhecido: {', '.join(unknown)} (disponíveis: {', '.join(EXTRACTORS)})")
+
+
+def run_extractors(converted: ConvertedDocument, names, output_dir: Path,
+                   jobs: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Roda os extratores sobre o mesmo documento, em threads (a gravação das saídas se
+    sobrepõe). Falha de um extrator vira status "error" sem afetar os demais.
+    """
+    check_extractors(names)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    def run(name: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            report = {"status": "ok", **EXTRACTORS[name](converted, output_dir)}
+        except Exception as e:
+            print(f"⚠ Extrator {name} falhou: {e}", file=sys.stderr)
+            report = {"status": "error", "error": str(e)}
+        report["ms"] = elapsed_ms(started)
+        return report
+
+    with ThreadPoolExecutor(max_workers=jobs or len(names) or 1) as executor:
+        reports = list(executor.map(run, names))
+    return dict(zip(names, reports))
+
+
+def run_pipeline(pdf_path: str, output_dir: str = "output", extractors=DEFAULT_EXTRACTORS,
+                 pipeline: Optional[str] = None, max_pages: Optional[int] = None,
+                 converter=None, export: Optional[ExportOptions] = None) -> Dict[str, Any]:
+    """
+    Converte o PDF uma vez e roda os extratores pedidos; export escolhe o formato do
+    JSON e das tabelas (ExportOptions).
+
+    Returns:
+        {"file", "pipeline", "convertMs", "pages", "extractors": {nome: {"status", "ms", ...}}}
+    """
+    if not Path(pdf_path).exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
+    names = list(dict.fromkeys(extractors))
+    check_extractors(names)
+    export = export or ExportOptions()
+    export.check_available(names)
+
+    print(f"📄 Processando: {Path(pdf_path).name} (extratores: {', '.join(names)})", file=sys.stderr)
+    converted = convert(pdf_path, pipeline, max_pages, converter, export)
+    print(f"✓ Convertido em {converted.convert_ms:.0f}ms (perfil {converted.profile['name']})", file=sys.stderr)
+
+    reports = run_extractors(converted, names, Path(output_dir))
+    document = converted.document
+    return {
+        "file": str(pdf_path),
+        "pipeline": converted.profile,
+        "convertMs": converted.convert_ms,
+        "pages": len(document.pages) if hasattr(document, "pages") else None,
+        "extractors": reports
+    }
+
+
+def add_export_arguments(parser: argparse.ArgumentParser) -> None:
+    """--json, --tables e --write-jobs (compartilhados com o pdf_extractor.py)."""
+    parser.add_argument("--json", dest="json_mode", choices=JSON_MODES, default=None,
+                        help="gravação do JSON: pretty (indentado), compact ou stream (compacto, gravado "
+                             "em pedaços sem montar a string; o documento segue em memória) "
+                             "(padrão: LDI_EXPORT_JSON ou pretty)")
+    parser.add_argument("--tables", dest="tables_format", choices=TABLE_FORMATS, default=None,
+                        help="tabelas: um CSV por tabela, um CSV combinado ou Parquet "
+                             "(padrão: LDI_EXPORT_TABLES ou csv)")
+    parser.add_argument("--write-jobs", type=int, default=None, metavar="N",
+                        help="threads para gravar os CSVs de tabela")
+
+
+def export_options_from_args(args: argparse.Namespace) -> ExportOptions:
+    options = {"json_mode": args.json_mode, "tables": args.tables_format, "jobs": args.write_jobs}
+    return ExportOptions(**{key: value for key, value in options.items() if value is not None})
+
+
+def main():
+    """Função principal - imprime o relatório JSON em stdout."""
+    parser = argparse.ArgumentParser(description="Converte um PDF uma vez e roda vários extratores")
+    parser.add_argument("pdf_path", help="caminho do PDF")
+    parser.add_argument("output_dir", nargs="?", default="output", help="diretório de saída (padrão: output)")
+    parser.add_argument("--extract", default=",".join(DEFAULT_EXTRACTORS),
+                        help=f"extratores separados por vírgula ({', '.join(EXTRACTORS)}; "
+                             f"padrão: {','.join(DEFAULT_EXTRACTORS)})")
+    parser.add_argument("--pipeline", choices=tuple(PROFILES), default=None,
+                        help="perfil de conversão do Docling (padrão: LDI_PIPELINE ou default)")
+    parser.add_argument("--max-pages", type=int, default=None, help="converte só as N primeiras páginas")
+    add_export_arguments(parser)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.extract.split(",") if name.strip()]
+    try:
+        report = run_pipeline(args.pdf_path, args.output_dir, names, args.pipeline, args.max_pages,
+                              export=export_options_from_args(args))
+    except (FileNotFoundError, ValueError) as e:
+        print(json.dumps({"success": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    report["success"] = all(r["status"] == "ok" for r in report["extractors"].values())
+    print(json.dumps(report, ensure_ascii=False))
+    if not report["success"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
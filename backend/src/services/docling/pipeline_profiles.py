@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Perfis de conversão do Docling
+Configurações nomeadas do pipeline de PDF (OCR, modo do TableFormer, imagens, limite
+de páginas), compartilhadas por ldi_parser.py, pdf_extractor.py e batch_runner.py.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+
+# Perfis disponíveis. "default" fixa explicitamente as opções padrão do Docling para
+# que o metadata registre o que de fato rodou. selectiveOcr: OCR só nas páginas
+# sem camada de texto (ver ldi_parser.convert_document).
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {
+        "ocr": True,
+        "selectiveOcr": True,
+        "tableStructure": True,
+        "tableMode": "accurate",
+        "cellMatching": True,
+        "pageImages": False,
+        "pictureImages": False,
+        "imagesScale": 1.0,
+        "maxPages": None
+    },
+    # LDIs digitais: sem OCR nem imagens, TableFormer no modo rápido
+    "fast": {
+        "ocr": False,
+        "selectiveOcr": False,
+        "tableStructure": True,
+        "tableMode": "fast",
+        "cellMatching": True,
+        "pageImages": False,
+        "pictureImages": False,
+        "imagesScale": 1.0,
+        "maxPages": None
+    },
+    # Digitalizações ruins: OCR em todas as páginas e células previstas pelo modelo
+    "accurate": {
+        "ocr": True,
+        "selectiveOcr": False,
+        "forceFullPageOcr": True,
+        "tableStructure": True,
+        "tableMode": "accurate",
+        "cellMatching": False,
+        "pageImages": False,
+        "pictureImages": False,
+        "imagesScale": 2.0,
+        "maxPages": None
+    }
+}
+
+DEFAULT_PROFILE = "default"
+
+# Conversores já carregados no processo, por assinatura do perfil
+_converters: Dict[str, Any] = {}
+
+
+def default_profile_name() -> str:
+    """Perfil padrão do processo (LDI_PIPELINE ou "default")."""
+    return os.environ.get("LDI_PIPELINE") or DEFAULT_PROFILE
+
+
+def resolve_profile(name: Optional[str] = None, **overrides: Any) -> Dict[str, Any]:
+    """
+    Retorna {"name", "settings"} do perfil, com ajustes pontuais aplicados
+    (ex.: maxPages=2). Levanta ValueError para perfis desconhecidos.
+    """
+    name = name or default_profile_name()
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de conversão desconhecido: {name} (disponíveis: {', '.join(PROFILES)})")
+    settings = dict(PROFILES[name])
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return {"name": name, "settings": settings}
+
+
+def text_only_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Variante sem OCR do perfil: páginas e PDFs com camada de texto no OCR seletivo."""
+    return resolve_profile(profile["name"], **{**profile["settings"], "ocr": False})
+
+
+def warm_profiles(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Perfis cujos conversores um processo usa com este perfil: ele mesmo e, com OCR
+    seletivo, a variante sem OCR (PDFs digitais). Quem carrega os modelos antes do
+    fork (ldi_service.py, batch_runner.py) aquece todos.
+    """
+    profiles = [profile]
+    if profile["settings"].get("selectiveOcr") and profile["settings"]["ocr"]:
+        profiles.append(text_only_profile(profile))
+    return profiles
+
+
+def profile_signature(profile: Dict[str, Any]) -> str:
+    """Identificador estável do perfil (nome + hash das configurações), para chaves de cache."""
+    encoded = json.dumps(profile["settings"], sort_keys=True).encode("utf-8")
+    return f"{profile['name']}-{hashlib.sha256(encoded).hexdigest()[:8]}"
+
+
+def build_converter(profile: Dict[str, Any]):
+    """Cria um DocumentConverter com as opções do pipeline de PDF do perfil."""
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    settings = profile["settings"]
+    options = PdfPipelineOptions()
+    options.do_ocr = settings["ocr"]
+    options.do_table_structure = settings["tableStructure"]
+    options.table_structure_options.mode = (
+        TableFormerMode.FAST if settings["tableMode"] == "fast" else TableFormerMode.ACCURATE
+    )
+    options.table_structure_options.do_cell_matching = settings["cellMatching"]
+    options.generate_page_images = settings["pageImages"]
+    options.generate_picture_images = settings["pictureImages"]
+    options.images_scale = settings["imagesScale"]
+    if settings.get("forceFullPageOcr"):
+        try:
+            options.ocr_options.force_full_page_ocr = True
+        except AttributeError:
+            print("⚠ OCR de página inteira indisponível nesta versão do Docling", file=sys.stderr)
+
+    return DocumentConverter(format_options={
+        InputFormat.PDF: PdfFormatOption(pipeline_options=options)
+    })
+
+
+def get_converter(profile: Optional[Dict[str, Any]] = None):
+    """Retorna o conversor do perfil, criando-o na primeira chamada do processo."""
+    profile = profile or resolve_profile()
+    signature = profile_signature(profile)
+    if signature not in _converters:
+        _converters[signature] = build_converter(profile)
+    return _converters[signature]
+
+
+def page_range_for(profile: Dict[str, Any], page_count: int) -> Optional[tuple]:
+    """Faixa (1, limite) quando o perfil limita páginas e o PDF passa do limite."""
+    max_pages = profile["settings"].get("maxPages")
+    if max_pages and (page_count == 0 or page_count > max_pages):
+        return (1, max_pages)
+    return None
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Índice de moradores conhecidos
+Carrega a lista de moradores exportada pelo Node.js (JSON) uma vez por processo e
+a usa para separar nomes concatenados em células mescladas e para associar cada
+pacote a um morador (residentId + matchScore).
+
+Formato do arquivo:
+    [{"id": 12, "name": "MARIA DA SILVA"}, ...]   ou   {"residents": [...]}
+"""
+
+import hashlib
+import json
+import os
+import sys
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# Palavras que não identificam ninguém (ignoradas na busca por palavras)
+CONNECTIVES = frozenset(("DA", "DE", "DI", "DO", "DU", "DAS", "DOS", "E"))
+
+# Abaixo disso, o pacote não é associado a nenhum morador
+MIN_MATCH_SCORE = 0.6
+
+# Chave do nó terminal na trie (nenhuma palavra normalizada fica vazia)
+_END = ""
+
+# Índices já carregados no processo, por caminho (recarregados se o arquivo mudar)
+_indexes: Dict[str, Tuple[float, "RecipientIndex"]] = {}
+
+
+def normalize_tokens(name: str) -> List[str]:
+    """Palavras do nome em maiúsculas, sem acentos nem símbolos."""
+    decomposed = unicodedata.normalize("NFKD", name.upper())
+    letters = "".join(
+        ch if ch.isalpha() else " "
+        for ch in decomposed
+        if not unicodedata.combining(ch)
+    )
+    return letters.split()
+
+
+class RecipientIndex:
+    """
+    Trie por palavra dos nomes completos (separação de nomes concatenados) e índice
+    invertido palavra -> moradores (nome mais parecido quando não há igual).
+    """
+
+    def __init__(self, residents: List[Dict[str, Any]]):
+        self.trie: Dict[str, Any] = {}
+        self.by_token: Dict[str, List[int]] = {}
+        self.names: List[Tuple[Any, frozenset]] = []
+        # Palavras do nome conhecido mais longo (profundidade da trie)
+        self.depth = 0
+        for resident in residents:
+            tokens = normalize_tokens(str(resident.get("name") or ""))
+            if not tokens:
+                continue
+            position = len(self.names)
+            self.names.append((resident.get("id"), frozenset(tokens)))
+            self.depth = max(self.depth, len(tokens))
+
+            node = self.trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(_END, resident.get("id"))
+
+            for token in set(tokens) - CONNECTIVES:
+                self.by_token.setdefault(token, []).append(position)
+
+        encoded = json.dumps([[rid, sorted(tokens)] for rid, tokens in self.names],
+                             sort_keys=True, default=str).encode("utf-8")
+        self.signature = hashlib.sha256(encoded).hexdigest()[:12]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def load(cls, path: str) -> "RecipientIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        residents = data.get("residents", []) if isinstance(data, dict) else data
+        return cls(residents)
+
+    def known_lengths(self, tokens: List[str], start: int) -> Dict[int, Any]:
+        """Nomes conhecidos que começam em tokens[start]: {nº de palavras: id}."""
+        found = {}
+        node = self.trie
+        for end in range(start, len(tokens)):
+            if not tokens[end]:
+                break
+            node = node.get(tokens[end])
+            if node is None:
+                break
+            if _END in node:
+                found[end - start + 1] = node[_END]
+        return found
+
+    def segment(self, words: List[str], count: int) -> Optional[List[str]]:
+        """
+        Separa as palavras em count nomes consecutivos, maximizando quantos são nomes
+        conhecidos; no empate, a divisão mais equilibrada. None se nenhum nome da
+        célula for conhecido (quem chama mantém a divisão padrão).
+
+        Programação dinâmica em O(count·n·profundidade da trie): nomes conhecidos só
+        vêm da caminhada na trie a partir de cada posição, e o melhor corte para um
+        nome desconhecido sai de máximos acumulados (ver _best_unknown), sem
+        percorrer todas as posições anteriores.
+        """
+        tokens = [" ".join(normalize_tokens(word)) for word in words]
+        n = len(tokens)
+        if count < 2 or n < count:
+            return None
+
+        # Nomes conhecidos por posição inicial: uma caminhada na trie por palavra
+        known = [self.known_lengths(tokens, start) for start in range(n)]
+        if not any(known):
+            return None
+
+        # best[k][i]: melhor pontuação separando words[:i] em k nomes, em inteiros
+        # (1/(100·count) de ponto): cada nome conhecido vale 1 e cada nome perde 0.01
+        # por palavra de distância da divisão exata n/count, sem empates por arredondamento
+        bonus = 100 * count
+        best: List[List[Optional[int]]] = [[None] * (n + 1) for _ in range(count + 1)]
+        back = [[0] * (n + 1) for _ in range(count + 1)]
+        best[0][0] = 0
+        for k in range(1, count + 1):
+            previous = best[k - 1]
+            for i, candidates in _best_unknown(previous, k - 1, n - (count - k), n, count):
+                # Nomes conhecidos que terminam em i (no máximo depth palavras)
+                candidates += [j for j in range(max(i - self.depth, k - 1), i)
+                               if i - j in known[j] and previous[j] is not None]
+                for j in sorted(set(candidates)):
+                    length = i - j
+                    score = previous[j] + (bonus if length in known[j] else 0) - abs(length * count - n)
+                    if best[k][i] is None or score > best[k][i]:
+                        best[k][i] = score
+                        back[k][i] = j
+
+        names = []
+        i = n
+        for k in range(count, 0, -1):
+            j = back[k][i]
+            names.append(" ".join(words[j:i]))
+            i = j
+        return names[::-1]
+
+    def match(self, name: str) -> Tuple[Any, float]:
+        """(id do morador, pontuação 0-1): 1.0 para nome idêntico, senão Dice por palavras."""
+        tokens = normalize_tokens(name)
+        if not tokens:
+            return None, 0.0
+
+        found = self.known_lengths(tokens, 0).get(len(tokens))
+        if found is not None:
+            return found, 1.0
+
+        wanted = frozenset(tokens)
+        significant = wanted - CONNECTIVES
+        candidates = {position for token in significant for position in self.by_token.get(token, ())}
+        best_id, best_score = None, 0.0
+        for position in candidates:
+            resident_id, resident_tokens = self.names[position]
+            common = len(significant & resident_tokens)
+            score = 2 * common / (len(significant) + len(resident_tokens - CONNECTIVES))
+            if score > best_score:
+                best_id, best_score = resident_id, score
+        return best_id, round(best_score, 3)
+
+    def annotate(self, pkg: Dict[str, Any]) -> None:
+        """Adiciona residentId/matchScore ao pacote (residentId None abaixo de MIN_MATCH_SCORE)."""
+        resident_id, score = self.match(pkg.get("recipient") or "")
+        pkg["residentId"] = resident_id if score >= MIN_MATCH_SCORE else None
+        pkg["matchScore"] = score
+
+
+def _best_unknown(previous: List[Optional[int]], first: int, last: int,
+                  n: int, count: int) -> Iterator[Tuple[int, List[int]]]:
+    """
+    Para cada fim i (first < i <= last), os melhores inícios j de um nome terminando
+    em i pela pontuação de segment() sem o bônus de nome conhecido:
+    previous[j] - |(i - j)·count - n|. Para nomes com pelo menos n/count palavras
+    ela é previous[j] + j·count menos uma constante (máximo acumulado); para os mais
+    curtos, previous[j] - j·count mais uma constante, numa janela que anda com i
+    (fila monotônica). No empate fica o menor j.
+    """
+    long_best, long_j = None, None
+    window: deque = deque()
+    added = moved = first
+    for i in range(first + 1, last + 1):
+        # Entram na janela dos curtos os j < i ainda não vistos
+        while added < i:
+            if previous[added] is not None:
+                value = previous[added] - added * count
+                while window and window[-1][0] < value:
+                    window.pop()
+                window.append((value, added))
+            added += 1
+        # Os j com (i - j)·count >= n passam da janela para o acumulado dos longos
+        while moved < i and (i - moved) * count >= n:
+            if previous[moved] is not None:
+                value = previous[moved] + moved * count
+                if long_best is None or value > long_best:
+                    long_best, long_j = value, moved
+            moved += 1
+        while window and (i - window[0][1]) * count >= n:
+            window.popleft()
+        candidates = [j for j in (long_j, window[0][1] if window else None) if j is not None]
+        yield i, candidates
+
+
+def get_index(path: Optional[str] = None) -> Optional[RecipientIndex]:
+    """
+    Índice do arquivo (padrão: LDI_RESIDENTS), carregado uma vez por processo e
+    recarregado só quando o arquivo muda. None sem arquivo configurado.
+    """
+    path = path or os.environ.get("LDI_RESIDENTS")
+    if not path:
+        return None
+    mtime = os.path.getmtime(path)
+    cached = _indexes.get(path)
+    if cached is None or cached[0] != mtime:
+        index = RecipientIndex.load(path)
+        _indexes[path] = (mtime, index)
+        print(f"👥 Índice de moradores: {len(index)} nomes ({os.path.basename(path)})", file=sys.stderr)
+    return _indexes[path][1]
@@ -0,0 +1,32 @@
+"""
+Testes dos scripts do Docling (python -m pytest backend/src/services/docling/tests).
+Os módulos ficam soltos na pasta pai, como no container: ela vai para o sys.path.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ldi_synth  # noqa: E402
+
+
+@pytest.fixture
+def synthetic_ldi(tmp_path):
+    """Gera uma LDI sintética (ldi_synth.py) e devolve (caminho do PDF, gabarito)."""
+    def generate(count: int = 80, seed: int = 0, name: str = "ldi"):
+        truth = ldi_synth.generate_ldi(tmp_path, count, random.Random(seed), name=name)
+        return tmp_path / f"{name}.pdf", truth
+    return generate
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Sem cache, índices ou moradores do ambiente de quem roda os testes."""
+    monkeypatch.setenv("LDI_CACHE_DIR", str(tmp_path / "cache"))
+    for name in ("LDI_CACHE", "LDI_RESIDENTS", "LDI_TRACKING_INDEX", "LDI_PIPELINE",
+                 "LDI_WINDOW_PAGES", "LDI_MEMORY_LIMIT_MB"):
+        monkeypatch.delenv(name, raising=False)
@@ -0,0 +1,69 @@
+"""Cache de resultados e conversões (ldi_cache.py)."""
+
+import os
+import time
+
+import pytest
+
+from ldi_cache import KIND_CONVERSION, KIND_RESULT, ResultCache
+from ldi_parser import parse_ldi_pdf
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache.sqlite3"))
+
+
+def test_guarda_e_devolve_o_valor(cache):
+    value = {"packages": [{"trackingCode": "AB000000001BR", "recipient": "JOÃO"}]}
+    cache.put(KIND_RESULT, "k", value)
+    assert cache.get(KIND_RESULT, "k") == value
+    assert cache.get(KIND_CONVERSION, "k") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["conversionMisses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_despeja_as_entradas_acessadas_ha_mais_tempo(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_bytes=1000)
+    for key in ("a", "b", "c"):
+        # ~450 bytes comprimidos cada: a terceira passa do limite
+        cache.put(KIND_RESULT, key, {"key": key, "noise": os.urandom(400).hex()})
+        time.sleep(0.01)
+        cache.get(KIND_RESULT, "a")  # "a" continua a mais recente
+        time.sleep(0.01)
+    assert cache.get(KIND_RESULT, "a") is not None
+    assert cache.get(KIND_RESULT, "b") is None
+    assert cache.get(KIND_RESULT, "c") is not None
+    assert cache.stats()["bytes"] <= 1000
+
+
+def test_entrada_corrompida_e_removida_e_vira_miss(cache):
+    cache.put(KIND_RESULT, "k", {"ok": True})
+    conn = cache._connect()
+    conn.execute("UPDATE entries SET payload = x'00ff00ff'")
+    conn.commit()
+
+    assert cache.get(KIND_RESULT, "k") is None
+    assert cache.stats()["entries"] == 0
+    cache.put(KIND_RESULT, "k", {"ok": True})
+    assert cache.get(KIND_RESULT, "k") == {"ok": True}
+
+
+def test_valor_acima_do_limite_nao_e_gravado(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_bytes=10)
+    cache.put(KIND_RESULT, "k", {"texto": "bem maior que dez bytes"})
+    assert cache.get(KIND_RESULT, "k") is None
+
+
+def test_parse_repetido_vem_do_cache(synthetic_ldi, cache):
+    pytest.importorskip("pypdfium2")
+    pdf_path, truth = synthetic_ldi(count=40, seed=2)
+    first = parse_ldi_pdf(str(pdf_path), strategy="text", cache=cache)
+    second = parse_ldi_pdf(str(pdf_path), strategy="text", cache=cache)
+
+    assert first["metadata"]["cache"]["hit"] is False
+    assert second["metadata"]["cache"]["hit"] is True
+    assert second["packages"] == first["packages"]
+    # Outra estratégia é outra chave
+    third = parse_ldi_pdf(str(pdf_path), strategy="auto", cache=cache)
+    assert third["metadata"]["cache"]["hit"] is False
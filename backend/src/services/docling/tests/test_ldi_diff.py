@@ -0,0 +1,96 @@
+"""Diff contra uma LDI anterior (ldi_diff.py e --diff-against do parser)."""
+
+import json
+
+import pytest
+
+import ldi_diff
+from ldi_parser import parse_ldi_pdf
+
+
+def _pkg(code, recipient="MARIA SILVA", position="PCM - 1", line=1):
+    return {"trackingCode": code, "recipient": recipient, "position": position,
+            "pickupDeadline": "2026-01-12", "lineNumber": line}
+
+
+PREVIOUS = ldi_diff.build_index([
+    _pkg("AB000000001BR"),
+    _pkg("AB000000002BR", recipient="JOSE SOUZA", line=2),
+    _pkg("AB000000003BR", line=3),
+])
+
+
+def test_classifica_novos_alterados_iguais_e_removidos():
+    result = {"packages": [
+        _pkg("AB000000001BR"),
+        _pkg("AB000000002BR", recipient="JOSE DE SOUZA", line=2),
+        _pkg("AB000000004BR", line=4),
+    ]}
+    ldi_diff.apply_diff(result, PREVIOUS, "anterior.json")
+
+    assert [p["trackingCode"] for p in result["packages"]] == ["AB000000002BR", "AB000000004BR"]
+    assert result["totalPackages"] == 2
+    diff = result["diff"]
+    assert diff["added"] == ["AB000000004BR"]
+    assert diff["changed"] == [{"trackingCode": "AB000000002BR",
+                                "changes": {"recipient": {"from": "JOSE SOUZA", "to": "JOSE DE SOUZA"}}}]
+    assert [p["trackingCode"] for p in diff["removed"]] == ["AB000000003BR"]
+    assert diff["unchanged"] == 1
+    assert "partial" not in diff
+
+
+def test_diff_parcial_nao_lista_removidos():
+    result = {"packages": [_pkg("AB000000001BR")]}
+    ldi_diff.apply_diff(result, PREVIOUS, partial=True)
+    assert result["diff"]["removed"] == []
+    assert result["diff"]["partial"] is True
+
+
+def test_tracker_ignora_codigo_repetido():
+    tracker = ldi_diff.DiffTracker(PREVIOUS)
+    assert tracker.observe(_pkg("AB000000009BR")) == "added"
+    assert tracker.observe(_pkg("AB000000009BR")) is None
+    assert tracker.finish()["added"] == ["AB000000009BR"]
+
+
+def test_load_index_aceita_indice_e_resultado(tmp_path):
+    result = {"metadata": {"fileName": "ldi.pdf"}, "packages": [_pkg("AB000000001BR")]}
+    index_path = tmp_path / "indice.json"
+    ldi_diff.save_index(str(index_path), result)
+    result_path = tmp_path / "resultado.json"
+    result_path.write_text(json.dumps(result), encoding="utf-8")
+
+    expected = ldi_diff.build_index(result["packages"])
+    assert ldi_diff.load_index(str(index_path)) == expected
+    assert ldi_diff.load_index(str(result_path)) == expected
+
+    (tmp_path / "outro.json").write_text("{}", encoding="utf-8")
+    with pytest.raises(ValueError):
+        ldi_diff.load_index(str(tmp_path / "outro.json"))
+
+
+def test_diff_against_no_parser_bate_com_o_streaming(synthetic_ldi, tmp_path):
+    pytest.importorskip("pypdfium2")
+    pdf_path, truth = synthetic_ldi(count=40, seed=4)
+    index_path = tmp_path / "anterior.json"
+    parse_ldi_pdf(str(pdf_path), strategy="text", use_cache=False, save_index=str(index_path))
+
+    # LDI anterior sem dois códigos e com um destinatário diferente
+    previous = json.loads(index_path.read_text(encoding="utf-8"))
+    codes = list(previous["packages"])
+    del previous["packages"][codes[0]], previous["packages"][codes[1]]
+    previous["packages"][codes[2]]["recipient"] = "OUTRO NOME"
+    previous["packages"]["ZZ999999999BR"] = {"lineNumber": 99, "recipient": "X", "position": "",
+                                             "pickupDeadline": None}
+    index_path.write_text(json.dumps(previous), encoding="utf-8")
+
+    events = []
+    result = parse_ldi_pdf(str(pdf_path), strategy="text", use_cache=False,
+                           diff_against=str(index_path), on_event=events.append)
+    streamed = [e["package"]["trackingCode"] for e in events if e["type"] == "package"]
+    assert streamed == [p["trackingCode"] for p in result["packages"]]
+    assert sorted(streamed) == sorted(codes[:3])
+    assert sorted(result["diff"]["added"]) == sorted(codes[:2])
+    assert [c["trackingCode"] for c in result["diff"]["changed"]] == [codes[2]]
+    assert [p["trackingCode"] for p in result["diff"]["removed"]] == ["ZZ999999999BR"]
+    assert result["metadata"]["extractedTotal"] == truth["expectedTotal"]
@@ -0,0 +1,76 @@
+"""Resultado colunar, MessagePack e quadros com tamanho (ldi_encoding.py)."""
+
+import io
+
+import pytest
+
+import ldi_encoding
+
+
+RESULT = {
+    "success": True,
+    "totalPackages": 3,
+    "metadata": {"fileName": "ldi.pdf", "strategy": "text-layer"},
+    "packages": [
+        {"trackingCode": "AB000000001BR", "recipient": "MARIA", "dateISO": "2026-01-05", "page": 1},
+        {"trackingCode": "AB000000002BR", "recipient": "JOSÉ", "dateISO": "2026-01-05"},
+        {"trackingCode": "AB000000003BR", "recipient": None, "dateISO": "2026-01-05", "page": 2},
+    ],
+}
+
+
+def test_colunar_separa_campos_iguais_e_ausentes():
+    encoded = ldi_encoding.to_columnar(RESULT)
+    block = encoded["packages"]
+    assert encoded["encoding"] == "columnar"
+    assert block["count"] == 3
+    assert block["shared"] == {"dateISO": "2026-01-05"}
+    assert block["columns"]["recipient"] == ["MARIA", "JOSÉ", None]
+    assert block["absent"] == {"page": [1]}
+    assert "packages" in RESULT and isinstance(RESULT["packages"], list)  # original intacto
+
+
+@pytest.mark.parametrize("result", [
+    RESULT,
+    {**RESULT, "packages": []},
+    {**RESULT, "packages": RESULT["packages"][:1]},
+])
+def test_colunar_ida_e_volta(result):
+    assert ldi_encoding.from_columnar(ldi_encoding.to_columnar(result)) == result
+
+
+@pytest.mark.parametrize("encoding", ["json", "columnar"])
+def test_encode_decode(encoding):
+    assert ldi_encoding.decode(ldi_encoding.encode(RESULT, encoding), encoding) == RESULT
+
+
+def test_msgpack_ida_e_volta():
+    pytest.importorskip("msgpack")
+    payload = ldi_encoding.encode(RESULT, "msgpack")
+    assert ldi_encoding.decode(payload, "msgpack") == RESULT
+    assert len(payload) < len(ldi_encoding.encode(RESULT, "json"))
+
+
+def test_codificacao_desconhecida():
+    with pytest.raises(ValueError):
+        ldi_encoding.encode(RESULT, "xml")
+
+
+def test_quadros_com_prefixo_de_tamanho():
+    stream = io.BytesIO()
+    for payload in (b"primeiro", b"", ldi_encoding.encode(RESULT, "columnar")):
+        ldi_encoding.write_frame(stream, payload)
+    stream.seek(0)
+    frames = []
+    while (frame := ldi_encoding.read_frame(stream)) is not None:
+        frames.append(frame)
+    assert frames[:2] == [b"primeiro", b""]
+    assert ldi_encoding.decode(frames[2], "columnar") == RESULT
+
+
+def test_quadro_incompleto():
+    stream = io.BytesIO()
+    ldi_encoding.write_frame(stream, b"0123456789")
+    truncated = io.BytesIO(stream.getvalue()[:-3])
+    with pytest.raises(EOFError):
+        ldi_encoding.read_frame(truncated)
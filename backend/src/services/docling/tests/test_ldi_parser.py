@@ -0,0 +1,278 @@
+"""Extração de pacotes (ldi_parser.py): tabelas, camada de texto e prazo."""
+
+import json
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import ldi_parser
+import ldi_synth
+import pipeline_profiles
+from ldi_parser import (CELL_SEPARATOR, DATE_FINDER, NUMBER_FINDER, POSITION_FINDER, TRACKING_FINDER,
+                        TableStitcher, extract_packages_from_table, findall_by_row, parse_ldi_pdf,
+                        stitch_table_fragments)
+from page_windows import get_page_count
+
+
+HEADER = list(ldi_synth.HEADER)
+
+CELLS = [
+    "AB123456789BR QB987654321BR",
+    "",
+    "PCM - 12 PCM-7",
+    "10/01/2026",
+    "sem nada aqui",
+    "XY111222333BR",
+]
+
+
+# Varredura por coluna ------------------------------------------------------
+
+@pytest.mark.parametrize("pattern", [TRACKING_FINDER, POSITION_FINDER, NUMBER_FINDER, DATE_FINDER])
+def test_findall_by_row_equivale_ao_findall_por_celula(pattern):
+    assert findall_by_row(pattern, CELLS) == [pattern.findall(cell) for cell in CELLS]
+
+
+@pytest.mark.parametrize("pattern", [TRACKING_FINDER, POSITION_FINDER, NUMBER_FINDER, DATE_FINDER])
+def test_findall_by_row_equivale_nas_colunas_da_ldi_sintetica(pattern):
+    truth = ldi_synth.make_truth(300, random.Random(7), ldi_synth.date(2026, 1, 5))
+    grid = ldi_synth.table_grid(truth, random.Random(7), merged_ratio=0.1)
+    for col in range(len(HEADER)):
+        cells = [row[col].upper() for row in grid[1:]]
+        assert findall_by_row(pattern, cells) == [pattern.findall(cell) for cell in cells]
+
+
+def test_findall_by_row_com_nul_dentro_da_celula():
+    # Um NUL vindo do PDF não pode ser contado como troca de linha
+    cells = [f"AB123456789BR{CELL_SEPARATOR}QB987654321BR", "", f"{CELL_SEPARATOR}XY111222333BR"]
+    assert findall_by_row(TRACKING_FINDER, cells) == [
+        ["AB123456789BR", "QB987654321BR"], [], ["XY111222333BR"]
+    ]
+    assert findall_by_row(TRACKING_FINDER, cells) == [TRACKING_FINDER.findall(cell) for cell in cells]
+
+
+def test_extract_packages_from_table_separa_celulas_mescladas():
+    truth = ldi_synth.make_truth(120, random.Random(3), ldi_synth.date(2026, 1, 5))
+    grid = ldi_synth.table_grid(truth, random.Random(3), merged_ratio=0.1)
+    assert len(grid) - 1 < len(truth["packages"])  # há linhas fundidas
+
+    packages = extract_packages_from_table(grid)
+    assert [p["trackingCode"] for p in packages] == [p["trackingCode"] for p in truth["packages"]]
+    assert [p["position"] for p in packages] == [p["position"] for p in truth["packages"]]
+    assert [p["lineNumber"] for p in packages] == [p["lineNumber"] for p in truth["packages"]]
+    assert all(p["date"] == truth["arrivalDate"] for p in packages)
+
+
+# Tabelas partidas entre páginas --------------------------------------------
+
+def _row(group, code, name, date="05/01/2026", position="PCM - 1"):
+    return [group, date, position, code, name]
+
+
+def test_stitch_descarta_cabecalho_repetido_da_pagina_seguinte():
+    first = [HEADER, _row("1", "AB000000001BR", "MARIA SILVA")]
+    second = [HEADER, _row("2", "AB000000002BR", "JOSE SOUZA")]
+    tables = stitch_table_fragments([{"page": 1, "rows": first}, {"page": 2, "rows": second}])
+    assert tables == [[HEADER, first[1], second[1]]]
+
+
+def test_stitch_une_nome_que_continua_na_pagina_seguinte():
+    first = [HEADER, _row("1", "AB000000001BR", "MARIA DA CONCEIÇÃO")]
+    second = [HEADER, ["", "", "", "", "SILVA SANTOS"], _row("2", "AB000000002BR", "JOSE SOUZA")]
+    (table,) = stitch_table_fragments([{"page": 1, "rows": first}, {"page": 2, "rows": second}])
+    assert len(table) == 3
+    assert table[1][4] == "MARIA DA CONCEIÇÃO SILVA SANTOS"
+    packages = extract_packages_from_table(table)
+    assert [p["recipient"] for p in packages] == ["MARIA DA CONCEIÇÃO SILVA SANTOS", "JOSE SOUZA"]
+
+
+def test_stitch_une_linha_cortada_antes_do_codigo():
+    first = [HEADER, _row("1", "AB000000001BR", "MARIA SILVA"), ["2", "05/01/2026", "", "", ""]]
+    second = [["", "", "PCM - 9", "AB000000002BR", "JOSE SOUZA"]]
+    (table,) = stitch_table_fragments([{"page": 1, "rows": first}, {"page": 2, "rows": second}])
+    assert table[-1] == ["2", "05/01/2026", "PCM - 9", "AB000000002BR", "JOSE SOUZA"]
+
+
+def test_stitch_nao_une_paginas_nao_consecutivas_nem_colunas_diferentes():
+    first = [HEADER, _row("1", "AB000000001BR", "MARIA SILVA")]
+    assert len(stitch_table_fragments([{"page": 1, "rows": first}, {"page": 3, "rows": first}])) == 2
+    other = [["A", "B"], ["1", "2"]]
+    assert len(stitch_table_fragments([{"page": 1, "rows": first}, {"page": 2, "rows": other}])) == 2
+
+
+def test_stitcher_devolve_tabela_so_quando_fecha():
+    stitcher = TableStitcher()
+    assert stitcher.feed(1, [HEADER, _row("1", "AB000000001BR", "MARIA SILVA")]) == []
+    assert stitcher.feed(2, [_row("2", "AB000000002BR", "JOSE SOUZA")]) == []
+    (table,) = stitcher.feed(4, [HEADER, _row("3", "AB000000003BR", "ANA LIMA")])
+    assert len(table) == 3
+    assert len(stitcher.flush()) == 1
+    assert stitcher.flush() == []
+
+
+# Estratégia da camada de texto ---------------------------------------------
+
+def test_estrategia_text_confere_com_o_gabarito(synthetic_ldi):
+    pytest.importorskip("pypdfium2")
+    pdf_path, truth = synthetic_ldi(count=80, seed=0)
+    result = parse_ldi_pdf(str(pdf_path), strategy="text", use_cache=False)
+
+    assert result["success"]
+    assert result["metadata"]["strategy"] == "text-layer"
+    assert result["metadata"]["expectedTotal"] == truth["expectedTotal"]
+    assert result["metadata"]["pagesProcessed"] == truth["pages"]
+    fields = ("lineNumber", "trackingCode", "recipient", "position")
+    assert [{f: p[f] for f in fields} for p in result["packages"]] == \
+        [{f: p[f] for f in fields} for p in truth["packages"]]
+    assert all(p["date"] == truth["arrivalDate"] for p in result["packages"])
+
+
+def test_estrategia_auto_usa_a_camada_de_texto_quando_o_total_confere(synthetic_ldi):
+    pytest.importorskip("pypdfium2")
+    pdf_path, truth = synthetic_ldi(count=30, seed=1)
+    events = []
+    result = parse_ldi_pdf(str(pdf_path), strategy="auto", use_cache=False, on_event=events.append)
+    assert result["metadata"]["strategy"] == "text-layer"
+    assert result["totalPackages"] == truth["expectedTotal"]
+    streamed = [e["package"]["trackingCode"] for e in events if e["type"] == "package"]
+    assert streamed == [p["trackingCode"] for p in result["packages"]]
+
+
+# Prazo (deadline) ----------------------------------------------------------
+
+class FakeConverter:
+    """Conversor no lugar do Docling: demora seconds_per_page e não acha tabelas."""
+
+    def __init__(self, seconds_per_page: float = 0.0):
+        self.seconds_per_page = seconds_per_page
+        self.ranges = []
+
+    def convert(self, pdf_path, page_range=None):
+        start, end = page_range or (1, get_page_count(str(pdf_path)))
+        self.ranges.append((start, end))
+        time.sleep(self.seconds_per_page * (end - start + 1))
+        document = SimpleNamespace(pages=list(range(start, end + 1)), tables=[], texts=[])
+        return SimpleNamespace(document=document)
+
+
+def _parse_with_deadline(pdf_path, converter, deadline_s):
+    # "fast": sem OCR seletivo, que trocaria o conversor por um Docling de verdade
+    return parse_ldi_pdf(str(pdf_path), converter=converter, strategy="docling", use_cache=False,
+                         pipeline="fast", deadline_s=deadline_s)
+
+
+def test_prazo_esgotado_antes_da_conversao_usa_so_a_camada_de_texto(synthetic_ldi):
+    pytest.importorskip("pypdfium2")
+    pdf_path, truth = synthetic_ldi(count=80, seed=0)
+    converter = FakeConverter()
+    result = _parse_with_deadline(pdf_path, converter, 0.000001)
+
+    assert converter.ranges == []
+    metadata = result["metadata"]
+    assert metadata["degraded"] is True
+    assert metadata["skippedStages"] == ["convert"]
+    assert metadata["deadline"]["skippedPages"] == [1, truth["pages"]]
+    assert metadata["deadline"]["textLayerMs"] > 0
+    assert [p["trackingCode"] for p in result["packages"]] == [p["trackingCode"] for p in truth["packages"]]
+    assert any("Prazo" in warning for warning in result["warnings"])
+
+
+def test_prazo_curto_converte_parte_das_paginas_e_completa_pelo_texto(synthetic_ldi):
+    pytest.importorskip("pypdfium2")
+    pdf_path, truth = synthetic_ldi(count=200, seed=0)
+    assert truth["pages"] >= 3
+    converter = FakeConverter(seconds_per_page=0.2)
+    result = _parse_with_deadline(pdf_path, converter, 0.5)
+
+    # Primeira janela de uma página só, para medir; nunca o documento inteiro
+    assert converter.ranges[0] == (1, 1)
+    converted = sum(end - start + 1 for start, end in converter.ranges)
+    assert converted < truth["pages"]
+    metadata = result["metadata"]
+    assert metadata["degraded"] is True
+    assert metadata["deadline"]["skippedPages"] == [converted + 1, truth["pages"]]
+    assert sorted(p["trackingCode"] for p in result["packages"]) == \
+        sorted(p["trackingCode"] for p in truth["packages"])
+
+
+def test_prazo_vale_tambem_para_pdf_menor_que_uma_janela(synthetic_ldi):
+    pytest.importorskip("pypdfium2")
+    pdf_path, truth = synthetic_ldi(count=60, seed=0)
+    assert truth["pages"] <= 4
+    converter = FakeConverter()
+    result = _parse_with_deadline(pdf_path, converter, 30)
+
+    # Convertido em janelas (a primeira de uma página), não de uma vez
+    assert converter.ranges[0] == (1, 1)
+    assert sum(end - start + 1 for start, end in converter.ranges) == truth["pages"]
+    assert result["metadata"]["degraded"] is False
+    assert result["metadata"]["deadline"]["skippedPages"] is None
+
+
+# OCR seletivo -------------------------------------------------------------
+
+def test_pdf_digital_usa_o_conversor_sem_ocr_do_cache(synthetic_ldi, monkeypatch):
+    pytest.importorskip("pypdfium2")
+    built = []
+
+    def build_converter(profile):
+        built.append(profile["settings"]["ocr"])
+        return FakeConverter()
+
+    monkeypatch.setattr(pipeline_profiles, "build_converter", build_converter)
+    monkeypatch.setattr(pipeline_profiles, "_converters", {})
+    pdf_path, truth = synthetic_ldi(count=60, seed=0)
+    warm = FakeConverter()
+    for window_pages in (0, 0, 1, 1):
+        result = parse_ldi_pdf(str(pdf_path), converter=warm, strategy="docling", use_cache=False,
+                               pipeline="default", window_pages=window_pages)
+        assert result["totalPackages"] == truth["expectedTotal"]
+
+    # Todas as páginas têm texto: troca para o perfil sem OCR, criado uma vez só
+    assert built == [False]
+    assert warm.ranges == []
+
+
+# Streaming em janelas -----------------------------------------------------
+
+class ScannedConverter(FakeConverter):
+    """Devolve a tabela inteira na página 1 e o texto das páginas como itens do Docling."""
+
+    def __init__(self, grid, page_texts):
+        super().__init__()
+        self.grid = grid
+        self.page_texts = page_texts
+
+    def convert(self, pdf_path, page_range=None):
+        start, end = page_range
+        self.ranges.append((start, end))
+        prov = lambda page: [SimpleNamespace(page_no=page)]  # noqa: E731
+        cells = [[SimpleNamespace(text=str(value)) for value in row] for row in self.grid]
+        tables = [SimpleNamespace(prov=prov(1), data=SimpleNamespace(grid=cells))] if start == 1 else []
+        texts = [SimpleNamespace(prov=prov(page), text=self.page_texts[page - 1]) for page in range(start, end + 1)]
+        document = SimpleNamespace(pages=list(range(start, end + 1)), tables=tables, texts=texts)
+        return SimpleNamespace(document=document)
+
+
+def test_pacotes_em_janelas_so_saem_com_o_prazo_do_rodape(synthetic_ldi, monkeypatch):
+    pytest.importorskip("pypdfium2")
+    pdf_path, truth = synthetic_ldi(count=60, seed=0)
+    assert truth["pages"] >= 2
+    # Devolução fora dos 7 dias que apply_header_dates() supõe quando ela falta
+    page_texts = [text.replace(truth["returnDate"], "28/02/2026")
+                  for text in ldi_parser.read_text_layer(str(pdf_path))]
+    grid = ldi_synth.table_grid(truth, random.Random(0))
+    # PDF escaneado: sem camada de texto, a data de devolução só vem da última janela
+    monkeypatch.setattr(ldi_parser, "read_text_layer", lambda *args, **kwargs: [""] * truth["pages"])
+    events = []  # como no NDJSON: o evento é serializado na hora em que sai
+    result = parse_ldi_pdf(str(pdf_path), converter=ScannedConverter(grid, page_texts), strategy="docling",
+                           use_cache=False, pipeline="fast", window_pages=1,
+                           on_event=lambda event: events.append(json.loads(json.dumps(event))))
+
+    streamed = [e["package"] for e in events if e["type"] == "package"]
+    assert [p["trackingCode"] for p in streamed] == [p["trackingCode"] for p in truth["packages"]]
+    assert all(p["pickupDeadline"] == "2026-02-28" for p in streamed)
+    assert streamed == result["packages"]
+
@@ -0,0 +1,61 @@
+"""Conversão em janelas com teto de memória e prazo (page_windows.py)."""
+
+import time
+from types import SimpleNamespace
+
+import page_windows
+from ldi_metrics import Deadline
+from page_windows import PageWindows, resolve_window
+
+
+class SlowConverter:
+    def __init__(self, seconds_per_page: float = 0.0):
+        self.seconds_per_page = seconds_per_page
+        self.ranges = []
+
+    def convert(self, pdf_path, page_range):
+        self.ranges.append(page_range)
+        time.sleep(self.seconds_per_page * (page_range[1] - page_range[0] + 1))
+        return SimpleNamespace(document=object())
+
+
+def test_janelas_cobrem_o_documento():
+    converter = SlowConverter()
+    windows = PageWindows(converter, "ldi.pdf", 10, 4)
+    assert [(start, end) for start, end, _ in windows] == [(1, 4), (5, 8), (9, 10)]
+    assert windows.summary()["windows"] == 3
+    assert windows.summary()["skippedPages"] is None
+
+
+def test_janela_diminui_acima_do_teto_de_memoria(monkeypatch):
+    monkeypatch.setattr(page_windows, "current_rss_kb", lambda: 10 * 1024 * 1024)
+    windows = PageWindows(SlowConverter(), "ldi.pdf", 10, 8, memory_limit_mb=100)
+    assert [(start, end) for start, end, _ in windows] == [(1, 8), (9, 10)]
+    # Metade depois de cada janela acima do teto (8 -> 4 -> 2)
+    assert windows.summary()["finalWindowPages"] == 2
+
+
+def test_prazo_mede_uma_pagina_e_encurta_as_janelas():
+    converter = SlowConverter(seconds_per_page=0.05)
+    windows = PageWindows(converter, "ldi.pdf", 40, 10, deadline=Deadline(0.4))
+    pages = [(start, end) for start, end, _ in windows]
+    assert pages[0] == (1, 1)
+    assert all(end - start < 10 for start, end in pages)
+    skipped = windows.summary()["skippedPages"]
+    assert skipped is not None and skipped == [pages[-1][1] + 1, 40]
+
+
+def test_reserva_do_prazo_conta_como_tempo_gasto():
+    deadline = Deadline(1)
+    deadline.reserve(1000)
+    assert deadline.expired()
+    windows = PageWindows(SlowConverter(), "ldi.pdf", 5, 2, deadline=deadline)
+    assert list(windows) == []
+    assert windows.summary()["skippedPages"] == [1, 5]
+
+
+def test_resolve_window(monkeypatch):
+    assert resolve_window() == (0, None)
+    assert resolve_window(memory_limit_mb=512) == (page_windows.DEFAULT_WINDOW_PAGES, 512)
+    monkeypatch.setenv("LDI_WINDOW_PAGES", "6")
+    assert resolve_window() == (6, None)
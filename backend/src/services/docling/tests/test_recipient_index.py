@@ -0,0 +1,122 @@
+"""Índice de moradores: separação de nomes mesclados e associação (recipient_index.py)."""
+
+import json
+import os
+import random
+
+import pytest
+
+import recipient_index
+from ldi_parser import split_recipient_names
+from recipient_index import RecipientIndex
+
+
+RESIDENTS = [
+    {"id": 1, "name": "Marciely Dutra"},
+    {"id": 2, "name": "Flazinete Lima"},
+    {"id": 3, "name": "Maria da Conceição Souza"},
+    {"id": 4, "name": "José Souza"},
+    {"id": 5, "name": "Ana"},
+]
+
+
+@pytest.fixture
+def index():
+    return RecipientIndex(RESIDENTS)
+
+
+def _reference_segment(index, words, count):
+    """A mesma pontuação de segment(), testando todos os cortes (O(count·n²))."""
+    tokens = [" ".join(recipient_index.normalize_tokens(word)) for word in words]
+    n = len(tokens)
+    known = [index.known_lengths(tokens, start) for start in range(n)]
+    if count < 2 or n < count or not any(known):
+        return None
+    best = [[None] * (n + 1) for _ in range(count + 1)]
+    back = [[0] * (n + 1) for _ in range(count + 1)]
+    best[0][0] = 0
+    for k in range(1, count + 1):
+        for i in range(k, n - (count - k) + 1):
+            for j in range(k - 1, i):
+                if best[k - 1][j] is None:
+                    continue
+                length = i - j
+                score = best[k - 1][j] + (100 * count if length in known[j] else 0) - abs(length * count - n)
+                if best[k][i] is None or score > best[k][i]:
+                    best[k][i], back[k][i] = score, j
+    names, i = [], n
+    for k in range(count, 0, -1):
+        j = back[k][i]
+        names.append(" ".join(words[j:i]))
+        i = j
+    return names[::-1]
+
+
+def test_separa_nomes_conhecidos(index):
+    words = "MARCIELY DUTRA FLAZINETE LIMA".split()
+    assert index.segment(words, 2) == ["MARCIELY DUTRA", "FLAZINETE LIMA"]
+    # Sem o índice, a divisão em partes iguais acerta só por acaso
+    words = "MARIA DA CONCEIÇÃO SOUZA JOSÉ SOUZA".split()
+    assert index.segment(words, 2) == ["MARIA DA CONCEIÇÃO SOUZA", "JOSÉ SOUZA"]
+    assert split_recipient_names(" ".join(words), 2) == ["MARIA DA CONCEIÇÃO", "SOUZA JOSÉ SOUZA"]
+    assert split_recipient_names(" ".join(words), 2, index) == ["MARIA DA CONCEIÇÃO SOUZA", "JOSÉ SOUZA"]
+
+
+def test_sem_nome_conhecido_devolve_none(index):
+    assert index.segment("PEDRO ALVES RITA COSTA".split(), 2) is None
+    assert index.segment(["ANA"], 2) is None
+
+
+def test_segment_igual_a_programacao_dinamica_completa():
+    rng = random.Random(11)
+    first = ["MARIA", "JOSÉ", "ANA", "JOÃO", "PAULO", "LUCAS", "CARLA", "RITA"]
+    last = ["SILVA", "SOUZA", "DA", "COSTA", "LIMA", "ALVES", "PEREIRA"]
+    residents = [{"id": i, "name": " ".join([rng.choice(first)] + rng.sample(last, rng.randint(1, 3)))}
+                 for i in range(150)]
+    index = RecipientIndex(residents)
+    for _ in range(1500):
+        count = rng.randint(2, 6)
+        words = []
+        for _ in range(count):
+            if rng.random() < 0.6:
+                words += rng.choice(residents)["name"].split()
+            else:
+                words += [rng.choice(first + last) for _ in range(rng.randint(1, 5))]
+        assert index.segment(words, count) == _reference_segment(index, words, count)
+
+
+def test_segment_de_celula_longa_fica_linear():
+    rng = random.Random(5)
+    residents = [{"id": i, "name": f"MORADOR{i} SOBRENOME{i % 7}"} for i in range(50)]
+    index = RecipientIndex(residents)
+    words = []
+    for _ in range(100):
+        words += rng.choice(residents)["name"].split()
+    names = index.segment(words, 100)
+    assert len(names) == 100
+    assert all(len(name.split()) == 2 for name in names)
+
+
+def test_match_e_annotate(index):
+    assert index.match("MARIA DA CONCEICAO SOUZA") == (3, 1.0)
+    # Dice por palavras, sem conectivos: {MARIA, SOUZA} contra {MARIA, CONCEICAO, SOUZA}
+    assert index.match("Maria Souza") == (3, 0.8)
+    pkg = {"recipient": "PEDRO ALVES"}
+    index.annotate(pkg)
+    assert pkg == {"recipient": "PEDRO ALVES", "residentId": None, "matchScore": 0.0}
+
+
+def test_get_index_recarrega_quando_o_arquivo_muda(tmp_path):
+    path = tmp_path / "moradores.json"
+    path.write_text(json.dumps({"residents": RESIDENTS}), encoding="utf-8")
+    first = recipient_index.get_index(str(path))
+    assert recipient_index.get_index(str(path)) is first
+    assert len(first) == len(RESIDENTS)
+
+    path.write_text(json.dumps(RESIDENTS[:2]), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+    second = recipient_index.get_index(str(path))
+    assert second is not first
+    assert len(second) == 2
+    assert second.signature != first.signature
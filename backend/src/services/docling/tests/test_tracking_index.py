@@ -0,0 +1,52 @@
+"""Índice de códigos entre uploads (tracking_index.py)."""
+
+import time
+
+import pytest
+
+from tracking_index import TrackingIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    return TrackingIndex(str(tmp_path / "tracking.sqlite3"), ttl_days=90)
+
+
+def _packages(*codes):
+    return [{"trackingCode": code} for code in codes]
+
+
+def test_novo_repetido_e_entregue(index):
+    first = _packages("AB000000001BR", "AB000000002BR")
+    assert index.classify(first, source="ldi-1") == {"new": 2, "repeat": 0, "delivered": 0}
+    assert all(pkg["seenStatus"] == "new" and "firstSeenAt" not in pkg for pkg in first)
+
+    index.mark_delivered(["AB000000002BR"])
+    second = _packages("AB000000001BR", "AB000000002BR", "AB000000003BR")
+    assert index.classify(second, source="ldi-2") == {"new": 1, "repeat": 1, "delivered": 1}
+    assert [pkg["seenStatus"] for pkg in second] == ["repeat", "delivered", "new"]
+    assert second[0]["firstSeenAt"] == time.strftime("%Y-%m-%d")
+
+
+def test_reprocessar_a_mesma_ldi_nao_vira_repetido(index):
+    index.classify(_packages("AB000000001BR"), source="ldi-1")
+    again = _packages("AB000000001BR")
+    assert index.classify(again, source="ldi-1")["new"] == 1
+    assert index.stats()["codes"] == 1
+
+
+def test_codigos_vencidos_expiram(tmp_path):
+    index = TrackingIndex(str(tmp_path / "tracking.sqlite3"), ttl_days=0.5 / 86400)
+    index.classify(_packages("AB000000001BR"), source="ldi-1")
+    time.sleep(1)
+    assert index.prune() == 1
+    again = _packages("AB000000001BR")
+    index.classify(again, source="ldi-2")
+    assert again[0]["seenStatus"] == "new"
+
+
+def test_lookup_em_lote(index):
+    index.classify(_packages("AB000000001BR", "AB000000002BR"), source="ldi-1")
+    found = index.lookup(["AB000000002BR", "ZZ999999999BR"])
+    assert list(found) == ["AB000000002BR"]
+    assert found["AB000000002BR"]["firstSource"] == "ldi-1"
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Índice persistente de códigos de rastreio
+Lembra, entre uploads, quais códigos já apareceram em LDIs anteriores e quais já
+foram entregues, para o parser marcar cada pacote como novo, repetido ou entregue
+numa única consulta (em vez de uma query por linha no Node). SQLite com o código
+como chave primária: a consulta continua em milissegundos com centenas de milhares
+de códigos. Códigos sem aparecer há mais de LDI_TRACKING_TTL_DAYS dias expiram.
+
+Uso:
+    python tracking_index.py stats [--index ARQUIVO]
+    python tracking_index.py delivered AB123456789BR ... [--index ARQUIVO]
+    python tracking_index.py prune [--index ARQUIVO]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from ldi_cache import DEFAULT_CACHE_DIR
+
+
+DEFAULT_TTL_DAYS = 90
+
+# Situação de cada pacote em relação às LDIs anteriores
+STATUS_NEW = "new"
+STATUS_REPEAT = "repeat"
+STATUS_DELIVERED = "delivered"
+
+# Índices já abertos no processo, por caminho
+_indexes: Dict[str, "TrackingIndex"] = {}
+
+
+def _iso_date(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).date().isoformat() if timestamp else None
+
+
+class TrackingIndex:
+    """
+    Tabela codes (code PRIMARY KEY, WITHOUT ROWID): primeira/última vez visto, em
+    quantas LDIs diferentes apareceu, a LDI (SHA-256 do PDF) em que apareceu
+    primeiro e quando foi entregue.
+
+    Reprocessar a mesma LDI não transforma seus pacotes em repetidos: um código só é
+    "repeat" se apareceu antes em outro PDF.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_days: Optional[float] = None):
+        if path is None:
+            path = str(Path(os.environ.get("LDI_CACHE_DIR") or DEFAULT_CACHE_DIR) / "tracking_index.sqlite3")
+        if ttl_days is None:
+            ttl_days = float(os.environ.get("LDI_TRACKING_TTL_DAYS", DEFAULT_TTL_DAYS))
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Reabrir após fork: conexões SQLite não podem ser compartilhadas entre processos
+        if self._conn is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS codes (
+                    code TEXT PRIMARY KEY,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    seen_count INTEGER NOT NULL,
+                    first_source TEXT NOT NULL,
+                    last_source TEXT NOT NULL,
+                    delivered_at REAL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_codes_last_seen ON codes (last_seen)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> int:
+        return conn.execute("DELETE FROM codes WHERE last_seen < ?", (now - self.ttl_seconds,)).rowcount
+
+    def lookup(self, codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Linhas dos códigos já conhecidos, numa consulta só (lista passada como JSON)."""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT c.code, c.first_seen, c.seen_count, c.first_source, c.delivered_at "
+            "FROM json_each(?) AS wanted JOIN codes AS c ON c.code = wanted.value",
+            (json.dumps(list(codes)),)
+        ).fetchall()
+        return {
+            code: {"firstSeen": first_seen, "seenCount": seen_count,
+                   "firstSource": first_source, "deliveredAt": delivered_at}
+            for code, first_seen, seen_count, first_source, delivered_at in rows
+        }
+
+    def classify(self, packages: List[Dict[str, Any]], source: str) -> Dict[str, int]:
+        """
+        Marca cada pacote com seenStatus ("new", "repeat" ou "delivered") e, se já
+        visto, firstSeenAt; depois registra todos os códigos desta LDI (source).
+        Expira os códigos vencidos antes da consulta. Retorna a contagem por situação.
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            self._prune(conn, now)
+            known = self.lookup(pkg["trackingCode"] for pkg in packages)
+            counts = {STATUS_NEW: 0, STATUS_REPEAT: 0, STATUS_DELIVERED: 0}
+            for pkg in packages:
+                row = known.get(pkg["trackingCode"])
+                if row is None:
+                    status = STATUS_NEW
+                elif row["deliveredAt"]:
+                    status = STATUS_DELIVERED
+                elif row["firstSource"] == source:
+                    status = STATUS_NEW
+                else:
+                    status = STATUS_REPEAT
+                pkg["seenStatus"] = status
+                if row is not None and status != STATUS_NEW:
+                    pkg["firstSeenAt"] = _iso_date(row["firstSeen"])
+                counts[status] += 1
+
+            conn.executemany(
+                "INSERT INTO codes (code, first_seen, last_seen, seen_count, first_source, last_source) "
+                "VALUES (?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT(code) DO UPDATE SET "
+                "last_seen = excluded.last_seen, "
+                "seen_count = seen_count + (last_source != excluded.last_source), "
+                "last_source = excluded.last_source",
+                ((pkg["trackingCode"], now, now, source, source) for pkg in packages)
+            )
+        return counts
+
+    def mark_delivered(self, codes: Iterable[str]) -> int:
+        """Marca os códigos como entregues (os desconhecidos são ignorados)."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            return conn.executemany(
+                "UPDATE codes SET delivered_at = ?, last_seen = ? WHERE code = ?",
+                ((now, now, code) for code in codes)
+            ).rowcount
+
+    def prune(self) -> int:
+        """Remove os códigos não vistos há mais do que o TTL."""
+        conn = self._connect()
+        with conn:
+            return self._prune(conn, time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        codes, delivered = conn.execute(
+            "SELECT COUNT(*), COUNT(delivered_at) FROM codes"
+        ).fetchone()
+        return {"path": self.path, "codes": codes, "delivered": delivered,
+                "ttlDays": round(self.ttl_seconds / 86400, 2)}
+
+
+def get_tracking_index(path: Optional[str] = None) -> Optional[TrackingIndex]:
+    """
+    Índice do caminho (padrão: LDI_TRACKING_INDEX; "default" usa o diretório do
+    cache), aberto uma vez por processo. None sem índice configurado.
+    """
+    path = path or os.environ.get("LDI_TRACKING_INDEX")
+    if not path:
+        return None
+    if path not in _indexes:
+        _indexes[path] = TrackingIndex(None if path == "default" else path)
+    return _indexes[path]
+
+
+def main():
+    """Manutenção do índice: estatísticas, entregas e limpeza (JSON em stdout)."""
+    parser = argparse.ArgumentParser(description="Índice persistente de códigos de rastreio")
+    parser.add_argument("command", choices=("stats", "delivered", "prune"))
+    parser.add_argument("codes", nargs="*", help="códigos entregues (comando delivered)")
+    parser.add_argument("--index", default=None,
+                        help="arquivo do índice (padrão: LDI_TRACKING_INDEX ou o diretório do cache)")
+    args = parser.parse_args()
+
+    index = get_tracking_index(args.index) or TrackingIndex()
+    if args.command == "delivered":
+        report = {"updated": index.mark_delivered(code.strip().upper() for code in args.codes)}
+    elif args.command == "prune":
+        report = {"removed": index.prune()}
+    else:
+        report = {}
+    print(json.dumps({**report, **index.stats()}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
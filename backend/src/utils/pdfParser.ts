@@ -27,6 +27,16 @@ export interface PackageData {
   pickupDeadline?: string;
   pickupDeadlineStr?: string;
   confidence: number;
+  // Origem no PDF (apenas extração via Docling/camada de texto)
+  page?: number;
+  charStart?: number;
+  charEnd?: number;
+  // Morador associado pelo índice de moradores (apenas extração via Docling)
+  residentId?: number | string | null;
+  matchScore?: number;
+  // Situação no índice de códigos entre uploads (apenas extração via Docling)
+  seenStatus?: 'new' | 'repeat' | 'delivered';
+  firstSeenAt?: string;
 }
 
 export interface ParseMetadata {